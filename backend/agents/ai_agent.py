@@ -1,3 +1,5 @@
+import logging
+
 from agents.base import BaseAgent
 from agents.memory import AgentMemory
 from agents.personality import Personality
@@ -9,9 +11,12 @@ from agents.prompts import (
     WITCH_PROMPT,
     GUARD_PROMPT,
 )
-from agents.prompts.runtime import build_runtime_prompt
+from agents.prompts.runtime import DEFAULT_TOKEN_BUDGET, assemble_runtime_prompt
 from agents.prompts.werewolf_night import build_wolf_night_prompt
-from llm.client import call_llm
+from game.speech import SpeechSanitizer
+from llm.client import acall_llm, astream_llm, call_llm
+
+logger = logging.getLogger("werewolf.agents")
 
 ROLE_PROMPT_MAP = {
     "WEREWOLF": WEREWOLF_PROMPT,
@@ -31,15 +36,36 @@ class AIAgent(BaseAgent):
         self.vote_history = []
         self.last_vote = None
         self.wolf_team = set()
+        # Live tables bypass the response cache; game.cli / game.farm turn it on.
+        self.use_llm_cache = False
+        self.prompt_token_budget = DEFAULT_TOKEN_BUDGET
+        self.last_prompt_usage: dict[str, int] = {}
+        # configure_game shares the session's sanitizer; a standalone agent
+        # builds its own, rebuilt only when its alive set changes.
+        self.sanitize_speech: SpeechSanitizer | None = None
+        self._own_sanitizer: tuple[frozenset, SpeechSanitizer] | None = None
 
-    def observe(self, event: str):
-        self.memory.add_event(event)
+    def observe(self, event: str, event_type: str | None = None, player_ids=()):
+        self.memory.add_event(event, event_type, player_ids)
 
     def act(self, phase, context: dict | None = None):
+        prompt = self._build_prompt(phase, context)
+        result = call_llm(prompt, use_cache=self.use_llm_cache)
+        return result
+
+    async def aact(self, phase, context: dict | None = None):
+        prompt = self._build_prompt(phase, context)
+        return await acall_llm(prompt, use_cache=self.use_llm_cache)
+
+    async def astream_act(self, phase, context: dict | None = None, on_speech=None):
+        prompt = self._build_prompt(phase, context)
+        return await astream_llm(prompt, on_speech, use_cache=self.use_llm_cache)
+
+    def _build_prompt(self, phase, context: dict | None = None) -> str:
         role_prompt = ROLE_PROMPT_MAP.get(self.role.name, "")
         phase_prompt = self._get_phase_prompt(phase)
 
-        prompt = build_runtime_prompt(
+        prompt, self.last_prompt_usage = assemble_runtime_prompt(
             SYSTEM_PROMPT,
             role_prompt,
             phase_prompt,
@@ -49,10 +75,10 @@ class AIAgent(BaseAgent):
             self.memory.player_names,
             self.personality,
             context or {},
+            self.prompt_token_budget,
         )
-
-        result = call_llm(prompt)
-        return result
+        logger.debug("%s prompt for %s: %s", phase, self.player_id, self.last_prompt_usage)
+        return prompt
 
     def _get_phase_prompt(self, phase):
         # Keep this minimal until phase-specific prompts are added.
@@ -60,6 +86,14 @@ class AIAgent(BaseAgent):
             return f"Current phase: {phase.name}"
         return f"Current phase: {phase}"
 
+    def _sanitizer(self) -> SpeechSanitizer:
+        if self.sanitize_speech is not None:
+            return self.sanitize_speech
+        alive = frozenset(self.memory.alive_players)
+        if self._own_sanitizer is None or self._own_sanitizer[0] != alive:
+            self._own_sanitizer = (alive, SpeechSanitizer(alive))
+        return self._own_sanitizer[1]
+
     def wolf_night_action(self, wolf_channel):
         prompt = build_wolf_night_prompt(
             wolves=wolf_channel.memory.wolves,
@@ -72,7 +106,7 @@ class AIAgent(BaseAgent):
         if "speech" in response:
             wolf_channel.broadcast(
                 self.player_id,
-                response["speech"],
+                self._sanitizer()(response["speech"], self.player_id),
             )
 
         action = response.get("action", {}) if isinstance(response, dict) else {}
@@ -6,9 +6,12 @@ class BaseAgent(ABC):
         self.player_id = player_id
 
     @abstractmethod
-    def observe(self, event: str):
+    def observe(self, event: str, event_type: str | None = None, player_ids=()):
         pass
 
     @abstractmethod
     def act(self, phase: str, context: dict | None = None):
         pass
+
+    async def aact(self, phase: str, context: dict | None = None):
+        return self.act(phase, context)
@@ -0,0 +1,97 @@
+import logging
+
+from agents.ai_agent import AIAgent
+from agents.prompts import SYSTEM_PROMPT, WEREWOLF_PROMPT
+from agents.prompts.batch_vote import PUBLIC_VOTERS_PROMPT, WOLF_VOTERS_PROMPT, assemble_batch_vote_prompt
+from llm.client import acall_llm
+
+logger = logging.getLogger("werewolf.agents")
+
+
+class VoteBatch:
+    """
+    AI voters decided by one LLM call. Members must share all of their
+    private knowledge, because the model sees every member's line: the
+    werewolves (who know the team and nothing else privately), or the
+    players who know nothing beyond the public record and their own
+    non-wolf role. Roles are not shown for the latter group.
+    """
+
+    __slots__ = ("agents", "wolves")
+
+    def __init__(self, agents: list[AIAgent], wolves: bool) -> None:
+        self.agents = agents
+        self.wolves = wolves
+
+    @property
+    def player_ids(self) -> list[str]:
+        return [agent.player_id for agent in self.agents]
+
+    def prompt(self, phase: str, context: dict) -> str:
+        lead = self.agents[0]
+        if self.wolves:
+            group_prompt = WEREWOLF_PROMPT + "\n" + WOLF_VOTERS_PROMPT.format(wolves=sorted(lead.wolf_team))
+            context = {**context, "wolf_team": sorted(lead.wolf_team)}
+        else:
+            group_prompt = PUBLIC_VOTERS_PROMPT
+        voters = [
+            (agent.player_id, agent.personality, agent.memory.summary().get("top_suspects"))
+            for agent in self.agents
+        ]
+        prompt, usage = assemble_batch_vote_prompt(
+            SYSTEM_PROMPT,
+            group_prompt,
+            phase,
+            voters,
+            lead.memory.visible_events(),
+            lead.memory.visible_speeches(),
+            lead.memory.player_names,
+            context,
+            lead.prompt_token_budget,
+        )
+        for agent in self.agents:
+            agent.last_prompt_usage = usage
+        logger.debug("%s batch prompt for %s: %s", phase, self.player_ids, usage)
+        return prompt
+
+    async def decide(self, phase: str, context: dict) -> dict[str, dict]:
+        """
+        Action dicts ({"vote": target}) for the voters the reply covers;
+        voters it leaves out are missing from the result.
+        """
+        result = await acall_llm(self.prompt(phase, context), use_cache=self.agents[0].use_llm_cache)
+        votes = result.get("votes") if isinstance(result, dict) else None
+        if not isinstance(votes, dict):
+            return {}
+        return {
+            pid: {"vote": votes[pid]}
+            for pid in self.player_ids
+            if pid in votes and (votes[pid] is None or isinstance(votes[pid], str))
+        }
+
+
+def vote_batches(agents: dict, player_ids: list[str]) -> tuple[list[VoteBatch], list[str]]:
+    """
+    Split `player_ids` into VoteBatches and the voters decided alone:
+    anyone with private knowledge (a seer result, a confirmed role),
+    non-AI agents, and any batch that would have a single member.
+    """
+    wolves: list[AIAgent] = []
+    public: list[AIAgent] = []
+    solo: list[str] = []
+    for pid in player_ids:
+        agent = agents.get(pid)
+        if not isinstance(agent, AIAgent) or agent.memory.has_private_knowledge():
+            solo.append(pid)
+        elif agent.role.name == "WEREWOLF":
+            wolves.append(agent)
+        else:
+            public.append(agent)
+
+    batches = []
+    for members, is_wolf in ((wolves, True), (public, False)):
+        if len(members) > 1:
+            batches.append(VoteBatch(members, is_wolf))
+        else:
+            solo.extend(agent.player_id for agent in members)
+    return batches, solo
@@ -2,7 +2,7 @@
 
 class HumanAgent(BaseAgent):
 
-    def observe(self, event: str):
+    def observe(self, event: str, event_type: str | None = None, player_ids=()):
         pass
 
     def act(self, phase: str, context: dict | None = None):
@@ -1,17 +1,77 @@
-﻿class AgentMemory:
+﻿import itertools
+from collections import deque
 
-    def __init__(self):
-        self.events = []
-        self.speeches = []
+from agents.suspicion_matrix import SuspicionMatrix, SuspicionView
+from game.event_log import EventLog, LogEntry
+
+
+class AgentMemory:
+    """
+    Bounded per-agent memory.
+
+    Events and speeches live in ring buffers; per-player and per-event-type
+    indexes hold the same entries and are trimmed on eviction, so memory
+    stays flat and lookups never scan the whole history.
+
+    When attached to a game's EventLog, the memory is a view: it keeps a
+    cursor and references to shared LogEntry objects, and catches up
+    lazily on the next read instead of copying every event as it happens.
+    """
+
+    def __init__(self, max_events: int = 50, max_speeches: int = 200):
+        self.events = deque(maxlen=max_events)
+        self.speeches = deque(maxlen=max_speeches)
         self.player_names = {}
         self.suspicion = SuspicionTable()
         self.confirmed_roles = {}
         self.alive_players = set()
-
-    def add_event(self, event: str, max_events: int = 50):
-        self.events.append(event)
-        if len(self.events) > max_events:
-            self.events = self.events[-max_events:]
+        self._event_seq = 0
+        self._events_by_player: dict[str, deque] = {}
+        self._events_by_type: dict[str, deque] = {}
+        self._speech_seq = 0
+        self._speeches_by_player: dict[str, deque] = {}
+        self._log: EventLog | None = None
+        self._owner: str | None = None
+        self._cursor = 0
+
+    def attach(self, log: EventLog, player_id: str):
+        self._log = log
+        self._owner = player_id
+        self._cursor = 0
+
+    def sync(self):
+        if self._log is None or self._cursor == len(self._log):
+            return
+        for entry in self._log.entries_since(self._cursor):
+            if not entry.visible_for(self._owner):
+                continue
+            self._add_entry(entry)
+            event = entry.event
+            if entry.event_type == "SPEECH":
+                self.add_speech(event.get("playerId", "?"), event.get("text", ""))
+            elif entry.event_type == "INIT":
+                self.set_players(event.get("players", []))
+        self._cursor = len(self._log)
+
+    def add_event(self, event: str, event_type: str | None = None, player_ids=()):
+        entry = LogEntry(self._event_seq, None, event_type, tuple(dict.fromkeys(player_ids)), text=event)
+        self._event_seq += 1
+        self._add_entry(entry)
+
+    def _add_entry(self, entry: LogEntry):
+        if len(self.events) == self.events.maxlen:
+            self._evict_event(self.events[0])
+        self.events.append(entry)
+        for pid in entry.player_ids:
+            self._events_by_player.setdefault(pid, deque()).append(entry)
+        if entry.event_type:
+            self._events_by_type.setdefault(entry.event_type, deque()).append(entry)
+
+    def _evict_event(self, entry: LogEntry):
+        for pid in entry.player_ids:
+            _popleft_index(self._events_by_player, pid, entry)
+        if entry.event_type:
+            _popleft_index(self._events_by_type, entry.event_type, entry)
 
     def summary(self):
         suspects = self.suspicion.top_suspects()
@@ -20,50 +80,103 @@
             "confirmed_roles": self.confirmed_roles,
         }
 
+    def has_private_knowledge(self) -> bool:
+        """
+        True if this memory holds something other players could not have
+        seen: a private log entry, a directly observed event or a
+        confirmed role.
+        """
+        self.sync()
+        if self.confirmed_roles:
+            return True
+        return any(entry.visible_to is not None or entry.event is None for entry in self.events)
+
     def visible_events(self, k: int = 10):
-        return self.events[-k:]
+        self.sync()
+        start = max(0, len(self.events) - k)
+        return [self.events[i].text for i in range(start, len(self.events))]
+
+    def events_of_type(self, event_type: str, k: int | None = None):
+        self.sync()
+        bucket = self._events_by_type.get(event_type, ())
+        return [e.text for e in _tail(bucket, k)]
 
     def add_speech(self, player_id: str, text: str):
-        self.speeches.append(f"{player_id}: {text}")
+        if len(self.speeches) == self.speeches.maxlen:
+            _, oldest_pid, _ = self.speeches[0]
+            _popleft_index(self._speeches_by_player, oldest_pid, self.speeches[0])
+        entry = (self._speech_seq, player_id, f"{player_id}: {text}")
+        self._speech_seq += 1
+        self.speeches.append(entry)
+        self._speeches_by_player.setdefault(player_id, deque()).append(entry)
 
     def visible_speeches(self):
-        return self.speeches
+        self.sync()
+        return [entry[2] for entry in self.speeches]
+
+    def speeches_by(self, player_id: str, k: int | None = None):
+        self.sync()
+        bucket = self._speeches_by_player.get(player_id, ())
+        return [e[2] for e in _tail(bucket, k)]
 
     def set_players(self, players: list[dict]):
         self.player_names = {p.get("id"): p.get("name") for p in players if p.get("id")}
         self.alive_players = {p.get("id") for p in players if p.get("id") and p.get("alive", True)}
 
     def find_events_about(self, player_id, k: int = 2):
-        return [
-            e for e in self.events
-            if player_id in e
-        ][:k]
+        self.sync()
+        bucket = self._events_by_player.get(player_id, ())
+        return [e.text for e in itertools.islice(bucket, k)]
+
+
+def _popleft_index(index: dict, key, entry):
+    # Evicted entries are always the oldest in each of their buckets.
+    bucket = index.get(key)
+    if bucket and bucket[0] is entry:
+        bucket.popleft()
+        if not bucket:
+            del index[key]
+
+
+def _tail(bucket, k: int | None) -> list:
+    # The last k entries, oldest first, without walking the whole bucket.
+    if k is None:
+        return list(bucket)
+    if k <= 0:
+        return []
+    tail = list(itertools.islice(reversed(bucket), k))
+    tail.reverse()
+    return tail
 
 
 class SuspicionTable:
     """
     Track suspicion score per player.
     0.0 = neutral, >0 = more suspicious, <0 = more trusted
+
+    A view of one observer's row in a SuspicionMatrix; in a game all
+    agents share the game's matrix (see configure_game). `scores` behaves
+    like a dict of the players scored so far.
     """
 
-    def __init__(self):
-        self.scores = {}
+    def __init__(self, matrix: SuspicionMatrix | None = None, observer=None):
+        self._matrix = matrix if matrix is not None else SuspicionMatrix([observer])
+        self._row = self._matrix.row(observer)
+        self.scores = SuspicionView(self._matrix, self._row)
 
     def init_player(self, player_id):
         self.scores[player_id] = 0.0
 
     def add(self, player_id, delta):
-        self.scores[player_id] = self.scores.get(player_id, 0.0) + delta
+        j = self._matrix.col(player_id)
+        self._matrix.scores[self._row, j] += delta
+        self._matrix.touched[self._row, j] = True
 
     def get(self, player_id):
         return self.scores.get(player_id, 0.0)
 
     def top_suspects(self, k=3):
-        return sorted(
-            self.scores.items(),
-            key=lambda x: x[1],
-            reverse=True,
-        )[:k]
+        return self._matrix.top_k(self._row, k)
 
 
 def generate_memory_summary(memory: AgentMemory):
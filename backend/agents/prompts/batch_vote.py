@@ -0,0 +1,91 @@
+import json
+
+from agents.prompts.budget import PromptSection, assemble_sections
+from agents.prompts.runtime import DEFAULT_TOKEN_BUDGET, RECENT_SPEECH_COUNT
+
+PUBLIC_VOTERS_PROMPT = (
+    "Each player below knows only the public record above "
+    "and their own suspicions."
+)
+
+WOLF_VOTERS_PROMPT = (
+    "Every player below is a werewolf; the werewolf team is {wolves}. "
+    "They vote to protect the team without revealing it."
+)
+
+BATCH_VOTE_RULES = """[Batched Decision]
+It is the {phase} phase. Decide the vote of each player under [Voters],
+one player at a time.
+- A player's vote may use the shared record and their own line only; never
+  let one player's line influence another player's vote.
+- Only vote for ids in alive_players; a player may abstain with null.
+- Stay consistent with each player's personality and suspicions."""
+
+BATCH_VOTE_FORMAT = """Please respond strictly in JSON format, one entry per voter:
+
+{{
+  "votes": {{{entries}}}
+}}
+"""
+
+
+def _voter_line(player_id, personality, top_suspects) -> str:
+    return (
+        f"- {player_id}: aggressiveness {personality.aggressiveness}, "
+        f"deception {personality.deception}, logic {personality.logic}, "
+        f"tone {personality.tone}; top suspects {top_suspects}"
+    )
+
+
+def assemble_batch_vote_prompt(
+    system_prompt,
+    group_prompt,
+    phase,
+    voters,
+    visible_events,
+    visible_speeches,
+    player_names,
+    context,
+    token_budget: int | None = DEFAULT_TOKEN_BUDGET,
+) -> tuple[str, dict[str, int]]:
+    """
+    One prompt deciding the votes of several players. The shared record
+    (rules, game state, speeches, events) appears once; each voter adds a
+    single line of `voters` = (player_id, personality, top_suspects).
+    Trimming follows assemble_runtime_prompt; the voter lines are never
+    trimmed. Returns the prompt and per-section token usage.
+    """
+    speeches = [str(s) for s in visible_speeches]
+    events = [str(e) for e in visible_events]
+    voter_ids = [pid for pid, _, _ in voters]
+    entries = ", ".join(f'"{pid}": "player_id or null"' for pid in voter_ids)
+
+    sections = [
+        PromptSection("rules", priority=0, body=system_prompt, required=True),
+        PromptSection(
+            "voters",
+            priority=1,
+            body=group_prompt + "\n\n[Voters]\n" + "\n".join(_voter_line(*voter) for voter in voters),
+            required=True,
+        ),
+        PromptSection("events", priority=5, header="[Visible Events]", items=events),
+        PromptSection("older_speeches", priority=4, header="[Earlier Speeches]", items=speeches[:-RECENT_SPEECH_COUNT]),
+        PromptSection("recent_speeches", priority=3, header="[Recent Speeches]", items=speeches[-RECENT_SPEECH_COUNT:]),
+        PromptSection(
+            "game_state",
+            priority=2,
+            body=f"""[Player List]
+{player_names}
+
+[Game State]
+{json.dumps(context, ensure_ascii=False, default=str)}""",
+            required=True,
+        ),
+        PromptSection(
+            "output",
+            priority=0,
+            body=BATCH_VOTE_RULES.format(phase=phase) + "\n\n" + BATCH_VOTE_FORMAT.format(entries=entries),
+            required=True,
+        ),
+    ]
+    return assemble_sections(sections, token_budget)
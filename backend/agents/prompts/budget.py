@@ -0,0 +1,99 @@
+import math
+import re
+from dataclasses import dataclass, field
+
+# CJK ideographs, kana, hangul and full-width punctuation: roughly one token each.
+_WIDE_CHARS = re.compile(r"[\u3000-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uff00-\uffef]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Offline token estimate: one token per CJK character plus one per
+    ~4 other characters. Close enough to BPE tokenizers for budgeting.
+    """
+    if not text:
+        return 0
+    wide = len(_WIDE_CHARS.findall(text))
+    return wide + math.ceil((len(text) - wide) / 4)
+
+
+@dataclass
+class PromptSection:
+    """
+    One block of a prompt.
+
+    `items` are trimmed oldest-first when the section does not fit; a
+    section without items is all-or-nothing. `required` sections are
+    always emitted, even over budget. Lower `priority` is filled first.
+    """
+
+    name: str
+    priority: int
+    header: str = ""
+    body: str = ""
+    items: list[str] = field(default_factory=list)
+    required: bool = False
+
+    def render(self, items: list[str] | None = None, omitted: int = 0) -> str:
+        parts = [self.header] if self.header else []
+        if self.body:
+            parts.append(self.body)
+        if items:
+            if omitted:
+                parts.append(f"(... {omitted} earlier omitted)")
+            parts.extend(items)
+        return "\n".join(parts)
+
+
+def assemble_sections(sections: list[PromptSection], token_budget: int | None) -> tuple[str, dict[str, int]]:
+    """
+    Fill `sections` by priority within `token_budget` and render them in
+    list order. Returns the prompt and the tokens spent per section.
+    """
+    rendered: dict[str, str] = {}
+    usage: dict[str, int] = {}
+    remaining = token_budget if token_budget is not None else math.inf
+
+    for section in sorted(sections, key=lambda s: s.priority):
+        if section.required or token_budget is None:
+            text = section.render(section.items)
+        elif not section.items:
+            text = section.render()
+            if estimate_tokens(text) > remaining:
+                text = ""
+        else:
+            text = _fit_items(section, remaining)
+        cost = estimate_tokens(text)
+        rendered[section.name] = text
+        usage[section.name] = cost
+        # Plus the blank line that separates it from its neighbour.
+        remaining -= (cost + 1) if text else 0
+
+    prompt = "\n\n".join(rendered[s.name] for s in sections if rendered[s.name])
+    usage["total"] = sum(usage.values())
+    return prompt, usage
+
+
+def _fit_items(section: PromptSection, remaining: float) -> str:
+    # Keep the newest items that fit.
+    full = section.render(section.items)
+    if estimate_tokens(full) <= remaining:
+        return full
+    # Something will be left out: the "(... N earlier omitted)" line is
+    # part of the section and is paid for up front.
+    marker = f"(... {len(section.items)} earlier omitted)"
+    base = estimate_tokens(section.render()) + 1 + estimate_tokens(marker) + 1
+    if base > remaining:
+        return ""
+    kept: list[str] = []
+    spent = base
+    for item in reversed(section.items):
+        cost = estimate_tokens(item) + 1
+        if spent + cost > remaining:
+            break
+        kept.append(item)
+        spent += cost
+    if not kept:
+        return ""
+    kept.reverse()
+    return section.render(kept, omitted=len(section.items) - len(kept))
@@ -8,7 +8,7 @@ def run_agent_review(agent, final_result):
         "final_suspicions": agent.memory.suspicion.scores,
         "confirmed_roles": agent.memory.confirmed_roles,
         "vote_history": agent.vote_history,
-        "key_events": agent.memory.events[-10:],
+        "key_events": agent.memory.visible_events(10),
     }
 
     prompt = build_review_prompt(context)
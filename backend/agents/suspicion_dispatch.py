@@ -0,0 +1,154 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from itertools import groupby
+from typing import Callable
+
+from agents import suspicion_rules
+from agents.suspicion_models.base import BaseSuspicionModel
+from agents.suspicion_models.seer import SeerSuspicionModel
+from agents.suspicion_models.villager import VillagerSuspicionModel
+from agents.suspicion_models.werewolf import WerewolfSuspicionModel
+
+ROLE_MODELS = {
+    "SEER": SeerSuspicionModel,
+    "WEREWOLF": WerewolfSuspicionModel,
+    "VILLAGER": VillagerSuspicionModel,
+    "WITCH": VillagerSuspicionModel,
+    "GUARD": VillagerSuspicionModel,
+}
+
+# Model hook per event type.
+MODEL_HOOKS = {"SPEECH": "on_speech", "VOTE": "on_vote", "DEATH": "on_death"}
+
+# Private events that still update the players allowed to see them.
+PRIVATE_TYPES = frozenset({"SEER_RESULT"})
+
+Handler = Callable[[list[dict], frozenset | None], None]
+
+
+class SuspicionDispatcher:
+    """
+    Routes game events to suspicion updates.
+
+    Built once per game (configure_game): the table maps each event type
+    to its handlers, namely the batch rule kernel on the game's
+    SuspicionMatrix plus every role model that implements the matching
+    hook, bound to the agents using it. Dispatching is then one lookup
+    per event. Inside `batch()` events are queued and routed when the
+    block exits, consecutive events of one type going to each handler
+    together.
+    """
+
+    def __init__(self, matrix, agents: dict, roles: dict[str, str]) -> None:
+        self.matrix = matrix
+        self._players = frozenset(roles)
+        self._agents = {pid: agent for pid, agent in agents.items() if hasattr(agent, "memory")}
+        self._routes: dict[str, list[Handler]] = {
+            "SPEECH": [self._rule_speech],
+            "VOTE": [self._rule_vote],
+            "DEATH": [self._rule_death],
+            "SEER_RESULT": [self._seer_result],
+        }
+        self._pending: list[tuple[dict, frozenset | None]] | None = None
+
+        models: dict[type, BaseSuspicionModel] = {}
+        observers: dict[tuple[str, type], list] = defaultdict(list)
+        for pid, agent in self._agents.items():
+            model_cls = ROLE_MODELS.get(roles.get(pid))
+            if model_cls is None:
+                continue
+            models.setdefault(model_cls, model_cls())
+            for event_type, hook in MODEL_HOOKS.items():
+                # Skip hooks the model leaves as the base no-op.
+                if getattr(model_cls, hook) is not getattr(BaseSuspicionModel, hook):
+                    observers[(event_type, model_cls)].append(agent)
+        for (event_type, model_cls), group in observers.items():
+            hook = getattr(models[model_cls], MODEL_HOOKS[event_type])
+            self._routes[event_type].append(self._model_handler(event_type, hook, group))
+
+    def dispatch(self, event: dict, visible_to=None) -> None:
+        event_type = event.get("type")
+        if event_type not in self._routes:
+            return
+        if visible_to is not None and event_type not in PRIVATE_TYPES:
+            return
+        scope = frozenset(visible_to) if visible_to is not None else None
+        if self._pending is not None:
+            self._pending.append((event, scope))
+            return
+        for handler in self._routes[event_type]:
+            handler([event], scope)
+
+    @contextmanager
+    def batch(self):
+        """Queue events for the whole block (e.g. a phase) and route them at the end."""
+        if self._pending is not None:
+            yield
+            return
+        self._pending = []
+        try:
+            yield
+        finally:
+            pending, self._pending = self._pending, None
+            self._flush(pending)
+
+    def _flush(self, pending: list[tuple[dict, frozenset | None]]) -> None:
+        for (event_type, scope), run in groupby(pending, key=lambda item: (item[0].get("type"), item[1])):
+            events = [event for event, _ in run]
+            for handler in self._routes[event_type]:
+                handler(events, scope)
+
+    def _rule_speech(self, events: list[dict], scope) -> None:
+        for event in events:
+            speaker = event.get("playerId")
+            if speaker in self._players:
+                suspicion_rules.apply_speech(self.matrix, speaker, event.get("text") or "")
+
+    def _rule_vote(self, events: list[dict], scope) -> None:
+        for event in events:
+            voter, target = event.get("from"), event.get("to")
+            if voter in self._players and target in self._players:
+                suspicion_rules.apply_vote(self.matrix, voter, target)
+
+    def _rule_death(self, events: list[dict], scope) -> None:
+        for event in events:
+            if event.get("playerId") in self._players:
+                suspicion_rules.apply_death(self.matrix, event["playerId"])
+
+    def _seer_result(self, events: list[dict], scope) -> None:
+        seers = [pid for pid in scope or () if pid in self._agents]
+        if not seers:
+            return
+        for event in events:
+            target, role = event.get("target"), event.get("role")
+            if target not in self._players:
+                continue
+            suspicion_rules.apply_seer_check(self.matrix, seers, target, role)
+            if role == "WEREWOLF":
+                for pid in seers:
+                    self._agents[pid].memory.confirmed_roles[target] = "WEREWOLF"
+
+    def _model_handler(self, event_type: str, hook, observers: list) -> Handler:
+        players = self._players
+
+        if event_type == "SPEECH":
+            def handle(events, scope):
+                for event in events:
+                    speaker = event.get("playerId")
+                    if speaker in players:
+                        for observer in observers:
+                            hook(observer, speaker, event.get("text") or "")
+        elif event_type == "VOTE":
+            def handle(events, scope):
+                for event in events:
+                    voter, target = event.get("from"), event.get("to")
+                    if voter in players and target in players:
+                        for observer in observers:
+                            hook(observer, voter, target)
+        else:
+            def handle(events, scope):
+                for event in events:
+                    if event.get("playerId") in players:
+                        for observer in observers:
+                            hook(observer, event["playerId"])
+        return handle
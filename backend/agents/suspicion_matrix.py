@@ -0,0 +1,147 @@
+from collections.abc import MutableMapping
+
+import numpy as np
+
+
+class SuspicionMatrix:
+    """
+    Suspicion scores for one game as an observers x targets float matrix.
+
+    Row i holds what observer i thinks of every target; `touched` marks
+    entries that have been scored at least once, so per-agent views keep
+    the old dict semantics (only scored players show up). Update kernels
+    work on whole columns or masks so one event updates every observer at
+    once. Unknown observers/targets are appended on first use.
+    """
+
+    def __init__(self, observers=(), targets=None) -> None:
+        self.observers: list = list(observers)
+        self.targets: list = list(self.observers if targets is None else targets)
+        self._rows = {pid: i for i, pid in enumerate(self.observers)}
+        self._cols = {pid: j for j, pid in enumerate(self.targets)}
+        shape = (max(len(self.observers), 1), max(len(self.targets), 1))
+        self.scores = np.zeros(shape, dtype=np.float64)
+        self.touched = np.zeros(shape, dtype=bool)
+
+    def view(self, observer) -> "SuspicionView":
+        return SuspicionView(self, self.row(observer))
+
+    def row(self, observer) -> int:
+        i = self._rows.get(observer)
+        if i is None:
+            i = len(self.observers)
+            self.observers.append(observer)
+            self._rows[observer] = i
+            self._grow(len(self.observers), self.scores.shape[1])
+        return i
+
+    def col(self, target, create: bool = True) -> int | None:
+        j = self._cols.get(target)
+        if j is None and create:
+            j = len(self.targets)
+            self.targets.append(target)
+            self._cols[target] = j
+            self._grow(self.scores.shape[0], len(self.targets))
+        return j
+
+    def observer_mask(self, exclude=(), only=None) -> np.ndarray:
+        """Bool mask over rows: every observer (or just `only`) minus `exclude`."""
+        mask = np.zeros(self.scores.shape[0], dtype=bool)
+        if only is None:
+            mask[:len(self.observers)] = True
+        else:
+            for pid in only:
+                i = self._rows.get(pid)
+                if i is not None:
+                    mask[i] = True
+        for pid in exclude:
+            i = self._rows.get(pid)
+            if i is not None:
+                mask[i] = False
+        return mask
+
+    def column(self, target) -> np.ndarray:
+        j = self.col(target, create=False)
+        if j is None:
+            return np.zeros(self.scores.shape[0])
+        return self.scores[:, j]
+
+    # Kernels: every observer selected by `rows` (a bool mask) at once.
+
+    def add_column(self, target, delta, rows: np.ndarray) -> None:
+        """scores[rows, target] += delta; `delta` is a scalar or per-row array."""
+        j = self.col(target)
+        if np.ndim(delta):
+            delta = np.asarray(delta)[rows]
+        self.scores[rows, j] += delta
+        self.touched[rows, j] = True
+
+    def set_column(self, target, value: float, rows: np.ndarray) -> None:
+        j = self.col(target)
+        self.scores[rows, j] = value
+        self.touched[rows, j] = True
+
+    def add_where(self, mask: np.ndarray, delta: float) -> None:
+        """scores[mask] += delta for a full observers x targets mask."""
+        self.scores[mask] += delta
+        self.touched[mask] = True
+
+    def top_k(self, row: int, k: int) -> list[tuple[object, float]]:
+        cols = np.flatnonzero(self.touched[row])
+        if k <= 0 or not len(cols):
+            return []
+        values = self.scores[row, cols]
+        if len(cols) > k:
+            part = np.argpartition(-values, k - 1)[:k]
+            cols, values = cols[part], values[part]
+        order = np.lexsort((cols, -values))
+        return [(self.targets[cols[i]], float(values[i])) for i in order]
+
+    def _grow(self, rows: int, cols: int) -> None:
+        old_rows, old_cols = self.scores.shape
+        if rows <= old_rows and cols <= old_cols:
+            return
+        # Double to keep appends amortised O(1).
+        shape = (max(rows, old_rows * 2 if rows > old_rows else old_rows),
+                 max(cols, old_cols * 2 if cols > old_cols else old_cols))
+        scores = np.zeros(shape, dtype=np.float64)
+        touched = np.zeros(shape, dtype=bool)
+        scores[:old_rows, :old_cols] = self.scores
+        touched[:old_rows, :old_cols] = self.touched
+        self.scores, self.touched = scores, touched
+
+
+class SuspicionView(MutableMapping):
+    """One observer's row as a dict-like {target: score} of scored targets."""
+
+    def __init__(self, matrix: SuspicionMatrix, row: int) -> None:
+        self._matrix = matrix
+        self._row = row
+
+    def __getitem__(self, target) -> float:
+        j = self._matrix.col(target, create=False)
+        if j is None or not self._matrix.touched[self._row, j]:
+            raise KeyError(target)
+        return float(self._matrix.scores[self._row, j])
+
+    def __setitem__(self, target, value: float) -> None:
+        j = self._matrix.col(target)
+        self._matrix.scores[self._row, j] = value
+        self._matrix.touched[self._row, j] = True
+
+    def __delitem__(self, target) -> None:
+        j = self._matrix.col(target, create=False)
+        if j is None or not self._matrix.touched[self._row, j]:
+            raise KeyError(target)
+        self._matrix.scores[self._row, j] = 0.0
+        self._matrix.touched[self._row, j] = False
+
+    def __iter__(self):
+        targets = self._matrix.targets
+        return (targets[j] for j in np.flatnonzero(self._matrix.touched[self._row]))
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._matrix.touched[self._row]))
+
+    def __repr__(self) -> str:
+        return repr(dict(self.items()))
@@ -6,12 +6,19 @@
     if speaker_id == observer.player_id:
         return
 
+    delta = _speech_delta(content)
+    if delta:
+        observer.memory.suspicion.add(speaker_id, delta)
+
+
+def _speech_delta(content):
     # Simple keyword heuristics.
+    delta = 0.0
     if "whatever" in content or "don't know" in content:
-        observer.memory.suspicion.add(speaker_id, +0.2)
-
+        delta += 0.2
     if "I think" in content and "logic" in content:
-        observer.memory.suspicion.add(speaker_id, -0.1)
+        delta -= 0.1
+    return delta
 
 
 def on_vote(observer, voter_id, target_id):
@@ -39,4 +46,30 @@ def on_player_killed(observer, dead_id):
     if observer.memory.suspicion.get(dead_id) < -0.5:
         for pid, score in observer.memory.suspicion.scores.items():
             if score > 0.5:
-                observer.memory.suspicion.add(pid, +0.2)
\ No newline at end of file
+                observer.memory.suspicion.add(pid, +0.2)
+
+
+# Batch forms of the rules above for a game's SuspicionMatrix: one event
+# updates every observer's row at once.
+
+def apply_speech(matrix, speaker_id, content):
+    delta = _speech_delta(content)
+    if delta:
+        matrix.add_column(speaker_id, delta, matrix.observer_mask(exclude=(speaker_id,)))
+
+
+def apply_vote(matrix, voter_id, target_id):
+    rows = matrix.observer_mask(exclude=(voter_id,))
+    matrix.add_column(voter_id, +0.1, rows)
+    matrix.add_column(voter_id, -0.2, rows & (matrix.column(target_id) > 0.5))
+
+
+def apply_seer_check(matrix, observer_ids, target_id, result):
+    # Scores only; the caller records confirmed_roles for WEREWOLF results.
+    rows = matrix.observer_mask(only=observer_ids)
+    matrix.set_column(target_id, 5.0 if result == "WEREWOLF" else -3.0, rows)
+
+
+def apply_death(matrix, dead_id):
+    rows = matrix.observer_mask() & (matrix.column(dead_id) < -0.5)
+    matrix.add_where(rows[:, None] & (matrix.scores > 0.5), +0.2)
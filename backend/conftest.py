@@ -0,0 +1,2 @@
+# Lets the tests under tests/ import the backend packages (agents, game,
+# llm) the same way run_server.py does. Run from backend/: python -m pytest
@@ -0,0 +1,93 @@
+"""
+Play one AI-only game in-process and write the outcome as JSON.
+
+    python -m game.cli --players 8 --seed 1 --out result.json
+
+Run from `backend/`. Engine logs go to stderr (or nowhere with --quiet).
+Pacing runs on a VirtualClock unless --real-time is given. Agents answer
+repeated prompts from the LLM response cache (see llm.cache) unless
+--no-llm-cache is given.
+"""
+import argparse
+import asyncio
+import contextlib
+import dataclasses
+import json
+import os
+import random
+import sys
+
+from agents.ai_agent import AIAgent
+from game.clock import RealClock, VirtualClock
+from game.engine import MAX_PLAYERS, MIN_PLAYERS, GameSession, configure_game, game_loop, living_player_ids
+from game.sink import RecordingSink
+from llm.client import aclose_clients
+
+
+async def play_game(player_count: int, seed: int | None = None, replay_dir: str | None = None,
+                    include_timeline: bool = False, real_time: bool = False, llm_cache: bool = True) -> dict:
+    if seed is not None:
+        random.seed(seed)
+    clock = RealClock() if real_time else VirtualClock()
+    session = GameSession("cli", sink=RecordingSink(), replay_dir=replay_dir, clock=clock)
+    configure_game(session, player_count, human_player_id=None)
+    for agent in session.agents.values():
+        if isinstance(agent, AIAgent):
+            agent.use_llm_cache = llm_cache
+    try:
+        result = await game_loop(session)
+    finally:
+        # Each game runs on its own event loop; its pooled client dies with it.
+        await aclose_clients()
+    summary = {
+        "result": result,
+        "playerCount": player_count,
+        "seed": seed,
+        "gameId": session.game.get("replay_id"),
+        "roles": dict(session.roles),
+        "personalities": {
+            pid: dataclasses.asdict(agent.personality)
+            for pid, agent in session.agents.items()
+            if hasattr(agent, "personality")
+        },
+        "survivors": living_player_ids(session),
+        "actionLog": session.game["action_log"],
+    }
+    if include_timeline:
+        summary["timeline"] = session.game["timeline"]
+    return summary
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Play a headless AI-only werewolf game.")
+    parser.add_argument("--players", type=int, default=8, help=f"{MIN_PLAYERS}-{MAX_PLAYERS}")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--out", default="-", help="output file, '-' for stdout")
+    parser.add_argument("--replay-dir", default=None, help="also write the on-disk replay log here")
+    parser.add_argument("--timeline", action="store_true", help="include the public timeline")
+    parser.add_argument("--real-time", action="store_true", help="keep live-table pacing")
+    parser.add_argument("--quiet", action="store_true", help="discard engine logs")
+    parser.add_argument("--no-llm-cache", action="store_true", help="always query the LLM")
+    args = parser.parse_args(argv)
+    if not MIN_PLAYERS <= args.players <= MAX_PLAYERS:
+        parser.error(f"--players must be between {MIN_PLAYERS} and {MAX_PLAYERS}")
+
+    log_target = open(os.devnull, "w") if args.quiet else sys.stderr
+    with contextlib.redirect_stdout(log_target):
+        summary = asyncio.run(play_game(
+            args.players, args.seed, args.replay_dir, args.timeline, args.real_time, not args.no_llm_cache,
+        ))
+    if args.quiet:
+        log_target.close()
+
+    text = json.dumps(summary, ensure_ascii=False, indent=2)
+    if args.out == "-":
+        print(text)
+    else:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
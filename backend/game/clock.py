@@ -0,0 +1,64 @@
+import asyncio
+import time
+from typing import Protocol
+
+
+class Clock(Protocol):
+    """All engine pacing goes through a clock so simulations can skip it."""
+
+    def now(self) -> float: ...
+
+    async def sleep(self, seconds: float) -> None: ...
+
+    async def wait(self, futures: list[asyncio.Future], timeout: float | None) -> bool:
+        """Wait until every future is done or `timeout` passes; True if all finished."""
+        ...
+
+
+class RealClock:
+    """Wall-clock pacing for live tables."""
+
+    def now(self) -> float:
+        return time.monotonic()
+
+    async def sleep(self, seconds: float) -> None:
+        await asyncio.sleep(seconds)
+
+    async def wait(self, futures: list[asyncio.Future], timeout: float | None) -> bool:
+        if not futures:
+            return True
+        _done, pending = await asyncio.wait(futures, timeout=timeout)
+        return not pending
+
+
+class VirtualClock:
+    """
+    Simulated time: `sleep` advances `now()` by the requested amount and
+    only yields to the event loop, so a paced game finishes as fast as its
+    agents can decide. Concurrent sleepers are not ordered against each
+    other; the engine only sleeps from one task at a time.
+    """
+
+    def __init__(self, start: float = 0.0) -> None:
+        self._now = start
+
+    def now(self) -> float:
+        return self._now
+
+    async def sleep(self, seconds: float) -> None:
+        if seconds > 0:
+            self._now += seconds
+        await asyncio.sleep(0)
+
+    async def wait(self, futures: list[asyncio.Future], timeout: float | None) -> bool:
+        # Whatever is ready after one turn of the loop counts; otherwise the
+        # deadline is reached instantly. Without a deadline wait for real.
+        if timeout is None:
+            if futures:
+                await asyncio.wait(futures)
+            return True
+        await asyncio.sleep(0)
+        if all(future.done() for future in futures):
+            return True
+        self._now += timeout
+        return False
@@ -0,0 +1,119 @@
+import json
+import zlib
+
+from game.events import Event
+
+try:
+    import msgpack
+except ImportError:  # optional: pip install msgpack
+    msgpack = None
+
+# Frames at least this large are deflated when the client asked for it.
+COMPRESS_THRESHOLD = 1024
+_DEFLATED = 0x01
+
+
+def _plain(obj):
+    if isinstance(obj, Event):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+class JsonCodec:
+    """UTF-8 JSON text frames; the default for every client."""
+
+    name = "json"
+    id = 0
+    binary = False
+
+    def encode(self, obj) -> str:
+        if isinstance(obj, Event):
+            return obj.encoded(self)
+        return self.encode_plain(obj)
+
+    def encode_plain(self, obj) -> str:
+        return json.dumps(obj, ensure_ascii=False, default=_plain)
+
+    def decode(self, data: str | bytes):
+        return json.loads(data)
+
+
+class MsgpackCodec:
+    """Binary MessagePack frames (needs the optional `msgpack` package)."""
+
+    name = "msgpack"
+    id = 1
+    binary = True
+
+    def encode(self, obj) -> bytes:
+        if isinstance(obj, Event):
+            return obj.encoded(self)
+        return self.encode_plain(obj)
+
+    def encode_plain(self, obj) -> bytes:
+        return msgpack.packb(obj, use_bin_type=True, default=_plain)
+
+    def decode(self, data: bytes):
+        return msgpack.unpackb(data, raw=False)
+
+
+class FramedCodec:
+    """
+    Binary wire frames over a base codec, for clients that negotiated
+    msgpack and/or compression. Byte 0 is `base.id << 1 | deflated`; the
+    rest is the base encoding, zlib-deflated when it is at least
+    `threshold` bytes (never when `threshold` is None). Framed bytes are
+    cached on events like any other encoding.
+    """
+
+    binary = True
+
+    def __init__(self, base: JsonCodec | MsgpackCodec, threshold: int | None = COMPRESS_THRESHOLD) -> None:
+        self.base = base
+        self.threshold = threshold
+        self.name = f"{base.name}+deflate{threshold}" if threshold is not None else f"{base.name}+framed"
+
+    def encode(self, obj) -> bytes:
+        if isinstance(obj, Event):
+            return obj.encoded(self)
+        return self.encode_plain(obj)
+
+    def encode_plain(self, obj) -> bytes:
+        payload = self.base.encode(obj)
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        header = self.base.id << 1
+        if self.threshold is not None and len(payload) >= self.threshold:
+            return bytes((header | _DEFLATED,)) + zlib.compress(payload)
+        return bytes((header,)) + payload
+
+    def decode(self, data: bytes):
+        payload = data[1:]
+        if data[0] & _DEFLATED:
+            payload = zlib.decompress(payload)
+        return self.base.decode(payload)
+
+
+JSON = JsonCodec()
+CODECS = {JSON.name: JSON}
+if msgpack is not None:
+    CODECS[MsgpackCodec.name] = MsgpackCodec()
+
+
+def get_codec(name: str | None) -> JsonCodec | MsgpackCodec:
+    """Codec by name; unknown names and uninstalled codecs raise ValueError."""
+    codec = CODECS.get(name or JSON.name)
+    if codec is None:
+        raise ValueError(f"unsupported codec: {name}")
+    return codec
+
+
+def wire_codec(encoding: str | None = None, compress: bool = False) -> JsonCodec | FramedCodec:
+    """
+    The codec for one client's socket. Plain JSON stays on text frames;
+    anything else is framed. An unavailable encoding falls back to JSON.
+    """
+    base = CODECS.get(encoding or JSON.name, JSON)
+    if base is JSON and not compress:
+        return JSON
+    return FramedCodec(base, COMPRESS_THRESHOLD if compress else None)
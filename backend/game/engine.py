@@ -0,0 +1,1147 @@
+import asyncio
+import random
+import time
+from collections import Counter
+from pathlib import Path
+from types import MappingProxyType
+
+from agents.ai_agent import AIAgent
+from agents.batch_vote import vote_batches
+from agents.human_agent import HumanAgent
+from agents.memory import SuspicionTable
+from agents.personality import Personality
+from agents.suspicion_dispatch import SuspicionDispatcher
+from agents.suspicion_matrix import SuspicionMatrix
+from game.clock import Clock, RealClock
+from game.event_log import EventLog
+from game.events import (
+    Death,
+    Event,
+    NightActionAck,
+    NightSkill,
+    Phase,
+    SeerResult,
+    SheriffVote,
+    Speech,
+    SpeechDelta,
+    SpeechStart,
+    Thinking,
+    Vote,
+    VoteEnd,
+    VoteTie,
+    as_event,
+)
+from game.replay_chunks import iter_replay_chunks, replay_manifest
+from game.inputs import InputDeadlines, SeatInputs
+from game.registry import PlayerRegistry
+from game.replay_log import ReplayWriter
+from game.roles import Role
+from game.sink import EventSink, RecordingSink
+from game.speech import SpeechSanitizer, SpeechStream
+
+MIN_PLAYERS = 5
+MAX_PLAYERS = 12
+AI_DECISION_CONCURRENCY = 8
+STREAM_AI_SPEECH = True
+# Start the next AI speaker's generation while the current speech is
+# announced and paced, and (speculatively) while a human speaker types.
+PIPELINE_DAY_SPEECHES = True
+SPECULATE_AFTER_HUMAN = True
+SKIPPED_SPEECH = "\uFF08\u8DF3\u8FC7\uFF09"
+# Opt-in: decide VOTE / SHERIFF for groups of AI voters that share their
+# private knowledge with one LLM call per group (see agents.batch_vote).
+BATCH_AI_VOTES = False
+REPLAY_COMPRESS = True
+# Roles that act at night (and so are waited for when a human holds them).
+NIGHT_ROLES = frozenset({"WEREWOLF", "SEER", "GUARD", "WITCH"})
+
+
+def new_game_state(human_player_id: str | None = "P1") -> dict:
+    return {
+        "tick": 0,
+        "timeline": [],
+        "action_log": [],
+        "phase": "INIT",
+        "votes": {},
+        "sheriff_votes": {},
+        "sheriff_id": None,
+        "night": 0,
+        "day": 0,
+        "current_speaker": None,
+        "pending_speech": {},
+        "last_guard_target": None,
+        "last_night_deaths": [],
+        "potions": {"save": True, "poison": True},
+        "night_actions": {},
+        "human_player_id": human_player_id,
+        "replay_id": None,
+        "replay_streams": None,
+    }
+
+
+class GameSession:
+    """
+    One table (room): its players, roles, agents, game state
+    (timeline, action log, votes, ...) and the sink its events go to.
+    Replays are written under `replay_dir` when one is given; all pacing
+    goes through `clock` (a VirtualClock makes simulations instant).
+    """
+
+    def __init__(self, room_id: str, sink: EventSink | None = None, replay_dir: str | Path | None = None,
+                 clock: Clock | None = None, deadlines: InputDeadlines | None = None) -> None:
+        self.room_id = room_id
+        self.sink: EventSink = sink if sink is not None else RecordingSink()
+        self.clock: Clock = clock if clock is not None else RealClock()
+        self.deadlines = deadlines or InputDeadlines()
+        self.inputs = SeatInputs(self.clock)
+        self.replay_dir = replay_dir
+        self.players = [{"id": "P1", "name": "P1", "alive": True}]
+        self.roles = {}
+        self.registry = PlayerRegistry(self.players, self.roles)
+        self.agents = {}
+        self.event_log = EventLog()
+        self.suspicion = SuspicionMatrix()
+        self.dispatcher = SuspicionDispatcher(self.suspicion, {}, {})
+        self.sanitize_speech = SpeechSanitizer(self.registry.alive)
+        self._context_key = None
+        self._context_base = None
+        self.replay: ReplayWriter | None = None
+        self.game_task: asyncio.Task | None = None
+        self.game = new_game_state()
+        self.game.update({
+            "configured": False,
+            "player_count": 1,
+            "lock": asyncio.Lock(),
+        })
+
+    def start(self) -> None:
+        if self.game_task and not self.game_task.done():
+            self.game_task.cancel()
+        self.game_task = asyncio.create_task(game_loop(self))
+
+    def stop(self) -> None:
+        if self.game_task and not self.game_task.done():
+            self.game_task.cancel()
+
+    def open_replay(self) -> ReplayWriter | None:
+        self.close_replay()
+        if self.replay_dir is None:
+            return None
+        game_id = f"{self.room_id}-{time.strftime('%Y%m%d-%H%M%S')}-{random.getrandbits(24):06x}"
+        self.replay = ReplayWriter(self.replay_dir, game_id)
+        return self.replay
+
+    def close_replay(self, result: str | None = None, writer: ReplayWriter | None = None) -> None:
+        """
+        Close the current replay, or only `writer` if given: a game that
+        was replaced by a restart must not close its successor's log.
+        """
+        if writer is not None:
+            writer.close(result)
+            if self.replay is writer:
+                self.replay = None
+        elif self.replay:
+            self.replay.close(result)
+            self.replay = None
+
+
+def reset_game_state(session: GameSession) -> None:
+    session.game.update(new_game_state(session.game.get("human_player_id", "P1")))
+
+
+def build_roles(player_count: int) -> list[str]:
+    wolves = max(2, player_count // 3)
+    roles = ["WEREWOLF"] * wolves
+    roles += ["SEER", "WITCH", "GUARD"]
+    remaining = player_count - len(roles)
+    if remaining < 1:
+        remaining = 1
+    roles += ["VILLAGER"] * remaining
+    roles = roles[:player_count]
+    random.shuffle(roles)
+    return roles
+
+
+def configure_game(session: GameSession, player_count: int, human_player_id: str | None = "P1") -> None:
+    if player_count < MIN_PLAYERS or player_count > MAX_PLAYERS:
+        raise ValueError("invalid player_count")
+
+    session.players = [{"id": "P1", "name": "P1", "alive": True}]
+    for i in range(2, player_count + 1):
+        session.players.append({"id": f"P{i}", "name": f"P{i}", "alive": True})
+
+    role_list = build_roles(player_count)
+    session.roles = {player["id"]: role_list[idx] for idx, player in enumerate(session.players)}
+    session.registry = PlayerRegistry(session.players, session.roles)
+
+    session.agents = {}
+    session.event_log = EventLog()
+    player_ids = [p["id"] for p in session.players]
+    session.suspicion = SuspicionMatrix(player_ids)
+    for player in session.players:
+        pid = player["id"]
+        if human_player_id and pid == human_player_id:
+            session.agents[pid] = HumanAgent(pid)
+            continue
+        role = Role[session.roles[pid]]
+        personality = Personality(
+            aggressiveness=round(random.uniform(0.2, 0.9), 2),
+            deception=round(random.uniform(0.2, 0.9), 2),
+            logic=round(random.uniform(0.2, 0.9), 2),
+            tone=random.choice(["cautious", "bold", "skeptical", "warm", "cold"]),
+            quirk=random.choice([
+                "asks short questions",
+                "speaks in concise points",
+                "prefers evidence",
+                "focuses on contradictions",
+                "avoids overcommitting",
+            ]),
+        )
+        agent = AIAgent(pid, role, personality=personality)
+        agent.memory.alive_players = {p["id"] for p in session.players}
+        agent.memory.attach(session.event_log, pid)
+        agent.memory.suspicion = SuspicionTable(session.suspicion, pid)
+        agent.sanitize_speech = session.sanitize_speech
+        session.agents[pid] = agent
+
+    wolf_ids = set(session.registry.with_role("WEREWOLF"))
+    for pid in wolf_ids:
+        if pid in session.agents:
+            session.agents[pid].wolf_team = wolf_ids
+    session.dispatcher = SuspicionDispatcher(session.suspicion, session.agents, session.roles)
+    session.sanitize_speech.update(player_ids)
+
+    session.game["human_player_id"] = human_player_id
+    reset_game_state(session)
+    session.game["configured"] = True
+    session.game["player_count"] = player_count
+
+
+def living_player_ids(session: GameSession) -> tuple[str, ...]:
+    return session.registry.alive
+
+
+def mark_dead(session: GameSession, player_id: str) -> None:
+    if session.registry.mark_dead(player_id):
+        session.sanitize_speech.update(session.registry.alive)
+    for agent in session.agents.values():
+        if hasattr(agent, "memory"):
+            agent.memory.alive_players.discard(player_id)
+
+
+def check_win(session: GameSession) -> str | None:
+    alive_wolves = len(session.registry.alive_with_role("WEREWOLF"))
+    alive_others = len(session.registry.alive) - alive_wolves
+
+    if not alive_wolves:
+        return "VILLAGERS_WIN"
+    if alive_wolves >= alive_others:
+        return "WEREWOLVES_WIN"
+    return None
+
+
+def _event_player_ids(session: GameSession, event: dict) -> tuple[str, ...]:
+    refs = (event.get("playerId"), event.get("from"), event.get("to"), event.get("target"))
+    return tuple(dict.fromkeys(pid for pid in refs if isinstance(pid, str) and pid in session.roles))
+
+
+def _human_seats(session: GameSession, roles=None) -> list[str]:
+    return [
+        pid for pid in session.registry.alive
+        if session.sink.is_connected(pid) and (roles is None or session.registry.role_of(pid) in roles)
+    ]
+
+
+async def _await_inputs(session: GameSession, kind: str, timeout: float | None) -> dict:
+    # The server abandons seats on disconnect; catch any that left before
+    # their slot was opened.
+    for seat in session.inputs.seats(kind):
+        if not session.sink.is_connected(seat):
+            session.inputs.abandon(seat)
+    return await session.inputs.gather(kind, timeout)
+
+
+def observe_event(session: GameSession, event: Event, visible_to=None) -> None:
+    # Stored once in the shared log; agents catch up through their cursor.
+    session.event_log.append(event, _event_player_ids(session, event), visible_to)
+    session.dispatcher.dispatch(event, visible_to)
+
+
+async def send_event(session: GameSession, event: Event | dict) -> None:
+    event = as_event(event)
+    async with session.game["lock"]:
+        tick = session.game["tick"]
+        session.game["tick"] += 1
+        session.game["timeline"].append({"tick": tick, "event": event.to_dict()})
+
+    if event.get("type") == "SPEECH":
+        print(f"[SPEECH] {event.get('playerId')}: {event.get('text')}")
+
+    if session.replay:
+        session.replay.append(tick, "event", event)
+    observe_event(session, event)
+    await session.sink.broadcast(event)
+
+
+async def send_private(session: GameSession, player_id: str, event: Event | dict) -> None:
+    event = as_event(event)
+    if event.get("type") == "SPEECH":
+        print(f"[SPEECH][private] {player_id}: {event.get('text')}")
+    if session.replay:
+        session.replay.append(session.game["tick"], "event", event, visible_to=(player_id,))
+    observe_event(session, event, visible_to=(player_id,))
+    await session.sink.send_to(player_id, event)
+
+
+def record_action(session: GameSession, action: dict) -> None:
+    entry = {
+        "phase": session.game.get("phase"),
+        "night": session.game.get("night"),
+        "day": session.game.get("day"),
+    }
+    entry.update(action)
+    session.game["action_log"].append(entry)
+    if session.replay:
+        session.replay.append(session.game["tick"], "action", entry, visible_to=())
+
+
+def is_player_mode(session: GameSession) -> bool:
+    return bool(session.game.get("human_player_id"))
+
+
+def append_replay_event(session: GameSession, event: Event | dict) -> None:
+    event = as_event(event)
+    tick = session.game["tick"]
+    session.game["tick"] += 1
+    session.game["timeline"].append({"tick": tick, "event": event.to_dict()})
+    if session.replay:
+        # Replay-only narration (player mode) stays hidden from players.
+        session.replay.append(tick, "event", event, visible_to=())
+
+
+def _shared_context(session: GameSession) -> MappingProxyType:
+    """
+    The part of the agent context that is the same for every agent,
+    built once and reused until a death or a game-state change.
+    """
+    game = session.game
+    last_deaths = tuple(game.get("last_night_deaths", ()))
+    potions = game.get("potions", {})
+    key = (
+        session.registry, session.registry.version, game.get("night"), game.get("day"),
+        last_deaths, game.get("last_guard_target"), tuple(potions.items()),
+    )
+    if key != session._context_key:
+        session._context_key = key
+        session._context_base = MappingProxyType({
+            "alive_players": session.registry.alive,
+            "dead_players": session.registry.dead,
+            "night": game.get("night"),
+            "day": game.get("day"),
+            "last_night_deaths": last_deaths,
+            "last_guard_target": game.get("last_guard_target"),
+            "potions": dict(potions),
+        })
+    return session._context_base
+
+
+def build_agent_context(session: GameSession, player_id: str, phase: str) -> dict:
+    context = {
+        "phase": phase,
+        "player_id": player_id,
+        "role": session.registry.role_of(player_id),
+        **_shared_context(session),
+    }
+    agent = session.agents.get(player_id)
+    if agent and getattr(agent, "wolf_team", None):
+        context["wolf_team"] = sorted(list(agent.wolf_team))
+    return context
+
+
+async def _agent_act(agent: AIAgent, phase: str, context: dict | None = None) -> dict:
+    return await agent.aact(phase, context)
+
+
+async def _agent_speak(session: GameSession, agent, player_id: str, context: dict, forward=None) -> dict:
+    """
+    Day speech. With STREAM_AI_SPEECH the speech is forwarded to clients as
+    SPEECH_DELTA events while it is generated; these are transient (not in
+    the timeline, not observed by agents) and the caller still sends the
+    final SPEECH. Deltas are sanitized as they stream (see SpeechStream),
+    so the draft never shows text the final SPEECH would not contain.
+    `forward` replaces the default broadcast of each delta.
+    """
+    if not STREAM_AI_SPEECH or not isinstance(agent, AIAgent):
+        return await _agent_act(agent, "DAY", context)
+
+    if forward is None:
+        async def forward(delta: str) -> None:
+            await session.sink.broadcast(SpeechDelta(player_id, delta))
+
+    stream = SpeechStream(session.sanitize_speech, player_id)
+
+    async def sanitized(delta: str) -> None:
+        piece = stream.feed(delta)
+        if piece:
+            await forward(piece)
+
+    return await agent.astream_act("DAY", context, sanitized)
+
+
+class _PendingSpeech:
+    """
+    An AI speaker's day speech, generating in the background ahead of
+    their turn. The context and the prompt are built when the task first
+    runs, so they see every event logged before then. Streamed deltas are
+    held until `release` (called after the speaker's SPEECH_START) so
+    clients never see text for a speaker who has not started; `cancel`
+    drops a generation whose context went stale.
+    """
+
+    def __init__(self, session: GameSession, player_id: str) -> None:
+        self.session = session
+        self.player_id = player_id
+        self._held: list[str] | None = []
+        agent = session.agents.get(player_id)
+        self.task = asyncio.ensure_future(self._speak(agent)) if agent else None
+
+    async def _speak(self, agent) -> dict:
+        context = build_agent_context(self.session, self.player_id, "DAY")
+        return await _agent_speak(self.session, agent, self.player_id, context, self._forward)
+
+    async def _forward(self, delta: str) -> None:
+        if self._held is not None:
+            self._held.append(delta)
+        else:
+            await self.session.sink.broadcast(SpeechDelta(self.player_id, delta))
+
+    async def release(self) -> None:
+        # Deltas may keep arriving while the backlog is sent; drain until empty.
+        while self._held:
+            backlog = "".join(self._held)
+            self._held.clear()
+            await self.session.sink.broadcast(SpeechDelta(self.player_id, backlog))
+        self._held = None
+
+    async def text(self) -> str:
+        result = await self.task if self.task else {}
+        await self.release()
+        speech = result.get("speech") if isinstance(result, dict) else None
+        return self.session.sanitize_speech(speech, self.player_id) or SKIPPED_SPEECH
+
+    def cancel(self) -> None:
+        if self.task is None:
+            return
+        if not self.task.done():
+            self.task.cancel()
+        elif not self.task.cancelled():
+            self.task.exception()  # retrieved, so a failed speculation is not logged as unhandled
+
+
+async def _collect_ai_actions(session: GameSession, player_ids: list[str], phase: str) -> dict[str, dict]:
+    """
+    Ask the AI agents of `player_ids` for their `action` concurrently,
+    at most AI_DECISION_CONCURRENCY LLM calls in flight at once.
+    Players without an agent map to an empty action.
+    """
+    semaphore = asyncio.Semaphore(AI_DECISION_CONCURRENCY)
+
+    async def decide(pid: str) -> dict:
+        agent = session.agents.get(pid)
+        if not agent:
+            return {}
+        context = build_agent_context(session, pid, phase)
+        async with semaphore:
+            result = await _agent_act(agent, phase, context)
+        action = result.get("action", {}) if isinstance(result, dict) else {}
+        return action if isinstance(action, dict) else {}
+
+    actions = await asyncio.gather(*(decide(pid) for pid in player_ids))
+    return dict(zip(player_ids, actions))
+
+
+async def _collect_ai_votes(session: GameSession, player_ids: list[str], phase: str) -> dict[str, dict]:
+    """
+    _collect_ai_actions for the VOTE and SHERIFF phases. With
+    BATCH_AI_VOTES the voters are split into vote batches decided by one
+    call each, alongside the individual calls for everyone else; voters a
+    batch reply leaves out are asked individually afterwards.
+    """
+    if not BATCH_AI_VOTES:
+        return await _collect_ai_actions(session, player_ids, phase)
+
+    batches, solo = vote_batches(session.agents, player_ids)
+    context = {"phase": phase, **_shared_context(session)}
+    *decided, actions = await asyncio.gather(
+        *(batch.decide(phase, context) for batch in batches),
+        _collect_ai_actions(session, solo, phase),
+    )
+    for batch_actions in decided:
+        actions.update(batch_actions)
+    missing = [pid for pid in player_ids if pid not in actions]
+    if missing:
+        actions.update(await _collect_ai_actions(session, missing, phase))
+    return {pid: actions[pid] for pid in player_ids}
+
+
+def _valid_target(session: GameSession, target: str | None) -> str | None:
+    return target if target and session.registry.is_alive(target) else None
+
+
+def _first_alive_without_role(session: GameSession, role: str) -> str | None:
+    registry = session.registry
+    return next((pid for pid in registry.alive if registry.role_of(pid) != role), None)
+
+
+def choose_wolf_target(session: GameSession) -> str | None:
+    return _first_alive_without_role(session, "WEREWOLF")
+
+
+def choose_seer_target(session: GameSession) -> str | None:
+    return _first_alive_without_role(session, "SEER")
+
+
+def choose_guard_target(session: GameSession) -> str | None:
+    alive = living_player_ids(session)
+    if not alive:
+        return None
+    target = alive[-1]
+    if target == session.game["last_guard_target"] and len(alive) > 1:
+        target = alive[0]
+    return target
+
+
+def choose_witch_poison_target(session: GameSession) -> str | None:
+    alive_wolves = session.registry.alive_with_role("WEREWOLF")
+    return alive_wolves[0] if alive_wolves else None
+
+
+async def run_night(session: GameSession, night_idx: int) -> list:
+    registry = session.registry
+    session.game["phase"] = "NIGHT"
+    session.game["night_actions"].clear()
+    session.inputs.open("night", _human_seats(session, NIGHT_ROLES))
+    await send_event(session, Phase("NIGHT"))
+    await send_event(session, Speech("SYSTEM", "\u5929\u9ed1\u8bf7\u95ed\u773c\u3002"))
+    await send_event(session, Speech("SYSTEM", "\u591c\u665a\u9636\u6bb5\u5f00\u59cb\u3002"))
+
+    # Private prompts
+    for pid in session.registry.alive:
+        role = session.registry.role_of(pid)
+        if not session.sink.is_connected(pid):
+            continue
+        await send_private(session, pid, NightSkill(
+            player_id=pid,
+            role=role,
+            hint="Choose a target privately.",
+        ))
+
+    # AI night actions, scheduled as a dependency graph: wolves, seer and
+    # guard decide concurrently; the witch only waits for the wolf target.
+    for text in (
+        "\u72fc\u4eba\u8bf7\u8fdb\u884c\u884c\u52a8\u3002",
+        "\u9884\u8a00\u5bb6\u8bf7\u8fdb\u884c\u67e5\u9a8c\u3002",
+        "\u5b88\u536b\u8bf7\u8fdb\u884c\u5b88\u62a4\u3002",
+        "\u5973\u5deb\u8bf7\u51b3\u5b9a\u662f\u5426\u4f7f\u7528\u89e3\u836f\u3002",
+        "\u5973\u5deb\u8bf7\u51b3\u5b9a\u662f\u5426\u4f7f\u7528\u6bd2\u836f\u3002",
+    ):
+        await send_event(session, Speech("SYSTEM", text))
+
+    def ai_players(role: str) -> list[str]:
+        return [
+            pid for pid in session.registry.alive_with_role(role)
+            if pid != session.game.get("human_player_id") and pid in session.agents
+        ]
+
+    async def decide_wolves() -> str | None:
+        wolf_ids = ai_players("WEREWOLF")
+        actions = await _collect_ai_actions(session, wolf_ids, "NIGHT")
+        for pid in wolf_ids:
+            target = _valid_target(session, actions[pid].get("kill")) or choose_wolf_target(session)
+            session.game["night_actions"][pid] = {"actionType": "WEREWOLF", "target": target}
+
+        # Resolve wolf target early for witch context.
+        for pid, action in session.game["night_actions"].items():
+            if registry.role_of(pid) != "WEREWOLF" or action.get("actionType") != "WEREWOLF":
+                continue
+            target = action.get("target")
+            if registry.is_alive(target) and registry.role_of(target) != "WEREWOLF":
+                return target
+        return None
+
+    async def decide_seer_and_guard() -> None:
+        seer_ids = ai_players("SEER")
+        guard_ids = ai_players("GUARD")
+        actions = await _collect_ai_actions(session, seer_ids + guard_ids, "NIGHT")
+        for pid in seer_ids:
+            target = _valid_target(session, actions[pid].get("check")) or choose_seer_target(session)
+            session.game["night_actions"][pid] = {"actionType": "SEER", "target": target}
+        for pid in guard_ids:
+            target = _valid_target(session, actions[pid].get("guard")) or choose_guard_target(session)
+            session.game["night_actions"][pid] = {"actionType": "GUARD", "target": target}
+
+    async def decide_witch(wolves_done: asyncio.Future) -> None:
+        wolf_target_hint = await wolves_done
+        for pid in ai_players("WITCH"):
+            context = build_agent_context(session, pid, "NIGHT")
+            if wolf_target_hint:
+                context["wolf_target"] = wolf_target_hint
+            result = await _agent_act(session.agents[pid], "NIGHT", context)
+            action = result.get("action", {}) if isinstance(result, dict) else {}
+            poison_target = _valid_target(session, action.get("poison")) or None
+            if poison_target:
+                session.game["night_actions"][pid] = {"actionType": "WITCH_POISON", "target": poison_target}
+            elif action.get("save"):
+                session.game["night_actions"][pid] = {"actionType": "WITCH_SAVE", "target": None}
+
+    wolves_done = asyncio.ensure_future(decide_wolves())
+    await asyncio.gather(wolves_done, decide_seer_and_guard(), decide_witch(wolves_done))
+
+    # Human night actions: done as soon as every one is in.
+    await _await_inputs(session, "night", session.deadlines.night)
+
+    wolf_target = None
+    seer_target = None
+    guard_target = None
+    witch_save = False
+    witch_poison_target = None
+
+    for pid, action in session.game["night_actions"].items():
+        role = registry.role_of(pid)
+        action_type = action.get("actionType")
+        target = action.get("target")
+        if role == "WEREWOLF" and action_type == "WEREWOLF":
+            if registry.is_alive(target) and registry.role_of(target) != "WEREWOLF":
+                wolf_target = target
+        elif role == "SEER" and action_type == "SEER":
+            if registry.is_alive(target) and target != pid:
+                seer_target = target
+        elif role == "GUARD" and action_type == "GUARD":
+            if registry.is_alive(target):
+                if target != session.game["last_guard_target"] or len(registry.alive) <= 1:
+                    guard_target = target
+        elif role == "WITCH":
+            if action_type == "WITCH_SAVE":
+                witch_save = True
+            elif action_type == "WITCH_POISON":
+                if registry.is_alive(target) and target != pid:
+                    witch_poison_target = target
+
+    if wolf_target is None:
+        wolf_target = choose_wolf_target(session)
+    if seer_target is None:
+        seer_target = choose_seer_target(session)
+    if guard_target is None:
+        guard_target = choose_guard_target(session)
+    session.game["last_guard_target"] = guard_target
+
+    save_available = session.game["potions"]["save"]
+    poison_available = session.game["potions"]["poison"]
+
+    guard_blocks = wolf_target is not None and wolf_target == guard_target
+    wolf_death = wolf_target if wolf_target and not guard_blocks else None
+
+    if witch_save:
+        if not save_available:
+            witch_save = False
+        elif wolf_death:
+            wolf_death = None
+            session.game["potions"]["save"] = False
+        else:
+            witch_save = False
+
+    if witch_poison_target and not poison_available:
+        witch_poison_target = None
+    if witch_poison_target:
+        session.game["potions"]["poison"] = False
+
+    # Private seer result
+    if seer_target:
+        seer_result = registry.role_of(seer_target)
+        seer_player = registry.first_with_role("SEER")
+        if seer_player:
+            await send_private(session, seer_player, SeerResult(
+                target=seer_target,
+                role=seer_result,
+            ))
+
+    deaths = []
+    if wolf_death:
+        deaths.append(wolf_death)
+    if witch_poison_target:
+        deaths.append(witch_poison_target)
+
+
+    for pid, role in session.roles.items():
+        if not session.sink.is_connected(pid):
+            continue
+        if role == "WEREWOLF":
+            await send_private(session, pid, NightActionAck(
+                player_id=pid,
+                action_type="WEREWOLF",
+                target=wolf_target,
+                status="ok" if wolf_target else "rejected",
+            ))
+        elif role == "SEER":
+            await send_private(session, pid, NightActionAck(
+                player_id=pid,
+                action_type="SEER",
+                target=seer_target,
+                status="ok" if seer_target else "rejected",
+            ))
+        elif role == "GUARD":
+            await send_private(session, pid, NightActionAck(
+                player_id=pid,
+                action_type="GUARD",
+                target=guard_target,
+                status="ok" if guard_target else "rejected",
+            ))
+        elif role == "WITCH":
+            await send_private(session, pid, NightActionAck(
+                player_id=pid,
+                action_type="WITCH_SAVE",
+                target=wolf_target if witch_save else None,
+                status="ok" if witch_save else "rejected",
+            ))
+            await send_private(session, pid, NightActionAck(
+                player_id=pid,
+                action_type="WITCH_POISON",
+                target=witch_poison_target,
+                status="ok" if witch_poison_target else "rejected",
+            ))
+
+    # Record resolved night actions for end-game replay.
+    def wolf_action_status(target: str | None) -> str:
+        if not target:
+            return "rejected"
+        if target != wolf_target:
+            return "overruled"
+        if wolf_death == target:
+            return "success"
+        if guard_blocks and target == guard_target:
+            return "blocked_by_guard"
+        if witch_save and target == wolf_target:
+            return "saved_by_witch"
+        return "no_effect"
+
+    for pid in registry.with_role("WEREWOLF"):
+        action = session.game["night_actions"].get(pid, {})
+        if action.get("actionType") != "WEREWOLF":
+            continue
+        target = action.get("target")
+        record_action(session, {
+            "type": "NIGHT_ACTION",
+            "playerId": pid,
+            "role": "WEREWOLF",
+            "actionType": "WEREWOLF_KILL",
+            "target": target,
+            "status": wolf_action_status(target),
+        })
+
+    seer_player = registry.first_with_role("SEER")
+    if seer_player:
+        action = session.game["night_actions"].get(seer_player)
+        if action and action.get("actionType") == "SEER":
+            target = action.get("target")
+            ok = bool(target and registry.is_alive(target) and target != seer_player)
+            record_action(session, {
+                "type": "NIGHT_ACTION",
+                "playerId": seer_player,
+                "role": "SEER",
+                "actionType": "SEER_CHECK",
+                "target": target,
+                "status": "ok" if ok else "rejected",
+                "resultRole": registry.role_of(target) if ok else None,
+            })
+        elif seer_target:
+            record_action(session, {
+                "type": "NIGHT_ACTION",
+                "playerId": seer_player,
+                "role": "SEER",
+                "actionType": "SEER_CHECK",
+                "target": seer_target,
+                "status": "auto",
+                "resultRole": registry.role_of(seer_target),
+            })
+
+    guard_player = registry.first_with_role("GUARD")
+    if guard_player:
+        action = session.game["night_actions"].get(guard_player)
+        if action and action.get("actionType") == "GUARD":
+            target = action.get("target")
+            ok = bool(target and registry.is_alive(target))
+            status = "ok"
+            if not ok:
+                status = "rejected"
+            elif target == session.game["last_guard_target"] and len(registry.alive) > 1:
+                status = "rejected_same_target"
+            elif guard_blocks and target == guard_target:
+                status = "blocked_attack"
+            record_action(session, {
+                "type": "NIGHT_ACTION",
+                "playerId": guard_player,
+                "role": "GUARD",
+                "actionType": "GUARD_PROTECT",
+                "target": target,
+                "status": status,
+            })
+        elif guard_target:
+            status = "blocked_attack" if guard_blocks and guard_target == wolf_target else "auto"
+            record_action(session, {
+                "type": "NIGHT_ACTION",
+                "playerId": guard_player,
+                "role": "GUARD",
+                "actionType": "GUARD_PROTECT",
+                "target": guard_target,
+                "status": status,
+            })
+
+    witch_player = registry.first_with_role("WITCH")
+    if witch_player:
+        action = session.game["night_actions"].get(witch_player)
+        if action and action.get("actionType") == "WITCH_SAVE":
+            record_action(session, {
+                "type": "NIGHT_ACTION",
+                "playerId": witch_player,
+                "role": "WITCH",
+                "actionType": "WITCH_SAVE",
+                "target": wolf_target if action else None,
+                "status": "ok" if witch_save else "rejected",
+            })
+        elif action and action.get("actionType") == "WITCH_POISON":
+            target = action.get("target")
+            record_action(session, {
+                "type": "NIGHT_ACTION",
+                "playerId": witch_player,
+                "role": "WITCH",
+                "actionType": "WITCH_POISON",
+                "target": target,
+                "status": "ok" if witch_poison_target == target else "rejected",
+            })
+
+    # Public timeline summary for end-game replay.
+    def _who_did_what() -> list[str]:
+        parts = []
+        wolf_lines = []
+        for pid, role in session.roles.items():
+            if role != "WEREWOLF":
+                continue
+            action = session.game["night_actions"].get(pid, {})
+            if action.get("actionType") != "WEREWOLF":
+                continue
+            target = action.get("target")
+            if target:
+                wolf_lines.append(f"{pid}刀了{target}")
+        if wolf_lines:
+            parts.append("狼人请进行行动：" + "，".join(wolf_lines) + "。")
+
+        if seer_player:
+            target = seer_target or (session.game["night_actions"].get(seer_player, {}) or {}).get("target")
+            if target:
+                parts.append(f"预言家进行查验：{seer_player}验了{target}。")
+
+        if guard_player:
+            target = guard_target or (session.game["night_actions"].get(guard_player, {}) or {}).get("target")
+            if target:
+                parts.append(f"守卫进行守护：{guard_player}守了{target}。")
+
+        if witch_player:
+            action = session.game["night_actions"].get(witch_player, {})
+            if action.get("actionType") == "WITCH_SAVE":
+                target = wolf_target if wolf_target else "无人"
+                parts.append(f"女巫使用解药：{witch_player}救了{target}。")
+            elif action.get("actionType") == "WITCH_POISON":
+                target = action.get("target")
+                if target:
+                    parts.append(f"女巫使用毒药：{witch_player}毒了{target}。")
+        return parts
+
+    if is_player_mode(session):
+        for line in _who_did_what():
+            append_replay_event(session, Speech("SYSTEM", line))
+    else:
+        for line in _who_did_what():
+            await send_event(session, Speech("SYSTEM", line))
+    return list(dict.fromkeys(deaths))
+
+
+async def run_day(session: GameSession, day_idx: int, night_deaths: list) -> None:
+    session.game["phase"] = "DAY"
+    await send_event(session, Phase("DAY"))
+    await send_event(session, Speech("SYSTEM", "\u5929\u4eae\u4e86\u3002"))
+
+    if night_deaths:
+        report_text = f"\u6628\u591c\u6b7b\u4ea1\uff1a{'、'.join(night_deaths)}\u3002"
+    else:
+        report_text = "\u6628\u591c\u65e0\u4eba\u6b7b\u4ea1\u3002"
+    await send_event(session, Speech("SYSTEM", report_text))
+
+    with session.dispatcher.batch():
+        for player_id in night_deaths:
+            mark_dead(session, player_id)
+            await send_event(session, Death(player_id))
+
+    # Speaking order: each alive player gets a turn. With
+    # PIPELINE_DAY_SPEECHES an AI speaker starts generating as soon as the
+    # previous speech is logged, before the pacing delays and SPEECH_START,
+    # so a turn costs only the pacing when the LLM is faster than that.
+    speakers = living_player_ids(session)
+    upcoming: _PendingSpeech | None = None
+    try:
+        for i, pid in enumerate(speakers):
+            human = _is_human_speaker(session, pid)
+            if upcoming is not None and (human or upcoming.player_id != pid):
+                upcoming.cancel()
+                upcoming = None
+            if PIPELINE_DAY_SPEECHES and upcoming is None and not human:
+                upcoming = _PendingSpeech(session, pid)
+            session.game["current_speaker"] = pid
+            session.inputs.open("speech", [pid])
+            await session.clock.sleep(0.2)
+            if pid != "P1" or not session.sink.is_connected(pid):
+                await send_event(session, Thinking(pid))
+                await session.clock.sleep(0.4)
+            await send_event(session, SpeechStart(pid))
+            next_pid = speakers[i + 1] if i + 1 < len(speakers) else None
+            if human:
+                # Speculate on the next AI speaker while the human types.
+                # The generation cannot have seen the human's speech, so it
+                # is kept only if the human skipped (or left).
+                if SPECULATE_AFTER_HUMAN and next_pid and not _is_human_speaker(session, next_pid):
+                    upcoming = _PendingSpeech(session, next_pid)
+                # Wait for user input (or a disconnect); no timer unless a
+                # speech deadline is configured.
+                await _await_inputs(session, "speech", session.deadlines.speech)
+                text = session.sanitize_speech(session.game["pending_speech"].pop(pid, None))
+                text = text or SKIPPED_SPEECH
+                if upcoming is not None and text != SKIPPED_SPEECH:
+                    upcoming.cancel()
+                    upcoming = None
+            else:
+                speech = upcoming or _PendingSpeech(session, pid)
+                upcoming = None
+                await speech.release()
+                text = await speech.text()
+            await send_event(session, Speech(pid, text))
+            session.game["current_speaker"] = None
+    finally:
+        if upcoming is not None:
+            upcoming.cancel()
+
+
+def _is_human_speaker(session: GameSession, player_id: str) -> bool:
+    return player_id == session.game.get("human_player_id") and session.sink.is_connected(player_id)
+
+
+async def run_sheriff_election(session: GameSession) -> None:
+    session.game["phase"] = "SHERIFF"
+    session.game["sheriff_votes"].clear()
+    session.inputs.open("sheriff", _human_seats(session))
+    await send_event(session, Phase("SHERIFF"))
+
+    # AI sheriff votes: decide concurrently, announce in seat order.
+    alive = living_player_ids(session)
+    ai_voters = [pid for pid in alive if not session.sink.is_connected(pid)]
+    actions = await _collect_ai_votes(session, ai_voters, "SHERIFF")
+    for pid in ai_voters:
+        target = _valid_target(session, actions.get(pid, {}).get("vote"))
+        if not target:
+            target = alive[0] if alive else None
+        session.game["sheriff_votes"][pid] = target
+        await send_event(session, SheriffVote(pid, target or "ABSTAIN"))
+        record_action(session, {
+            "type": "SHERIFF_VOTE",
+            "from": pid,
+            "to": target or "ABSTAIN",
+            "source": "ai",
+        })
+
+    await _await_inputs(session, "sheriff", session.deadlines.sheriff)
+
+    tally = Counter(v for v in session.game["sheriff_votes"].values() if v)
+    if not tally:
+        await send_event(session, {"type": "SHERIFF_NONE"})
+        return
+
+    top = tally.most_common()
+    if len(top) > 1 and top[0][1] == top[1][1]:
+        await send_event(session, {"type": "SHERIFF_TIE"})
+        return
+
+    sheriff_id = top[0][0]
+    session.game["sheriff_id"] = sheriff_id
+    await send_event(session, {"type": "SHERIFF", "playerId": sheriff_id})
+
+
+async def run_vote(session: GameSession) -> str | None:
+    session.game["phase"] = "VOTE"
+    session.game["votes"].clear()
+    session.inputs.open("vote", _human_seats(session))
+    await send_event(session, Phase("VOTE"))
+    await send_event(session, Speech("SYSTEM", "\u5f00\u59cb\u6295\u7968\u3002"))
+
+    # AI votes for non-connected players: decide concurrently, announce in seat order.
+    alive = living_player_ids(session)
+    ai_voters = [pid for pid in alive if not session.sink.is_connected(pid)]
+    actions = await _collect_ai_votes(session, ai_voters, "VOTE")
+    # The votes are simultaneous; update suspicion for all of them at once.
+    with session.dispatcher.batch():
+        for pid in ai_voters:
+            target = _valid_target(session, actions.get(pid, {}).get("vote"))
+            if not target:
+                target = alive[0] if alive else None
+            session.game["votes"][pid] = target
+            agent = session.agents.get(pid)
+            if agent is not None:
+                agent.last_vote = target
+            await send_event(session, Vote(pid, target))
+            record_action(session, {
+                "type": "VOTE",
+                "from": pid,
+                "to": target,
+                "source": "ai",
+            })
+
+    # Wait for the human votes; the phase ends as soon as all are in.
+    await _await_inputs(session, "vote", session.deadlines.vote)
+    required = set(living_player_ids(session))
+
+    # Auto-vote for anyone who didn't vote.
+    missing = required - set(session.game["votes"].keys())
+    for pid in missing:
+        target = random.choice(list(required))
+        session.game["votes"][pid] = target
+        await send_event(session, Vote(pid, target))
+        record_action(session, {
+            "type": "VOTE",
+            "from": pid,
+            "to": target,
+            "source": "auto",
+        })
+
+    await send_event(session, VoteEnd())
+
+    # Defensive: drop votes from dead players.
+    session.game["votes"] = {
+        voter: target for voter, target in session.game["votes"].items() if session.registry.is_alive(voter)
+    }
+
+    if not session.game["votes"]:
+        return None
+
+    # Weighted tally with sheriff double vote
+    counts = {}
+    for voter, target in session.game["votes"].items():
+        if not target:
+            continue
+        weight = 2 if voter == session.game["sheriff_id"] else 1
+        counts[target] = counts.get(target, 0) + weight
+
+    if not counts:
+        return None
+
+    sorted_counts = sorted(counts.items(), key=lambda x: x[1], reverse=True)
+    if len(sorted_counts) > 1 and sorted_counts[0][1] == sorted_counts[1][1]:
+        await send_event(session, VoteTie())
+        return None
+
+    return sorted_counts[0][0]
+
+
+async def send_replay(session: GameSession, result: str) -> None:
+    """
+    End-of-game replay: a REPLAY_MANIFEST followed by REPLAY_CHUNK frames,
+    encoded one chunk at a time. The streams stay on the session so a
+    client can REPLAY_FETCH chunks it missed.
+    """
+    game_id = session.replay.game_id if session.replay else None
+    session.close_replay(result)
+    streams = {
+        "timeline": list(session.game["timeline"]),
+        "actionLog": list(session.game["action_log"]),
+    }
+    session.game["replay_id"] = game_id
+    session.game["replay_streams"] = streams
+    await session.sink.broadcast(replay_manifest(
+        game_id,
+        streams,
+        compress=REPLAY_COMPRESS,
+        reviews={},
+        result=result,
+        finalRoles=[
+            {"id": p["id"], "name": p["name"], "role": session.roles.get(p["id"])}
+            for p in session.players
+        ],
+    ))
+    for chunk in iter_replay_chunks(game_id, streams, compress=REPLAY_COMPRESS):
+        await session.sink.broadcast(chunk)
+        # Let the writers drain between chunks.
+        await asyncio.sleep(0)
+
+
+async def game_loop(session: GameSession) -> str | None:
+    # INIT broadcast is per-connection; gameplay starts here
+    writer = session.open_replay()
+    try:
+        return await _play_rounds(session)
+    finally:
+        # An abandoned or cancelled game still leaves a readable log.
+        if writer is not None:
+            session.close_replay(writer=writer)
+
+
+async def _play_rounds(session: GameSession) -> str | None:
+    result = None
+    max_rounds = 3
+    for round_idx in range(max_rounds):
+        if not session.sink.has_listeners():
+            break
+        print(f"[GAME] Round {round_idx} start")
+        session.game["night"] = round_idx
+        night_deaths = await run_night(session, round_idx)
+        session.game["last_night_deaths"] = list(night_deaths)
+        await session.clock.sleep(1)
+
+        session.game["day"] = round_idx + 1
+        await run_day(session, round_idx + 1, night_deaths)
+        result = check_win(session)
+        print(f"[GAME] After day {round_idx + 1}, result={result}")
+        if result:
+            break
+
+        print("[GAME] Starting vote phase")
+        execute_id = await run_vote(session)
+        print(f"[GAME] Vote ended, execute_id={execute_id}")
+        if execute_id:
+            mark_dead(session, execute_id)
+            await send_event(session, Death(execute_id))
+            await send_event(session, Speech(
+                "SYSTEM",
+                f"\u6295\u7968\u5904\u51b3\uff1a{execute_id}\u51fa\u5c40\u3002",
+            ))
+        else:
+            await send_event(session, Speech(
+                "SYSTEM",
+                "\u6295\u7968\u7ed3\u679c\u5e73\u7968\uff0c\u672c\u8f6e\u65e0\u4eba\u51fa\u5c40\u3002",
+            ))
+
+        result = check_win(session)
+        if result:
+            break
+
+    if not session.sink.has_listeners():
+        return None
+    # GAME END
+    result = result or "DRAW"
+    await send_replay(session, result)
+
+    await send_event(session, {
+        "type": "REVIEW",
+        "data": {
+            "P2": {
+                "overall_strategy": "Stay quiet early.",
+                "biggest_mistake": "Voted too fast."
+            }
+        }
+    })
+    return result
@@ -0,0 +1,67 @@
+from collections.abc import Mapping
+
+from game.codec import JSON
+
+
+class LogEntry:
+    """
+    One event in a game's log. The event is shared by every reader and
+    must not be mutated after it is appended; its JSON text is built on
+    first use and cached (on the event itself for game.events.Event, so
+    the log and the broadcast share one encoding).
+    """
+
+    __slots__ = ("seq", "event", "event_type", "player_ids", "visible_to", "_text")
+
+    def __init__(
+        self,
+        seq: int,
+        event: Mapping | None,
+        event_type: str | None = None,
+        player_ids: tuple[str, ...] = (),
+        visible_to: frozenset[str] | None = None,
+        text: str | None = None,
+    ) -> None:
+        self.seq = seq
+        self.event = event
+        self.event_type = event_type
+        self.player_ids = player_ids
+        self.visible_to = visible_to
+        self._text = text
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = JSON.encode(self.event)
+        return self._text
+
+    def visible_for(self, player_id: str | None) -> bool:
+        return self.visible_to is None or player_id in self.visible_to
+
+
+class EventLog:
+    """
+    Append-only, per-game event log. Events are stored once; agents keep a
+    cursor into it (see AgentMemory.attach) instead of private copies.
+    `visible_to` restricts private events to the given players.
+    """
+
+    def __init__(self) -> None:
+        self._entries: list[LogEntry] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def append(self, event: Mapping, player_ids=(), visible_to=None) -> LogEntry:
+        entry = LogEntry(
+            len(self._entries),
+            event,
+            event.get("type"),
+            tuple(dict.fromkeys(player_ids)),
+            frozenset(visible_to) if visible_to is not None else None,
+        )
+        self._entries.append(entry)
+        return entry
+
+    def entries_since(self, cursor: int) -> list[LogEntry]:
+        return self._entries[cursor:]
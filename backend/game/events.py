@@ -0,0 +1,166 @@
+from collections.abc import Mapping
+from dataclasses import dataclass, fields
+from functools import cache
+from typing import ClassVar
+
+
+class Event(Mapping):
+    """
+    A game event. Subclasses are frozen, slotted dataclasses, one per
+    event type; their fields map to the camelCase wire keys (`player_id`
+    -> "playerId", `from_` -> "from"). An event is read-only once built:
+    its wire dict and every encoded frame (see game.codec) are built on
+    first use and cached on the event, so the log, the replay file and
+    the broadcast share one encoding. Events read like the dicts they
+    replace (`event.get("type")`, `event["text"]`).
+    """
+
+    __slots__ = ("_view", "_frames")
+
+    TYPE: ClassVar[str] = ""
+
+    def to_dict(self) -> dict:
+        view = getattr(self, "_view", None)
+        if view is None:
+            view = {"type": self.TYPE}
+            for attr, key in _wire_keys(type(self)):
+                view[key] = getattr(self, attr)
+            object.__setattr__(self, "_view", view)
+        return view
+
+    def encoded(self, codec) -> str | bytes:
+        frames = getattr(self, "_frames", None)
+        if frames is None:
+            frames = {}
+            object.__setattr__(self, "_frames", frames)
+        frame = frames.get(codec.name)
+        if frame is None:
+            frame = frames[codec.name] = codec.encode_plain(self)
+        return frame
+
+    def __getitem__(self, key: str):
+        return self.to_dict()[key]
+
+    def __iter__(self):
+        return iter(self.to_dict())
+
+    def __len__(self) -> int:
+        return len(self.to_dict())
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+@cache
+def _wire_keys(cls: type) -> tuple[tuple[str, str], ...]:
+    keys = []
+    for f in fields(cls):
+        head, *rest = f.name.rstrip("_").split("_")
+        keys.append((f.name, head + "".join(part.title() for part in rest)))
+    return tuple(keys)
+
+
+class DictEvent(Event):
+    """Wraps an event that has no class of its own (rare or one-off types)."""
+
+    __slots__ = ("payload",)
+
+    def __init__(self, payload: dict) -> None:
+        self.payload = payload
+
+    def to_dict(self) -> dict:
+        return self.payload
+
+
+def as_event(event: "Event | dict") -> Event:
+    return event if isinstance(event, Event) else DictEvent(event)
+
+
+def _event(cls):
+    return dataclass(frozen=True, slots=True, eq=False)(cls)
+
+
+@_event
+class Phase(Event):
+    TYPE = "PHASE"
+    phase: str
+
+
+@_event
+class Speech(Event):
+    TYPE = "SPEECH"
+    player_id: str
+    text: str
+
+
+@_event
+class SpeechStart(Event):
+    TYPE = "SPEECH_START"
+    player_id: str
+
+
+@_event
+class SpeechDelta(Event):
+    TYPE = "SPEECH_DELTA"
+    player_id: str
+    text: str
+
+
+@_event
+class Thinking(Event):
+    TYPE = "THINKING"
+    player_id: str
+
+
+@_event
+class Vote(Event):
+    TYPE = "VOTE"
+    from_: str
+    to: str | None
+
+
+@_event
+class SheriffVote(Event):
+    TYPE = "SHERIFF_VOTE"
+    from_: str
+    to: str
+
+
+@_event
+class VoteEnd(Event):
+    TYPE = "VOTE_END"
+
+
+@_event
+class VoteTie(Event):
+    TYPE = "VOTE_TIE"
+
+
+@_event
+class Death(Event):
+    TYPE = "DEATH"
+    player_id: str
+
+
+@_event
+class NightSkill(Event):
+    TYPE = "NIGHT_SKILL"
+    player_id: str
+    role: str
+    hint: str
+
+
+@_event
+class NightActionAck(Event):
+    TYPE = "NIGHT_ACTION_ACK"
+    player_id: str
+    action_type: str
+    target: str | None
+    status: str
+
+
+@_event
+class SeerResult(Event):
+    TYPE = "SEER_RESULT"
+    target: str
+    role: str | None
@@ -0,0 +1,175 @@
+"""
+Play many headless AI-only games across a process pool and aggregate
+win rates.
+
+    python -m game.farm --games 1000 --players 6,8,12 --seed 0 --out games.jsonl
+
+Run from `backend/`. Each finished game is written to --out as one JSON
+line as soon as it completes; the aggregate (win rates with 95% Wilson
+intervals by role, personality trait bucket, player count and seat) is
+printed at the end. Game `i` always uses seed `seed + i`, so a run is
+reproducible regardless of which worker plays which game.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import re
+import sys
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from game.cli import play_game
+from game.engine import MAX_PLAYERS, MIN_PLAYERS
+
+TRAITS = ("aggressiveness", "deception", "logic")
+# Personalities are drawn from [0.2, 0.9]; split that range in thirds.
+TRAIT_BUCKETS = ((0.433, "low"), (0.667, "mid"), (math.inf, "high"))
+WOLF_ROLE = "WEREWOLF"
+
+
+def wilson_interval(wins: int, n: int, z: float = 1.96) -> tuple[float, float]:
+    if n == 0:
+        return 0.0, 0.0
+    p = wins / n
+    denom = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denom
+    margin = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, centre - margin), min(1.0, centre + margin)
+
+
+def trait_bucket(value: float) -> str:
+    for upper, name in TRAIT_BUCKETS:
+        if value < upper:
+            return name
+    return TRAIT_BUCKETS[-1][1]
+
+
+def player_won(role: str, result: str | None) -> bool:
+    if role == WOLF_ROLE:
+        return result == "WEREWOLVES_WIN"
+    return result == "VILLAGERS_WIN"
+
+
+class WinRateStats:
+    """
+    Streaming aggregate over game records (as produced by play_game). Only
+    counters are kept, so memory does not grow with the number of games.
+    A draw counts as a loss for every player.
+    """
+
+    def __init__(self) -> None:
+        self.games = 0
+        self.results: dict[str, int] = defaultdict(int)
+        self._groups: dict[str, dict[str, list[int]]] = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+
+    def add(self, record: dict) -> None:
+        result = record.get("result") or "DRAW"
+        self.games += 1
+        self.results[result] += 1
+        count = str(record.get("playerCount"))
+        self._count("player_count", f"{count}:wolves", result == "WEREWOLVES_WIN")
+        self._count("player_count", f"{count}:villagers", result == "VILLAGERS_WIN")
+        personalities = record.get("personalities", {})
+        for pid, role in record.get("roles", {}).items():
+            won = player_won(role, result)
+            self._count("role", role, won)
+            self._count("seat", pid, won)
+            traits = personalities.get(pid)
+            if traits:
+                for trait in TRAITS:
+                    self._count("trait", f"{trait}:{trait_bucket(traits[trait])}", won)
+
+    def summary(self) -> dict:
+        out = {"games": self.games, "results": dict(self.results)}
+        for group, buckets in self._groups.items():
+            rows = {}
+            for key in sorted(buckets, key=_natural_key):
+                wins, n = buckets[key]
+                low, high = wilson_interval(wins, n)
+                rows[key] = {"wins": wins, "n": n, "rate": round(wins / n, 4), "ci95": [round(low, 4), round(high, 4)]}
+            out[group] = rows
+        return out
+
+    def _count(self, group: str, key: str, won: bool) -> None:
+        bucket = self._groups[group][key]
+        bucket[0] += int(won)
+        bucket[1] += 1
+
+
+def _natural_key(key: str) -> tuple:
+    # "P10" after "P9", "12:wolves" after "8:wolves".
+    return tuple(int(part) if part.isdigit() else part for part in re.split(r"(\d+)", key))
+
+
+def _init_worker() -> None:
+    # Engine logs would interleave across workers; the JSONL is the output.
+    sys.stdout = open(os.devnull, "w")
+
+
+def _play(player_count: int, seed: int, include_actions: bool) -> dict:
+    record = asyncio.run(play_game(player_count, seed, llm_cache=True))
+    if not include_actions:
+        record.pop("actionLog", None)
+    return record
+
+
+def run_farm(games: int, player_counts: list[int], seed: int = 0, workers: int | None = None,
+             out=None, include_actions: bool = False, max_pending: int | None = None) -> WinRateStats:
+    """
+    Play `games` games on `workers` processes, cycling through
+    `player_counts`. Records are written to `out` (a text file) in
+    completion order. At most `max_pending` games are queued at once.
+    """
+    stats = WinRateStats()
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers * 4
+    jobs = ((player_counts[i % len(player_counts)], seed + i) for i in range(games))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        pending = set()
+        for job in jobs:
+            pending.add(pool.submit(_play, *job, include_actions))
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                _collect(done, stats, out)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            _collect(done, stats, out)
+    return stats
+
+
+def _collect(done, stats: WinRateStats, out) -> None:
+    for future in done:
+        record = future.result()
+        stats.add(record)
+        if out is not None:
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Run many headless games and aggregate win rates.")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--players", default="8", help="comma-separated player counts, cycled")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="default: CPU count")
+    parser.add_argument("--out", default=None, help="per-game JSONL file")
+    parser.add_argument("--actions", action="store_true", help="keep each game's action log in the JSONL")
+    args = parser.parse_args(argv)
+    counts = [int(c) for c in args.players.split(",") if c.strip()]
+    if not counts or any(not MIN_PLAYERS <= c <= MAX_PLAYERS for c in counts):
+        parser.error(f"--players must be between {MIN_PLAYERS} and {MAX_PLAYERS}")
+
+    out = open(args.out, "w", encoding="utf-8") if args.out else None
+    try:
+        stats = run_farm(args.games, counts, args.seed, args.workers, out, args.actions)
+    finally:
+        if out is not None:
+            out.close()
+    print(json.dumps(stats.summary(), ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+import asyncio
+from dataclasses import dataclass
+
+from game.clock import Clock
+
+
+@dataclass(frozen=True)
+class InputDeadlines:
+    """
+    How long a phase waits for its human inputs, in seconds (None waits
+    until every seat has answered or left). A phase ends as soon as all
+    expected inputs are in, so these only matter for slow players.
+    """
+
+    night: float | None = 3.0
+    sheriff: float | None = 1.0
+    vote: float | None = 15.0
+    speech: float | None = None
+
+
+class SeatInputs:
+    """
+    Per-seat input slots for the phase in progress. The engine `open`s a
+    slot (a future) for every human seat it expects to hear from, the
+    server `submit`s into it when the message arrives, and `gather` waits
+    until all open slots of that kind are filled or the deadline passes.
+    Nothing polls: the phase task sleeps until the last input lands.
+    A seat that disconnects is `abandon`ed so nobody waits for it.
+    """
+
+    def __init__(self, clock: Clock) -> None:
+        self.clock = clock
+        self._slots: dict[str, dict[str, asyncio.Future]] = {}
+
+    def open(self, kind: str, seats) -> None:
+        loop = asyncio.get_running_loop()
+        self._slots[kind] = {seat: loop.create_future() for seat in seats}
+
+    def seats(self, kind: str) -> list[str]:
+        return list(self._slots.get(kind, ()))
+
+    def submit(self, kind: str, seat: str, value=None) -> bool:
+        """Fill `seat`'s slot; False if no slot of `kind` is waiting for it."""
+        future = self._slots.get(kind, {}).get(seat)
+        if future is None or future.done():
+            return False
+        future.set_result(value)
+        return True
+
+    def abandon(self, seat: str) -> None:
+        for slots in self._slots.values():
+            future = slots.get(seat)
+            if future is not None and not future.done():
+                future.set_result(None)
+
+    async def gather(self, kind: str, timeout: float | None) -> dict[str, object]:
+        """Wait for every open `kind` slot (or the deadline); returns what arrived."""
+        slots = self._slots.get(kind, {})
+        pending = [future for future in slots.values() if not future.done()]
+        if pending:
+            await self.clock.wait(pending, timeout)
+        self._slots.pop(kind, None)
+        return {seat: future.result() for seat, future in slots.items() if future.done()}
@@ -0,0 +1,69 @@
+class PlayerRegistry:
+    """
+    Seat order, roles and the alive set of one game, kept indexed so the
+    engine never rescans the player list: membership and role lookups are
+    dict/set hits, and the alive ids are a cached tuple rebuilt only when
+    someone dies. The player dicts (the INIT payload) are updated in place.
+    `version` bumps on every death so callers can key caches on it.
+    """
+
+    __slots__ = ("players", "order", "version", "_roles", "_by_role", "_alive_set", "_alive", "_dead", "_seats")
+
+    def __init__(self, players: list[dict], roles: dict[str, str]) -> None:
+        self.players = players
+        self.order: tuple[str, ...] = tuple(p["id"] for p in players)
+        self.version = 0
+        self._seats = {p["id"]: p for p in players}
+        self._roles = dict(roles)
+        by_role: dict[str, list[str]] = {}
+        for pid in self.order:
+            role = self._roles.get(pid)
+            if role is not None:
+                by_role.setdefault(role, []).append(pid)
+        self._by_role = {role: tuple(pids) for role, pids in by_role.items()}
+        self._alive_set = {p["id"] for p in players if p.get("alive", True)}
+        self._alive: tuple[str, ...] = ()
+        self._dead: tuple[str, ...] = ()
+        self._reindex()
+
+    @property
+    def alive(self) -> tuple[str, ...]:
+        """Living player ids in seat order."""
+        return self._alive
+
+    @property
+    def dead(self) -> tuple[str, ...]:
+        return self._dead
+
+    def is_alive(self, player_id: str | None) -> bool:
+        # Ids can come straight from clients or the LLM; anything that is
+        # not a str (a list, a dict) is simply not a player.
+        return isinstance(player_id, str) and player_id in self._alive_set
+
+    def role_of(self, player_id: str | None) -> str | None:
+        return self._roles.get(player_id) if isinstance(player_id, str) else None
+
+    def with_role(self, role: str) -> tuple[str, ...]:
+        """Every player holding `role`, in seat order, dead or alive."""
+        return self._by_role.get(role, ())
+
+    def first_with_role(self, role: str) -> str | None:
+        pids = self._by_role.get(role)
+        return pids[0] if pids else None
+
+    def alive_with_role(self, role: str) -> tuple[str, ...]:
+        return tuple(pid for pid in self._by_role.get(role, ()) if pid in self._alive_set)
+
+    def mark_dead(self, player_id: str) -> bool:
+        """Returns False when the player was not alive (nothing changes)."""
+        if player_id not in self._alive_set:
+            return False
+        self._alive_set.discard(player_id)
+        self._seats[player_id]["alive"] = False
+        self._reindex()
+        return True
+
+    def _reindex(self) -> None:
+        self._alive = tuple(pid for pid in self.order if pid in self._alive_set)
+        self._dead = tuple(pid for pid in self.order if pid not in self._alive_set)
+        self.version += 1
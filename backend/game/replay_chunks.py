@@ -0,0 +1,61 @@
+import base64
+import json
+import math
+import zlib
+from typing import Iterator
+
+REPLAY_CHUNK_SIZE = 200
+ENCODING_JSON = "json"
+ENCODING_DEFLATE = "deflate-base64"
+
+
+def replay_manifest(game_id: str | None, streams: dict[str, list], chunk_size: int = REPLAY_CHUNK_SIZE,
+                    compress: bool = True, **extra) -> dict:
+    """
+    REPLAY_MANIFEST frame: how many chunks each stream is split into and
+    how they are encoded. `extra` carries the small end-of-game fields
+    (result, finalRoles, ...).
+    """
+    manifest = {
+        "type": "REPLAY_MANIFEST",
+        "gameId": game_id,
+        "chunkSize": chunk_size,
+        "encoding": ENCODING_DEFLATE if compress else ENCODING_JSON,
+        "chunks": {name: math.ceil(len(items) / chunk_size) for name, items in streams.items()},
+    }
+    manifest.update(extra)
+    return manifest
+
+
+def build_chunk(game_id: str | None, stream: str, items: list, index: int,
+                chunk_size: int = REPLAY_CHUNK_SIZE, compress: bool = True) -> dict:
+    part = items[index * chunk_size:(index + 1) * chunk_size]
+    raw = json.dumps(part, ensure_ascii=False)
+    if compress:
+        data = base64.b64encode(zlib.compress(raw.encode("utf-8"))).decode("ascii")
+    else:
+        data = raw
+    return {
+        "type": "REPLAY_CHUNK",
+        "gameId": game_id,
+        "stream": stream,
+        "index": index,
+        "encoding": ENCODING_DEFLATE if compress else ENCODING_JSON,
+        "data": data,
+    }
+
+
+def iter_replay_chunks(game_id: str | None, streams: dict[str, list], chunk_size: int = REPLAY_CHUNK_SIZE,
+                       compress: bool = True, only: dict[str, list[int]] | None = None) -> Iterator[dict]:
+    """
+    Yield REPLAY_CHUNK frames one at a time, so only a single chunk is
+    ever encoded in memory. `only` restricts output to the given chunk
+    indexes per stream (used to resend chunks a client is missing).
+    """
+    for name, items in streams.items():
+        total = math.ceil(len(items) / chunk_size)
+        indexes = range(total) if only is None else sorted(
+            {i for i in only.get(name, ()) if isinstance(i, int) and 0 <= i < total}
+        )
+        for index in indexes:
+            yield build_chunk(game_id, name, items, index, chunk_size, compress)
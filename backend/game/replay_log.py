@@ -0,0 +1,166 @@
+import json
+import mmap
+import struct
+from bisect import bisect_left
+from collections.abc import Mapping
+from pathlib import Path
+
+from game.codec import JSON
+
+# Sidecar index record: tick, flags, byte offset and length of one log line.
+_INDEX = struct.Struct("<IIQI")
+_RESTRICTED = 1
+_END = 2
+
+
+class ReplayWriter:
+    """
+    Append-only replay log for one game.
+
+    `<game_id>.jsonl` holds one JSON record per line; `<game_id>.idx` holds
+    a fixed-size record per line so readers can seek by tick without
+    scanning. Records with `visible_to` are only shown to those players
+    (and observers); `visible_to=()` hides a record from every player.
+    """
+
+    def __init__(self, directory: str | Path, game_id: str) -> None:
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        self.game_id = game_id
+        self._log = open(directory / f"{game_id}.jsonl", "ab")
+        self._index = open(directory / f"{game_id}.idx", "ab")
+        self._offset = self._log.tell()
+
+    def append(self, tick: int, kind: str, payload: Mapping, visible_to=None) -> None:
+        if self._log.closed:
+            return
+        # Spliced by hand so an event's cached JSON is reused as "data".
+        parts = [f'{{"tick": {int(tick)}, "kind": {json.dumps(kind)}, "data": {JSON.encode(payload)}']
+        flags = 0
+        if visible_to is not None:
+            parts.append(f', "visibleTo": {json.dumps(list(visible_to), ensure_ascii=False)}')
+            flags |= _RESTRICTED
+        if kind == "end":
+            flags |= _END
+        parts.append("}\n")
+        line = "".join(parts).encode("utf-8")
+        self._log.write(line)
+        self._log.flush()
+        # Index last, so a reader never sees a half-written line.
+        self._index.write(_INDEX.pack(tick, flags, self._offset, len(line)))
+        self._index.flush()
+        self._offset += len(line)
+
+    def close(self, result: str | None = None) -> None:
+        if self._log.closed:
+            return
+        if result is not None:
+            self.append(0xFFFFFFFF, "end", {"result": result})
+        self._log.close()
+        self._index.close()
+
+
+class _TickView:
+    # Sequence of ticks over the raw index, for bisect.
+    def __init__(self, index: memoryview) -> None:
+        self._index = index
+
+    def __len__(self) -> int:
+        return len(self._index) // _INDEX.size
+
+    def __getitem__(self, i: int) -> int:
+        return _INDEX.unpack_from(self._index, i * _INDEX.size)[0]
+
+
+class ReplayReader:
+    """
+    Memory-mapped view of a replay log written by ReplayWriter. Safe to
+    open while the game is still being written: only lines already
+    covered by the index are visible.
+    """
+
+    def __init__(self, directory: str | Path, game_id: str) -> None:
+        directory = Path(directory)
+        self._maps: list[mmap.mmap] = []
+        self._log = self._map(directory / f"{game_id}.jsonl")
+        index = self._map(directory / f"{game_id}.idx")
+        self._index = index[: len(index) - len(index) % _INDEX.size]
+        index.release()
+        self._ticks = _TickView(self._index)
+
+    def __enter__(self) -> "ReplayReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._ticks)
+
+    @property
+    def finished(self) -> bool:
+        count = len(self)
+        return bool(count) and bool(self._entry(count - 1)[1] & _END)
+
+    def page(self, start_tick: int = 0, end_tick: int | None = None, viewer: str | None = None,
+             limit: int = 500) -> tuple[bytes, int | None]:
+        """
+        Return the JSONL records with `start_tick <= tick < end_tick` that
+        `viewer` may see (None = observer, sees everything), at most
+        `limit` of them, and the tick to resume from (None when done).
+        Unfiltered runs are sliced straight out of the mapping.
+        """
+        count = len(self)
+        chunks: list[memoryview] = []
+        run_start = run_end = last_tick = None
+        taken = 0
+        i = bisect_left(self._ticks, start_tick)
+        while i < count:
+            tick, flags, offset, length = self._entry(i)
+            if flags & _END or (end_tick is not None and tick >= end_tick):
+                return self._join(chunks, run_start, run_end), None
+            # Never split a tick across pages.
+            if taken >= limit and tick != last_tick:
+                return self._join(chunks, run_start, run_end), tick
+            if viewer is None or not flags & _RESTRICTED or self._visible(offset, length, viewer):
+                if run_end != offset:
+                    if run_start is not None:
+                        chunks.append(self._log[run_start:run_end])
+                    run_start = offset
+                run_end = offset + length
+                taken += 1
+                last_tick = tick
+            i += 1
+        return self._join(chunks, run_start, run_end), None
+
+    def close(self) -> None:
+        for view in (self._index, self._log):
+            view.release()
+        self._ticks = _TickView(memoryview(b""))
+        for m in self._maps:
+            m.close()
+        self._maps.clear()
+
+    def _map(self, path: Path) -> memoryview:
+        with open(path, "rb") as f:
+            size = f.seek(0, 2)
+            if not size:
+                return memoryview(b"")
+            m = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+        self._maps.append(m)
+        return memoryview(m)
+
+    def _join(self, chunks: list[memoryview], start: int | None, end: int | None) -> bytes:
+        if start is not None:
+            chunks.append(self._log[start:end])
+        data = b"".join(chunks)
+        for chunk in chunks:
+            chunk.release()
+        return data
+
+    def _entry(self, i: int) -> tuple[int, int, int, int]:
+        return _INDEX.unpack_from(self._index, i * _INDEX.size)
+
+    def _visible(self, offset: int, length: int, viewer: str) -> bool:
+        record = json.loads(bytes(self._log[offset:offset + length]))
+        return viewer in record.get("visibleTo", ())
@@ -0,0 +1,48 @@
+from typing import Protocol
+
+from game.events import Event
+
+
+class EventSink(Protocol):
+    """
+    Where the engine sends game events. The server's ConnectionManager is
+    one implementation; headless runs use RecordingSink.
+    """
+
+    async def broadcast(self, event: Event | dict) -> None: ...
+
+    async def send_to(self, player_id: str, event: Event | dict) -> None: ...
+
+    def is_connected(self, player_id: str) -> bool:
+        """True if a human is seated as `player_id`."""
+        ...
+
+    def has_listeners(self) -> bool:
+        """False once nobody is left to play to; the game then stops."""
+        ...
+
+
+class RecordingSink:
+    """
+    Headless sink: no humans are seated and events are kept in memory.
+    Streaming-only frames (`skip_types`) are dropped.
+    """
+
+    def __init__(self, skip_types=frozenset({"THINKING", "SPEECH_DELTA"})) -> None:
+        self.skip_types = skip_types
+        self.events: list[Event | dict] = []
+        self.private: list[tuple[str, Event | dict]] = []
+
+    async def broadcast(self, event: Event | dict) -> None:
+        if event.get("type") not in self.skip_types:
+            self.events.append(event)
+
+    async def send_to(self, player_id: str, event: Event | dict) -> None:
+        if event.get("type") not in self.skip_types:
+            self.private.append((player_id, event))
+
+    def is_connected(self, player_id: str) -> bool:
+        return False
+
+    def has_listeners(self) -> bool:
+        return True
@@ -0,0 +1,87 @@
+import re
+
+# Stray JS "undefined" tokens some models leak into the speech field.
+UNDEFINED_PATTERN = "undefined|Undefined|UNDEFINED"
+# "<pid> ... dead" within a few characters of the id.
+DEATH_WORDS = ("\u5df2\u6b7b", "\u6b7b\u4ea1", "\u6b7b\u4e86", "\u51fa\u5c40", "\u88ab\u6295", "\u88ab\u5200")
+STILL_ALIVE = "\u4ecd\u5b58\u6d3b"
+
+
+# A rewrite never reaches further back than this from the end of the text
+# (longest id + 6-character gap + death word, or one "undefined").
+STREAM_HOLDBACK = 16
+
+
+class SpeechSanitizer:
+    """
+    Cleans a player's speech before it reaches the table: drops stray
+    "undefined" tokens, replaces a bare "P" with the speaker's id and
+    rewrites claims that a living player is dead.
+
+    Everything is one compiled alternation, rebuilt only when the alive
+    set changes (`update`, called from configure_game and mark_dead), so
+    a clean speech is a single scan. The output is a fixed point: a
+    rewritten speech is scanned again until nothing changes, so sanitizing
+    twice is the same as sanitizing once. The gap between an id and the
+    death word may not cross another id (the claim belongs to the nearest
+    one) or an earlier "still alive" rewrite.
+    """
+
+    def __init__(self, alive=()) -> None:
+        self._pattern: re.Pattern = None
+        self.update(alive)
+
+    def update(self, alive) -> None:
+        # Longest ids first so "P12" is not read as "P1" + "2".
+        ids = sorted(alive, key=lambda pid: (-len(pid), pid))
+        claim = "|".join(map(re.escape, ids)) or "(?!)"
+        words = "|".join(DEATH_WORDS)
+        self._pattern = re.compile(
+            f"(?P<junk>{UNDEFINED_PATTERN})"
+            r"|(?P<bare>\bP\b)"
+            f"|(?P<pid>{claim})(?!\\d)(?:(?!{STILL_ALIVE}|P\\d).){{0,6}}(?:{words})"
+        )
+
+    def __call__(self, text: str | None, speaker_id: str | None = None) -> str | None:
+        if not text:
+            return text
+
+        def replace(match: re.Match) -> str:
+            if match.group("junk") is not None:
+                return ""
+            if match.group("bare") is not None:
+                return speaker_id or match.group()
+            return match.group("pid") + STILL_ALIVE
+
+        cleaned = text.strip()
+        while True:
+            result = self._pattern.sub(replace, cleaned).strip()
+            if result == cleaned:
+                return result
+            cleaned = result
+
+
+class SpeechStream:
+    """
+    Sanitizes a speech while it is streamed. Every piece is appended to
+    the raw text, the whole text is sanitized, and only the part at least
+    STREAM_HOLDBACK characters from the end, where a later piece can no
+    longer change it, is released. What was held back arrives with the
+    final SPEECH, which clients show in place of the streamed draft.
+    """
+
+    def __init__(self, sanitize: SpeechSanitizer, speaker_id: str | None = None) -> None:
+        self.sanitize = sanitize
+        self.speaker_id = speaker_id
+        self.sent = ""
+        self._raw: list[str] = []
+
+    def feed(self, piece: str) -> str:
+        """The newly releasable sanitized text ("" if none)."""
+        self._raw.append(piece)
+        clean = self.sanitize("".join(self._raw), self.speaker_id) or ""
+        stable = clean[:len(clean) - STREAM_HOLDBACK]
+        if len(stable) <= len(self.sent) or not stable.startswith(self.sent):
+            return ""
+        released, self.sent = stable[len(self.sent):], stable
+        return released
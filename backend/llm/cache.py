@@ -0,0 +1,177 @@
+import copy
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+
+
+def cache_key(model: str, temperature: float, prompt: str) -> str:
+    raw = json.dumps([model, temperature, prompt], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier cache for parsed LLM responses.
+
+    - Memory: LRU of at most `max_entries` responses.
+    - Disk (optional): one JSON file per key under `disk_dir`, evicted
+      oldest-first once the directory exceeds `max_disk_bytes`.
+
+    Entries older than `ttl` seconds (if set) are treated as misses in
+    both tiers. Thread-safe; values are copied on the way in and out.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: float | None = None,
+        disk_dir: str | Path | None = None,
+        max_disk_bytes: int = 64 * 1024 * 1024,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._disk_index: OrderedDict[str, int] = OrderedDict()
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            self._scan_disk()
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and not self._expired(entry[0]):
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(entry[1])
+            if entry:
+                del self._memory[key]
+
+            value = self._disk_get(key)
+            if value is not None:
+                self.hits += 1
+                self.disk_hits += 1
+                return copy.deepcopy(value)
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: dict) -> None:
+        value = copy.deepcopy(value)
+        created = time.time()
+        with self._lock:
+            self._memory_put(key, created, value)
+            if self.disk_dir:
+                self._disk_put(key, created, value)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": len(self._disk_index),
+                "disk_bytes": self._disk_bytes,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            for key in list(self._disk_index):
+                self._disk_remove(key)
+            self.hits = self.disk_hits = self.misses = 0
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def _memory_put(self, key: str, created: float, value: dict) -> None:
+        self._memory[key] = (created, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _path(self, key: str) -> Path:
+        return self.disk_dir / f"{key}.json"
+
+    def _scan_disk(self) -> None:
+        files = sorted(self.disk_dir.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        for path in files:
+            size = path.stat().st_size
+            self._disk_index[path.stem] = size
+            self._disk_bytes += size
+
+    def _disk_get(self, key: str) -> dict | None:
+        if not self.disk_dir or key not in self._disk_index:
+            return None
+        try:
+            record = json.loads(self._path(key).read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            self._disk_remove(key)
+            return None
+        if self._expired(record.get("created", 0.0)):
+            self._disk_remove(key)
+            return None
+        value = record.get("value")
+        if not isinstance(value, dict):
+            return None
+        self._disk_index.move_to_end(key)
+        self._memory_put(key, record.get("created", 0.0), value)
+        return value
+
+    def _disk_put(self, key: str, created: float, value: dict) -> None:
+        data = json.dumps({"created": created, "value": value}, ensure_ascii=False).encode("utf-8")
+        if len(data) > self.max_disk_bytes:
+            return
+        if key in self._disk_index:
+            self._disk_remove(key)
+        path = self._path(key)
+        # A private temp file per write: farm workers may share disk_dir.
+        tmp = None
+        try:
+            with tempfile.NamedTemporaryFile(dir=self.disk_dir, prefix=f"{key}.", suffix=".tmp", delete=False) as tmp:
+                tmp.write(data)
+            os.replace(tmp.name, path)
+        except OSError:
+            if tmp is not None:
+                Path(tmp.name).unlink(missing_ok=True)
+            return
+        self._disk_index[key] = len(data)
+        self._disk_bytes += len(data)
+        while self._disk_bytes > self.max_disk_bytes and self._disk_index:
+            oldest = next(iter(self._disk_index))
+            self._disk_remove(oldest)
+
+    def _disk_remove(self, key: str) -> None:
+        size = self._disk_index.pop(key, 0)
+        self._disk_bytes -= size
+        try:
+            self._path(key).unlink()
+        except OSError:
+            pass
+
+
+@lru_cache(maxsize=1)
+def get_response_cache() -> ResponseCache:
+    # Process-wide cache configured from env; read once like get_settings().
+    ttl = os.getenv("LLM_CACHE_TTL")
+    return ResponseCache(
+        max_entries=int(os.getenv("LLM_CACHE_SIZE", "1024")),
+        ttl=float(ttl) if ttl else None,
+        disk_dir=os.getenv("LLM_CACHE_DIR") or None,
+        max_disk_bytes=int(float(os.getenv("LLM_CACHE_DISK_MB", "64")) * 1024 * 1024),
+    )
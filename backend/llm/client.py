@@ -1,7 +1,17 @@
+import asyncio
 import json
 import os
-import urllib.request
+import re
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
+from typing import Awaitable, Callable
+
+import httpx
+
+from llm.cache import cache_key, get_response_cache
+from llm.mock import call_llm as mock_call_llm
 
 
 def _load_dotenv() -> None:
@@ -39,14 +49,197 @@ def _extract_json(text: str) -> dict | None:
         return None
 
 
-def _sanitize_speech(value: str | None) -> str | None:
-    if not value:
-        return value
-    cleaned = value.replace("undefined", "").replace("Undefined", "").replace("UNDEFINED", "")
-    return cleaned.strip()
+class SpeechFieldExtractor:
+    """
+    Incrementally pull the value of the top-level "speech" string out of a
+    JSON object that is still being generated. feed() returns the newly
+    decoded characters, waiting on incomplete escape sequences.
+    """
+
+    _KEY = re.compile(r'"speech"\s*:\s*"')
+    _ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+    def __init__(self) -> None:
+        self._buf = ""
+        self._pos = -1
+        self.done = False
+
+    def feed(self, chunk: str) -> str:
+        self._buf += chunk
+        if self.done:
+            return ""
+        if self._pos < 0:
+            match = self._KEY.search(self._buf)
+            if not match:
+                return ""
+            self._pos = match.end()
+
+        out = []
+        buf = self._buf
+        pos = self._pos
+        while pos < len(buf):
+            ch = buf[pos]
+            if ch == '"':
+                self.done = True
+                pos += 1
+                break
+            if ch != "\\":
+                out.append(ch)
+                pos += 1
+                continue
+            if pos + 1 >= len(buf):
+                break
+            esc = buf[pos + 1]
+            if esc != "u":
+                out.append(self._ESCAPES.get(esc, esc))
+                pos += 2
+                continue
+            if pos + 6 > len(buf):
+                break
+            code = int(buf[pos + 2 : pos + 6], 16)
+            if 0xD800 <= code < 0xDC00:
+                # High surrogate: wait for the low half.
+                if pos + 12 > len(buf):
+                    break
+                low = int(buf[pos + 8 : pos + 12], 16)
+                out.append(chr(0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)))
+                pos += 12
+                continue
+            out.append(chr(code))
+            pos += 6
+        self._pos = pos
+        return "".join(out)
+
+
+@dataclass(frozen=True)
+class LLMSettings:
+    api_key: str | None
+    api_base: str
+    model: str
+    temperature: float
+    timeout: float
+    max_connections_per_host: int
+    max_keepalive_per_host: int
+
+    @property
+    def chat_url(self) -> str:
+        return self.api_base.rstrip("/") + "/chat/completions"
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> LLMSettings:
+    # Read once per process; call get_settings.cache_clear() after changing env.
+    return LLMSettings(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        api_base=os.getenv("OPENAI_API_BASE", "https://api.openai.com/v1"),
+        model=os.getenv("OPENAI_MODEL", "deepseek-v3.2"),
+        temperature=float(os.getenv("LLM_TEMPERATURE", "0.7")),
+        timeout=float(os.getenv("LLM_TIMEOUT", "60")),
+        max_connections_per_host=int(os.getenv("LLM_MAX_CONNECTIONS_PER_HOST", "32")),
+        max_keepalive_per_host=int(os.getenv("LLM_MAX_KEEPALIVE_PER_HOST", "16")),
+    )
+
+
+# Keep-alive connection pools, one per upstream host. Async pools are bound
+# to the event loop that created them, so they are rebuilt if the loop changes.
+_SYNC_CLIENTS: dict[str, httpx.Client] = {}
+_ASYNC_CLIENTS: dict[str, tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def _host_key(url: str) -> str:
+    parsed = httpx.URL(url)
+    return f"{parsed.scheme}://{parsed.host}:{parsed.port or ''}"
+
+
+def _limits(settings: LLMSettings) -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.max_connections_per_host,
+        max_keepalive_connections=settings.max_keepalive_per_host,
+        keepalive_expiry=30.0,
+    )
+
+
+def _sync_client(settings: LLMSettings) -> httpx.Client:
+    key = _host_key(settings.chat_url)
+    with _CLIENTS_LOCK:
+        client = _SYNC_CLIENTS.get(key)
+        if client is None or client.is_closed:
+            client = httpx.Client(limits=_limits(settings), timeout=settings.timeout)
+            _SYNC_CLIENTS[key] = client
+    return client
+
+
+def _async_client(settings: LLMSettings) -> httpx.AsyncClient:
+    key = _host_key(settings.chat_url)
+    loop = asyncio.get_running_loop()
+    entry = _ASYNC_CLIENTS.get(key)
+    if entry is None or entry[0] is not loop or entry[1].is_closed:
+        client = httpx.AsyncClient(limits=_limits(settings), timeout=settings.timeout)
+        _ASYNC_CLIENTS[key] = (loop, client)
+        return client
+    return entry[1]
+
+
+async def aclose_clients() -> None:
+    """Close the pooled connections (call on server shutdown and when a game loop ends)."""
+    loop = asyncio.get_running_loop()
+    for key, (owner, client) in list(_ASYNC_CLIENTS.items()):
+        if owner is loop:
+            await client.aclose()
+            del _ASYNC_CLIENTS[key]
+    with _CLIENTS_LOCK:
+        for client in _SYNC_CLIENTS.values():
+            client.close()
+        _SYNC_CLIENTS.clear()
+
+
+def _build_request(prompt: str, settings: LLMSettings) -> tuple[dict, dict]:
+    payload = {
+        "model": settings.model,
+        "messages": [
+            {"role": "system", "content": "You are a helpful game AI. Reply strictly in JSON."},
+            {"role": "user", "content": prompt},
+        ],
+        "temperature": settings.temperature,
+    }
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {settings.api_key}",
+    }
+    return payload, headers
+
+
+def _response_content(data: dict) -> str:
+    return (
+        data.get("choices", [{}])[0]
+        .get("message", {})
+        .get("content", "")
+    )
+
+
+def _parse_content(content: str) -> dict | None:
+    # Speech is returned as generated; game.speech.SpeechSanitizer cleans
+    # it once, where the alive set and the speaker are known.
+    parsed = _extract_json(content) if isinstance(content, str) else None
+    return parsed if isinstance(parsed, dict) and parsed else None
+
 
+def _cache_lookup(prompt: str, settings: LLMSettings) -> tuple[str, dict | None]:
+    key = cache_key(settings.model, settings.temperature, prompt)
+    return key, get_response_cache().get(key)
 
-def call_llm(prompt: str) -> dict:
+
+def _finish(prompt: str, parsed: dict | None, key: str | None) -> dict:
+    # Only real model replies are cached; fallbacks are not.
+    if not parsed:
+        return mock_call_llm(prompt)
+    if key:
+        get_response_cache().put(key, parsed)
+    return parsed
+
+
+def call_llm(prompt: str, use_cache: bool = False) -> dict:
     """
     Return structured output:
     {
@@ -60,51 +253,125 @@ def call_llm(prompt: str) -> dict:
             "poison": "player_id | null"
         }
     }
+
+    With use_cache, identical (model, temperature, prompt) requests are
+    answered from the response cache (see llm.cache).
     """
-    api_key = os.getenv("OPENAI_API_KEY")
-    api_base = os.getenv("OPENAI_API_BASE", "https://api.openai.com/v1")
-    model = os.getenv("OPENAI_MODEL", "deepseek-v3.2")
+    settings = get_settings()
+    if not settings.api_key:
+        return mock_call_llm(prompt)
+
+    key = None
+    if use_cache:
+        key, cached = _cache_lookup(prompt, settings)
+        if cached is not None:
+            return cached
 
-    if not api_key:
-        from llm.mock import call_llm as mock_call_llm
+    payload, headers = _build_request(prompt, settings)
+    try:
+        resp = _sync_client(settings).post(settings.chat_url, json=payload, headers=headers)
+        resp.raise_for_status()
+        data = resp.json()
+    except Exception:
         return mock_call_llm(prompt)
+    return _finish(prompt, _parse_content(_response_content(data)), key)
 
-    url = api_base.rstrip("/") + "/chat/completions"
-    payload = {
-        "model": model,
-        "messages": [
-            {"role": "system", "content": "You are a helpful game AI. Reply strictly in JSON."},
-            {"role": "user", "content": prompt},
-        ],
-        "temperature": 0.7,
-    }
-    req = urllib.request.Request(
-        url,
-        data=json.dumps(payload).encode("utf-8"),
-        headers={
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {api_key}",
-        },
-        method="POST",
-    )
+
+async def acall_llm(prompt: str, use_cache: bool = False) -> dict:
+    """
+    Async variant of call_llm over a pooled keep-alive connection.
+    Returns the same structured output.
+    """
+    settings = get_settings()
+    if not settings.api_key:
+        return mock_call_llm(prompt)
+
+    key = None
+    if use_cache:
+        key, cached = _cache_lookup(prompt, settings)
+        if cached is not None:
+            return cached
+
+    payload, headers = _build_request(prompt, settings)
     try:
-        with urllib.request.urlopen(req, timeout=60) as resp:
-            data = json.loads(resp.read().decode("utf-8"))
+        resp = await _async_client(settings).post(settings.chat_url, json=payload, headers=headers)
+        resp.raise_for_status()
+        data = resp.json()
     except Exception:
-        from llm.mock import call_llm as mock_call_llm
         return mock_call_llm(prompt)
+    return _finish(prompt, _parse_content(_response_content(data)), key)
 
-    content = (
-        data.get("choices", [{}])[0]
-        .get("message", {})
-        .get("content", "")
-    )
-    parsed = _extract_json(content) if isinstance(content, str) else None
-    if parsed:
-        if isinstance(parsed, dict):
-            speech = parsed.get("speech")
-            if isinstance(speech, str):
-                parsed["speech"] = _sanitize_speech(speech)
-        return parsed
-    from llm.mock import call_llm as mock_call_llm
-    return mock_call_llm(prompt)
+
+async def astream_llm(
+    prompt: str,
+    on_speech: Callable[[str], Awaitable[None]] | None = None,
+    use_cache: bool = False,
+) -> dict:
+    """
+    Streaming variant of acall_llm. Consumes the provider's server-sent
+    event stream and awaits on_speech with each new piece of the "speech"
+    field as it is generated. Returns the same structured output once the
+    completion is finished. A cache hit is delivered as a single piece.
+    If the stream fails or cannot be parsed after speech went out, the
+    result keeps the speech streamed so far (with the fallback action)
+    rather than replacing it with an unrelated one.
+    """
+    settings = get_settings()
+    if not settings.api_key:
+        return mock_call_llm(prompt)
+
+    key = None
+    if use_cache:
+        key, cached = _cache_lookup(prompt, settings)
+        if cached is not None:
+            speech = cached.get("speech")
+            if isinstance(speech, str) and speech and on_speech:
+                await on_speech(speech)
+            return cached
+
+    payload, headers = _build_request(prompt, settings)
+    payload["stream"] = True
+    extractor = SpeechFieldExtractor()
+    parts = []
+    streamed = []
+    try:
+        async with _async_client(settings).stream(
+            "POST", settings.chat_url, json=payload, headers=headers
+        ) as resp:
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    chunk = json.loads(data)
+                except json.JSONDecodeError:
+                    continue
+                delta = (
+                    (chunk.get("choices") or [{}])[0]
+                    .get("delta", {})
+                    .get("content")
+                )
+                if not delta:
+                    continue
+                parts.append(delta)
+                speech = extractor.feed(delta)
+                if speech:
+                    streamed.append(speech)
+                    if on_speech:
+                        await on_speech(speech)
+    except Exception:
+        return _streamed_fallback(prompt, streamed)
+    parsed = _parse_content("".join(parts))
+    if not parsed and streamed:
+        return _streamed_fallback(prompt, streamed)
+    return _finish(prompt, parsed, key)
+
+
+def _streamed_fallback(prompt: str, streamed: list[str]) -> dict:
+    result = mock_call_llm(prompt)
+    if streamed:
+        result["speech"] = "".join(streamed)
+    return result
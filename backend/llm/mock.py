@@ -1,6 +1,6 @@
 def call_llm(prompt: str):
     return {
-        "speech": "ҾôҶܿɡ",
+        "speech": "我觉得大家都很可疑。",
         "action": {
             "vote": None,
             "kill": None,
@@ -1,14 +1,18 @@
 ﻿import asyncio
 import contextlib
 import json
+import logging
+import os
 import re
-import random
 import sys
-from collections import Counter
+import time
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Callable
 
 import uvicorn
-from fastapi import FastAPI, WebSocket
+from fastapi import FastAPI, Query, WebSocket
+from fastapi.responses import Response
 from starlette.websockets import WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -17,10 +21,24 @@ BACKEND_ROOT = Path(__file__).resolve().parent
 if str(BACKEND_ROOT) not in sys.path:
     sys.path.insert(0, str(BACKEND_ROOT))
 
-from agents.ai_agent import AIAgent
-from agents.human_agent import HumanAgent
-from agents.personality import Personality
-from game.roles import Role
+from game.engine import (
+    MAX_PLAYERS,
+    MIN_PLAYERS,
+    REPLAY_COMPRESS,
+    GameSession,
+    configure_game,
+    record_action,
+    send_event,
+    send_private,
+)
+from game.codec import JSON, FramedCodec, JsonCodec, wire_codec
+from game.events import Event, SheriffVote, Vote
+from game.inputs import InputDeadlines
+from game.replay_chunks import iter_replay_chunks
+from game.replay_log import ReplayReader
+from llm.client import aclose_clients
+
+logger = logging.getLogger("werewolf.server")
 
 app = FastAPI()
 
@@ -30,47 +48,145 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Tick"],
 )
 
-MIN_PLAYERS = 5
-MAX_PLAYERS = 12
+SEND_TIMEOUT = 2.0
+HEARTBEAT_INTERVAL = 15.0
+HEARTBEAT_TIMEOUT = 45.0
+
+DEFAULT_ROOM = "default"
+MAX_ROOMS = 500
+ROOM_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,32}$")
+REPLAY_DIR = Path(os.getenv("REPLAY_DIR", BACKEND_ROOT / "replays"))
+
 
-PLAYERS = [
-    {"id": "P1", "name": "P1", "alive": True},
-]
+def _deadline(name: str, default: float | None) -> float | None:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return float(value) if value.strip().lower() not in ("", "none") else None
 
-ROLES = {}
-AGENTS = {}
+
+# How long each phase waits for human input (seconds, "none" = no limit).
+INPUT_DEADLINES = InputDeadlines(
+    night=_deadline("NIGHT_INPUT_TIMEOUT", InputDeadlines.night),
+    sheriff=_deadline("SHERIFF_INPUT_TIMEOUT", InputDeadlines.sheriff),
+    vote=_deadline("VOTE_INPUT_TIMEOUT", InputDeadlines.vote),
+    speech=_deadline("SPEECH_INPUT_TIMEOUT", InputDeadlines.speech),
+)
+REPLAY_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+REPLAY_PAGE_LIMIT = 500
+
+WireCodec = JsonCodec | FramedCodec
+
+
+@dataclass(frozen=True)
+class OverflowPolicy:
+    """
+    What to do when a client cannot keep up with its outbound queue.
+
+    Spectators silently lose `non_critical` events once their backlog
+    reaches `spectator_drop_backlog`; players are disconnected once their
+    backlog reaches `player_max_backlog`. Anyone whose queue is full is
+    disconnected on the next critical event.
+    """
+
+    queue_size: int = 256
+    non_critical: frozenset = frozenset({"THINKING", "SPEECH_DELTA", "PING"})
+    spectator_drop_backlog: int = 16
+    player_max_backlog: int = 128
+
+
+class Connection:
+    def __init__(self, player_id: str, ws: WebSocket, spectator: bool, queue_size: int,
+                 codec: WireCodec = JSON) -> None:
+        self.player_id = player_id
+        self.ws = ws
+        self.spectator = spectator
+        self.codec = codec
+        self.queue: asyncio.Queue[str | bytes | None] = asyncio.Queue(maxsize=queue_size)
+        self.last_seen = time.monotonic()
+        self.dropped = 0
+        self.writer: asyncio.Task | None = None
+
+    def close(self, current: asyncio.Task | None = None) -> None:
+        # Discard the backlog and wake the writer with a sentinel; the
+        # cancel is a shortcut for a writer stuck in a slow send.
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+        if self.writer and self.writer is not current:
+            self.writer.cancel()
 
 
 class ConnectionManager:
-    def __init__(self) -> None:
-        self.connections = {}
+    """
+    Per-room socket registry. Every connection has a bounded outbound
+    queue drained by its own writer task, so sending never blocks the game
+    loop; a heartbeat task pings clients and evicts those that stop
+    answering (half-open TCP connections included). `on_leave` is called
+    with the id of every connection removed, however it went away.
+    """
+
+    def __init__(self, policy: OverflowPolicy | None = None,
+                 on_leave: Callable[[str], None] | None = None) -> None:
+        self.connections: dict[str, Connection] = {}
+        self.on_leave = on_leave
         self.spectators = set()
         self.lock = asyncio.Lock()
+        self.policy = policy or OverflowPolicy()
+        # enqueue_*: time for broadcast() to queue a frame to every connection;
+        # send_*: time for one connection's writer to write one frame.
+        self.fanout_stats = {
+            "broadcasts": 0, "enqueue_last_ms": 0.0, "enqueue_max_ms": 0.0, "enqueue_total_ms": 0.0,
+            "sends": 0, "send_last_ms": 0.0, "send_max_ms": 0.0, "send_total_ms": 0.0,
+            "evicted": 0, "dropped": 0,
+        }
+        self._heartbeat: asyncio.Task | None = None
+        # Background socket closes, referenced until done so they are not collected.
+        self._closing: set[asyncio.Task] = set()
 
-    async def connect(self, ws: WebSocket, mode: str | None = None) -> str | None:
+    async def connect(self, ws: WebSocket, players: list[dict], mode: str | None = None,
+                      codec: WireCodec = JSON) -> str | None:
         await ws.accept()
         async with self.lock:
+            pid = None
             if mode == "observer":
                 idx = 1
                 while f"OBS{idx}" in self.connections:
                     idx += 1
                 pid = f"OBS{idx}"
-                self.connections[pid] = ws
                 self.spectators.add(pid)
-                return pid
-            for player in PLAYERS:
-                pid = player["id"]
-                if pid not in self.connections:
-                    self.connections[pid] = ws
-                    return pid
-        return None
+            else:
+                pid = next((p["id"] for p in players if p["id"] not in self.connections), None)
+            if pid is None:
+                return None
+            conn = Connection(pid, ws, pid in self.spectators, self.policy.queue_size, codec)
+            conn.writer = asyncio.create_task(self._writer(conn))
+            self.connections[pid] = conn
+            if self._heartbeat is None or self._heartbeat.done():
+                self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+            return pid
 
     async def disconnect(self, player_id: str) -> None:
+        await self.disconnect_many([player_id])
+
+    async def disconnect_many(self, player_ids: list[str]) -> None:
+        current = asyncio.current_task()
+        left = []
         async with self.lock:
-            self.connections.pop(player_id, None)
-            self.spectators.discard(player_id)
+            for pid in player_ids:
+                conn = self.connections.pop(pid, None)
+                self.spectators.discard(pid)
+                if conn:
+                    conn.close(current)
+                    left.append(pid)
+            if not self.connections and self._heartbeat and self._heartbeat is not current:
+                self._heartbeat.cancel()
+        if self.on_leave:
+            for pid in left:
+                self.on_leave(pid)
 
     def is_connected(self, player_id: str) -> bool:
         return player_id in self.connections
@@ -78,321 +194,204 @@ class ConnectionManager:
     def is_spectator(self, player_id: str) -> bool:
         return player_id in self.spectators
 
-    async def broadcast(self, event: dict) -> None:
-        for pid, ws in list(self.connections.items()):
-            try:
-                await ws.send_text(json.dumps(event))
-            except Exception:
-                # Drop broken connections to avoid sending on closed sockets.
-                await self.disconnect(pid)
-
-    async def send_to(self, player_id: str, event: dict) -> None:
-        ws = self.connections.get(player_id)
-        if ws:
+    def has_listeners(self) -> bool:
+        return bool(self.connections)
+
+    def set_codec(self, player_id: str, codec: WireCodec) -> None:
+        conn = self.connections.get(player_id)
+        if conn:
+            conn.codec = codec
+
+    def touch(self, player_id: str) -> None:
+        conn = self.connections.get(player_id)
+        if conn:
+            conn.last_seen = time.monotonic()
+
+    async def broadcast(self, event: Event | dict) -> None:
+        if not self.connections:
+            return
+        started = time.perf_counter()
+        # Encode once per wire format (cached on typed events); enqueue to
+        # every connection without awaiting sockets.
+        frames: dict[str, str | bytes] = {}
+        event_type = event.get("type")
+        targets = list(self.connections.values())
+        failed = []
+        for conn in targets:
+            frame = frames.get(conn.codec.name)
+            if frame is None:
+                frame = frames[conn.codec.name] = conn.codec.encode(event)
+            if not self._offer(conn, frame, event_type):
+                failed.append(conn)
+        if failed:
+            await self._evict(failed)
+        self._record_enqueue(event, len(targets), len(failed), time.perf_counter() - started)
+
+    async def send_to(self, player_id: str, event: Event | dict) -> None:
+        conn = self.connections.get(player_id)
+        if conn and not self._offer(conn, conn.codec.encode(event), event.get("type")):
+            await self._evict([conn])
+
+    def _offer(self, conn: Connection, frame: str | bytes, event_type: str | None) -> bool:
+        """Queue a frame; False means the connection fell too far behind."""
+        policy = self.policy
+        backlog = conn.queue.qsize()
+        non_critical = event_type in policy.non_critical
+        if non_critical and conn.spectator and backlog >= policy.spectator_drop_backlog:
+            conn.dropped += 1
+            self.fanout_stats["dropped"] += 1
+            return True
+        if not conn.spectator and backlog >= policy.player_max_backlog:
+            return False
+        try:
+            conn.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            if non_critical:
+                conn.dropped += 1
+                self.fanout_stats["dropped"] += 1
+                return True
+            return False
+        return True
+
+    async def _writer(self, conn: Connection) -> None:
+        while True:
+            frame = await conn.queue.get()
+            if frame is None:
+                return
             try:
-                await ws.send_text(json.dumps(event))
+                send = conn.ws.send_bytes if isinstance(frame, bytes) else conn.ws.send_text
+                started = time.perf_counter()
+                await asyncio.wait_for(send(frame), SEND_TIMEOUT)
             except Exception:
-                await self.disconnect(player_id)
-
-
-manager = ConnectionManager()
-
-game_task: asyncio.Task | None = None
-
-GAME = {
-    "configured": False,
-    "player_count": 1,
-    "tick": 0,
-    "timeline": [],
-    "action_log": [],
-    "phase": "INIT",
-    "votes": {},
-    "sheriff_votes": {},
-    "sheriff_id": None,
-    "night": 0,
-    "day": 0,
-    "current_speaker": None,
-    "pending_speech": {},
-    "last_guard_target": None,
-    "last_night_deaths": [],
-    "potions": {"save": True, "poison": True},
-    "night_actions": {},
-    "lock": asyncio.Lock(),
-    "human_player_id": "P1",
-}
-
-
-def reset_game_state() -> None:
-    GAME.update(
-        {
-            "tick": 0,
-            "timeline": [],
-            "action_log": [],
-            "phase": "INIT",
-            "votes": {},
-            "sheriff_votes": {},
-            "sheriff_id": None,
-            "night": 0,
-            "day": 0,
-            "current_speaker": None,
-            "pending_speech": {},
-            "last_guard_target": None,
-            "last_night_deaths": [],
-            "potions": {"save": True, "poison": True},
-            "night_actions": {},
-            "human_player_id": GAME.get("human_player_id", "P1"),
-        }
-    )
-
-
-def build_roles(player_count: int) -> list[str]:
-    wolves = max(2, player_count // 3)
-    roles = ["WEREWOLF"] * wolves
-    roles += ["SEER", "WITCH", "GUARD"]
-    remaining = player_count - len(roles)
-    if remaining < 1:
-        remaining = 1
-    roles += ["VILLAGER"] * remaining
-    roles = roles[:player_count]
-    random.shuffle(roles)
-    return roles
-
-
-def configure_game(player_count: int, human_player_id: str | None = "P1") -> None:
-    global PLAYERS, ROLES, AGENTS
-
-    if player_count < MIN_PLAYERS or player_count > MAX_PLAYERS:
-        raise ValueError("invalid player_count")
-
-    PLAYERS = [{"id": "P1", "name": "P1", "alive": True}]
-    for i in range(2, player_count + 1):
-        PLAYERS.append({"id": f"P{i}", "name": f"P{i}", "alive": True})
-
-    role_list = build_roles(player_count)
-    ROLES = {player["id"]: role_list[idx] for idx, player in enumerate(PLAYERS)}
-
-    AGENTS = {}
-    for player in PLAYERS:
-        pid = player["id"]
-        if human_player_id and pid == human_player_id:
-            AGENTS[pid] = HumanAgent(pid)
-            continue
-        role = Role[ROLES[pid]]
-        personality = Personality(
-            aggressiveness=round(random.uniform(0.2, 0.9), 2),
-            deception=round(random.uniform(0.2, 0.9), 2),
-            logic=round(random.uniform(0.2, 0.9), 2),
-            tone=random.choice(["cautious", "bold", "skeptical", "warm", "cold"]),
-            quirk=random.choice([
-                "asks short questions",
-                "speaks in concise points",
-                "prefers evidence",
-                "focuses on contradictions",
-                "avoids overcommitting",
-            ]),
+                break
+            self._record_send(conn, time.perf_counter() - started)
+        await self._evict([conn])
+
+    async def _heartbeat_loop(self) -> None:
+        while self.connections:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            now = time.monotonic()
+            stale = [c for c in self.connections.values() if now - c.last_seen > HEARTBEAT_TIMEOUT]
+            if stale:
+                await self._evict(stale)
+            await self.broadcast({"type": "PING"})
+
+    async def _evict(self, conns: list[Connection]) -> None:
+        # Drop in one batch, then close the sockets in the background.
+        await self.disconnect_many([c.player_id for c in conns])
+        self.fanout_stats["evicted"] += len(conns)
+        for conn in conns:
+            task = asyncio.create_task(self._close_quietly(conn.ws))
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+
+    async def _close_quietly(self, ws: WebSocket) -> None:
+        with contextlib.suppress(Exception):
+            await asyncio.wait_for(ws.close(), SEND_TIMEOUT)
+
+    def _record_enqueue(self, event: Event | dict, queued: int, failed: int, elapsed: float) -> None:
+        ms = elapsed * 1000
+        stats = self.fanout_stats
+        stats["broadcasts"] += 1
+        stats["enqueue_last_ms"] = ms
+        stats["enqueue_max_ms"] = max(stats["enqueue_max_ms"], ms)
+        stats["enqueue_total_ms"] += ms
+        logger.debug(
+            "queued %s for %d sockets in %.2fms (%d evicted)",
+            event.get("type"), queued, ms, failed,
         )
-        agent = AIAgent(pid, role, personality=personality)
-        agent.memory.alive_players = {p["id"] for p in PLAYERS}
-        AGENTS[pid] = agent
-
-    wolf_ids = {pid for pid, role in ROLES.items() if role == "WEREWOLF"}
-    for pid in wolf_ids:
-        if pid in AGENTS:
-            AGENTS[pid].wolf_team = wolf_ids
 
-    GAME["human_player_id"] = human_player_id
-    reset_game_state()
-    GAME["configured"] = True
-    GAME["player_count"] = player_count
+    def _record_send(self, conn: Connection, elapsed: float) -> None:
+        ms = elapsed * 1000
+        stats = self.fanout_stats
+        stats["sends"] += 1
+        stats["send_last_ms"] = ms
+        stats["send_max_ms"] = max(stats["send_max_ms"], ms)
+        stats["send_total_ms"] += ms
+        logger.debug("sent a frame to %s in %.2fms (%d queued)", conn.player_id, ms, conn.queue.qsize())
 
 
-def living_player_ids() -> list:
-    return [p["id"] for p in PLAYERS if p["alive"]]
+class Room(GameSession):
+    """A GameSession played over WebSockets; `manager` is its sink."""
 
+    def __init__(self, room_id: str) -> None:
+        self.manager = ConnectionManager(on_leave=self._seat_left)
+        super().__init__(room_id, sink=self.manager, replay_dir=REPLAY_DIR, deadlines=INPUT_DEADLINES)
 
-def mark_dead(player_id: str) -> None:
-    for player in PLAYERS:
-        if player["id"] == player_id:
-            player["alive"] = False
-            break
-    for agent in AGENTS.values():
-        if hasattr(agent, "memory"):
-            agent.memory.alive_players.discard(player_id)
+    def _seat_left(self, player_id: str) -> None:
+        # Closed, timed out or evicted: stop waiting for this seat's input.
+        self.inputs.abandon(player_id)
 
 
-def check_win() -> str | None:
-    alive = set(living_player_ids())
-    wolves = {pid for pid, role in ROLES.items() if role == "WEREWOLF"}
-    alive_wolves = alive & wolves
-    alive_others = alive - wolves
+ROOMS: dict[str, Room] = {}
 
-    if not alive_wolves:
-        return "VILLAGERS_WIN"
-    if len(alive_wolves) >= len(alive_others):
-        return "WEREWOLVES_WIN"
-    return None
 
-
-def observe_event(event: dict) -> None:
-    text = json.dumps(event, ensure_ascii=False)
-    for agent in AGENTS.values():
-        agent.observe(text)
-        if event.get("type") == "INIT" and hasattr(agent, "memory"):
-            try:
-                agent.memory.set_players(event.get("players", []))
-            except Exception:
-                pass
-        if event.get("type") == "SPEECH" and hasattr(agent, "memory"):
-            try:
-                agent.memory.add_speech(event.get("playerId", "?"), event.get("text", ""))
-            except Exception:
-                pass
-
-
-async def send_event(event: dict) -> None:
-    async with GAME["lock"]:
-        tick = GAME["tick"]
-        GAME["tick"] += 1
-        GAME["timeline"].append({"tick": tick, "event": event})
-
-    if event.get("type") == "SPEECH":
-        text = event.get("text")
-        if isinstance(text, str):
-            event["text"] = _sanitize_speech(text) or ""
-        print(f"[SPEECH] {event.get('playerId')}: {event.get('text')}")
-
-    observe_event(event)
-    await manager.broadcast(event)
-
-
-async def send_private(player_id: str, event: dict) -> None:
-    if event.get("type") == "SPEECH":
-        print(f"[SPEECH][private] {player_id}: {event.get('text')}")
-    observe_event(event)
-    await manager.send_to(player_id, event)
-
-
-def record_action(action: dict) -> None:
-    entry = {
-        "phase": GAME.get("phase"),
-        "night": GAME.get("night"),
-        "day": GAME.get("day"),
-    }
-    entry.update(action)
-    GAME["action_log"].append(entry)
+def get_or_create_room(room_id: str) -> Room | None:
+    session = ROOMS.get(room_id)
+    if session is None:
+        if len(ROOMS) >= MAX_ROOMS:
+            return None
+        session = Room(room_id)
+        ROOMS[room_id] = session
+    return session
 
 
-def is_player_mode() -> bool:
-    return bool(GAME.get("human_player_id"))
-
-
-def append_replay_event(event: dict) -> None:
-    tick = GAME["tick"]
-    GAME["tick"] += 1
-    GAME["timeline"].append({"tick": tick, "event": event})
-
-
-def build_agent_context(player_id: str, phase: str) -> dict:
-    role = ROLES.get(player_id)
-    context = {
-        "phase": phase,
-        "player_id": player_id,
-        "role": role,
-        "alive_players": living_player_ids(),
-        "dead_players": [p["id"] for p in PLAYERS if not p["alive"]],
-        "night": GAME.get("night"),
-        "day": GAME.get("day"),
-        "last_night_deaths": GAME.get("last_night_deaths", []),
-        "last_guard_target": GAME.get("last_guard_target"),
-        "potions": GAME.get("potions", {}),
-    }
-    agent = AGENTS.get(player_id)
-    if agent and getattr(agent, "wolf_team", None):
-        context["wolf_team"] = sorted(list(agent.wolf_team))
-    return context
-
-
-async def _agent_act(agent: AIAgent, phase: str, context: dict | None = None) -> dict:
-    return await asyncio.to_thread(agent.act, phase, context)
-
-
-def _valid_target(target: str | None) -> str | None:
-    if not target:
-        return None
-    alive = set(living_player_ids())
-    return target if target in alive else None
-
-
-def _sanitize_speech(text: str | None, speaker_id: str | None = None) -> str | None:
-    if not text:
-        return text
-    cleaned = text.strip()
-    # Drop any stray "undefined" tokens from model output.
-    cleaned = cleaned.replace("undefined", "").replace("Undefined", "").replace("UNDEFINED", "")
-    cleaned = cleaned.strip()
-    # Replace ambiguous single "P" with the speaker id when available.
-    if speaker_id:
-        cleaned = re.sub(r"\bP\b", speaker_id, cleaned)
-        cleaned = re.sub(r"\bP(?!\d)\b", speaker_id, cleaned)
-    # Prevent AI from claiming a living player is dead.
-    alive = set(living_player_ids())
-    for pid in alive:
-        pattern = f"{pid}.{{0,6}}(\u5df2\u6b7b|\u6b7b\u4ea1|\u6b7b\u4e86|\u51fa\u5c40|\u88ab\u6295|\u88ab\u5200)"
-        if re.search(pattern, cleaned):
-            cleaned = re.sub(pattern, f"{pid}\u4ecd\u5b58\u6d3b", cleaned)
-    return cleaned
-
-
-def choose_wolf_target() -> str | None:
-    alive = [pid for pid in living_player_ids() if ROLES.get(pid) != "WEREWOLF"]
-    return alive[0] if alive else None
-
-
-def choose_seer_target() -> str | None:
-    alive = [pid for pid in living_player_ids() if ROLES.get(pid) != "SEER"]
-    return alive[0] if alive else None
-
-
-def choose_guard_target() -> str | None:
-    alive = living_player_ids()
-    if not alive:
-        return None
-    target = alive[-1]
-    if target == GAME["last_guard_target"] and len(alive) > 1:
-        target = alive[0]
-    return target
-
-
-def choose_witch_poison_target() -> str | None:
-    alive_wolves = [pid for pid in living_player_ids() if ROLES.get(pid) == "WEREWOLF"]
-    return alive_wolves[0] if alive_wolves else None
+def release_room(session: Room) -> None:
+    # Tear the table down once its last connection is gone.
+    if session.manager.connections:
+        return
+    session.stop()
+    if ROOMS.get(session.room_id) is session:
+        del ROOMS[session.room_id]
 
 
-async def send_init_to(player_id: str) -> None:
-    await manager.send_to(player_id, {
+async def send_init_to(session: Room, player_id: str) -> None:
+    await session.manager.send_to(player_id, {
         "type": "INIT",
-        "players": PLAYERS,
+        "players": session.players,
         "selfId": player_id,
     })
-    if manager.is_spectator(player_id):
-        await manager.send_to(player_id, {
+    if session.manager.is_spectator(player_id):
+        await session.manager.send_to(player_id, {
             "type": "ROLE_MAP",
-            "roles": {p["id"]: ROLES.get(p["id"]) for p in PLAYERS},
+            "roles": {p["id"]: session.roles.get(p["id"]) for p in session.players},
         })
     else:
-        await manager.send_to(player_id, {
+        await session.manager.send_to(player_id, {
             "type": "ROLE",
             "playerId": player_id,
-            "role": ROLES.get(player_id),
+            "role": session.roles.get(player_id),
         })
 
 
-async def broadcast_init() -> None:
-    for pid in list(manager.connections.keys()):
-        await send_init_to(pid)
+async def broadcast_init(session: Room) -> None:
+    for pid in list(session.manager.connections.keys()):
+        await send_init_to(session, pid)
+
 
+def negotiate_codec(encoding, compress) -> WireCodec:
+    """
+    Wire format requested by a client, via the `encoding`/`compress` query
+    params or an ENCODING message: "json" (default) or "msgpack", with
+    frames over COMPRESS_THRESHOLD deflated when `compress` is set.
+    Unavailable encodings fall back to JSON.
+    """
+    if isinstance(compress, str):
+        compress = compress.lower() in ("1", "true", "yes", "deflate")
+    return wire_codec(encoding if isinstance(encoding, str) else None, bool(compress))
 
-async def handle_client_messages(ws: WebSocket, player_id: str) -> None:
+
+def encoding_ack(codec: WireCodec) -> dict:
+    framed = isinstance(codec, FramedCodec)
+    return {
+        "type": "ENCODING",
+        "encoding": codec.base.name if framed else codec.name,
+        "compress": framed and codec.threshold is not None,
+        "threshold": codec.threshold if framed else None,
+    }
+
+
+async def handle_client_messages(session: Room, ws: WebSocket, player_id: str) -> None:
     try:
         while True:
             raw = await ws.receive_text()
@@ -401,73 +400,84 @@ async def handle_client_messages(ws: WebSocket, player_id: str) -> None:
             except json.JSONDecodeError:
                 continue
 
+            session.manager.touch(player_id)
             msg_type = msg.get("type")
-            phase = GAME.get("phase")
+            phase = session.game.get("phase")
+            if msg_type == "PONG":
+                continue
+            if msg_type == "ENCODING":
+                codec = negotiate_codec(msg.get("encoding"), msg.get("compress"))
+                session.manager.set_codec(player_id, codec)
+                await session.manager.send_to(player_id, encoding_ack(codec))
+                continue
+            if msg_type == "REPLAY_FETCH":
+                streams = session.game.get("replay_streams")
+                wanted = msg.get("chunks")
+                if streams and msg.get("gameId") == session.game.get("replay_id") and isinstance(wanted, dict):
+                    for chunk in iter_replay_chunks(session.game["replay_id"], streams,
+                                                    compress=REPLAY_COMPRESS, only=wanted):
+                        await session.manager.send_to(player_id, chunk)
+                continue
             if msg_type == "CONFIG":
                 try:
                     count = int(msg.get("playerCount", 0))
                     observer = bool(msg.get("observer", False))
                     human_id = None if observer else "P1"
-                    configure_game(count, human_player_id=human_id)
+                    configure_game(session, count, human_player_id=human_id)
                 except Exception:
-                    await send_private(player_id, {
+                    await send_private(session, player_id, {
                         "type": "CONFIG_ERROR",
                         "message": f"\u73a9\u5bb6\u4eba\u6570\u8303\u56f4\uff1a{MIN_PLAYERS}-{MAX_PLAYERS}"
                     })
                     continue
 
-                await broadcast_init()
+                await broadcast_init(session)
 
-                global game_task
-                if game_task and not game_task.done():
-                    game_task.cancel()
-                game_task = asyncio.create_task(game_loop())
+                session.start()
             elif msg_type == "SPEECH" and phase == "DAY":
-                if GAME.get("current_speaker") != player_id:
+                if session.game.get("current_speaker") != player_id:
                     continue
-                if player_id not in living_player_ids():
+                if not session.registry.is_alive(player_id):
                     continue
                 text = (msg.get("text", "") or "").strip()
                 if not text:
                     text = "\uFF08\u8DF3\u8FC7\uFF09"
-                GAME["pending_speech"][player_id] = text
+                session.game["pending_speech"][player_id] = text
+                session.inputs.submit("speech", player_id)
             elif msg_type == "SPEECH_SKIP" and phase == "DAY":
-                if GAME.get("current_speaker") != player_id:
+                if session.game.get("current_speaker") != player_id:
                     continue
-                if player_id not in living_player_ids():
+                if not session.registry.is_alive(player_id):
                     continue
-                GAME["pending_speech"][player_id] = "\uFF08\u8DF3\u8FC7\uFF09"
+                session.game["pending_speech"][player_id] = "\uFF08\u8DF3\u8FC7\uFF09"
+                session.inputs.submit("speech", player_id)
             elif msg_type == "VOTE" and phase == "VOTE":
-                if player_id not in living_player_ids():
+                if not session.registry.is_alive(player_id):
                     continue
                 to_id = msg.get("to")
-                if to_id not in living_player_ids():
+                if not session.registry.is_alive(to_id):
                     continue
-                GAME["votes"][player_id] = to_id
-                await send_event({
-                    "type": "VOTE",
-                    "from": player_id,
-                    "to": to_id
-                })
-                record_action({
+                session.game["votes"][player_id] = to_id
+                session.inputs.submit("vote", player_id)
+                await send_event(session, Vote(player_id, to_id))
+                record_action(session, {
                     "type": "VOTE",
                     "from": player_id,
                     "to": to_id,
                     "source": "human",
                 })
             elif msg_type == "SHERIFF_VOTE" and phase == "SHERIFF":
-                if player_id not in living_player_ids():
+                if not session.registry.is_alive(player_id):
                     continue
                 to_id = msg.get("to")
+                if to_id is not None and not isinstance(to_id, str):
+                    continue
                 if to_id == "ABSTAIN":
                     to_id = None
-                GAME["sheriff_votes"][player_id] = to_id
-                await send_event({
-                    "type": "SHERIFF_VOTE",
-                    "from": player_id,
-                    "to": to_id or "ABSTAIN"
-                })
-                record_action({
+                session.game["sheriff_votes"][player_id] = to_id
+                session.inputs.submit("sheriff", player_id)
+                await send_event(session, SheriffVote(player_id, to_id or "ABSTAIN"))
+                record_action(session, {
                     "type": "SHERIFF_VOTE",
                     "from": player_id,
                     "to": to_id or "ABSTAIN",
@@ -476,695 +486,63 @@ async def handle_client_messages(ws: WebSocket, player_id: str) -> None:
             elif msg_type == "NIGHT_ACTION" and phase == "NIGHT":
                 action_type = msg.get("actionType")
                 target = msg.get("target")
-                if player_id not in living_player_ids():
-                    await send_private(player_id, {
+                if not session.registry.is_alive(player_id):
+                    await send_private(session, player_id, {
                         "type": "NIGHT_ACTION_ACK",
                         "ok": False,
                         "message": "\u4f60\u5df2\u51fa\u5c40\uff0c\u65e0\u6cd5\u884c\u52a8",
                     })
                     continue
-                if action_type:
-                    GAME["night_actions"][player_id] = {
+                if action_type and (target is None or isinstance(target, str)):
+                    session.game["night_actions"][player_id] = {
                         "actionType": action_type,
                         "target": target
                     }
-                    await send_private(player_id, {
+                    session.inputs.submit("night", player_id)
+                    await send_private(session, player_id, {
                         "type": "NIGHT_ACTION_ACK",
                         "ok": True,
                         "actionType": action_type,
                         "target": target,
                     })
                 else:
-                    await send_private(player_id, {
+                    await send_private(session, player_id, {
                         "type": "NIGHT_ACTION_ACK",
                         "ok": False,
                         "message": "\u884c\u52a8\u65e0\u6548",
                     })
     except WebSocketDisconnect:
         return
-async def run_night(night_idx: int) -> list:
-    GAME["phase"] = "NIGHT"
-    GAME["night_actions"].clear()
-    await send_event({"type": "PHASE", "phase": "NIGHT"})
-    await send_event({
-        "type": "SPEECH",
-        "playerId": "SYSTEM",
-        "text": "\u5929\u9ed1\u8bf7\u95ed\u773c\u3002"
-    })
-    await send_event({
-        "type": "SPEECH",
-        "playerId": "SYSTEM",
-        "text": "\u591c\u665a\u9636\u6bb5\u5f00\u59cb\u3002"
-    })
-
-    # Private prompts
-    for pid, role in ROLES.items():
-        if pid not in living_player_ids():
-            continue
-        if not manager.is_connected(pid):
-            continue
-        await send_private(pid, {
-            "type": "NIGHT_SKILL",
-            "playerId": pid,
-            "role": role,
-            "hint": "Choose a target privately."
-        })
-
-    # AI night actions (ordered)
-    await send_event({
-        "type": "SPEECH",
-        "playerId": "SYSTEM",
-        "text": "\u72fc\u4eba\u8bf7\u8fdb\u884c\u884c\u52a8\u3002"
-    })
-    for pid, role in ROLES.items():
-        if role != "WEREWOLF":
-            continue
-        if pid == GAME.get("human_player_id") or pid not in AGENTS:
-            continue
-        if pid not in living_player_ids():
-            continue
-        agent = AGENTS[pid]
-        context = build_agent_context(pid, "NIGHT")
-        result = await _agent_act(agent, "NIGHT", context)
-        action = result.get("action", {}) if isinstance(result, dict) else {}
-        target = _valid_target(action.get("kill")) or choose_wolf_target()
-        GAME["night_actions"][pid] = {"actionType": "WEREWOLF", "target": target}
-
-    # Resolve wolf target early for witch context.
-    wolf_target_hint = None
-    for pid, action in GAME["night_actions"].items():
-        role = ROLES.get(pid)
-        action_type = action.get("actionType")
-        target = action.get("target")
-        if role == "WEREWOLF" and action_type == "WEREWOLF":
-            if target in living_player_ids() and ROLES.get(target) != "WEREWOLF":
-                wolf_target_hint = target
-                break
-
-    await send_event({
-        "type": "SPEECH",
-        "playerId": "SYSTEM",
-        "text": "\u9884\u8a00\u5bb6\u8bf7\u8fdb\u884c\u67e5\u9a8c\u3002"
-    })
-    await send_event({
-        "type": "SPEECH",
-        "playerId": "SYSTEM",
-        "text": "\u5b88\u536b\u8bf7\u8fdb\u884c\u5b88\u62a4\u3002"
-    })
-    await send_event({
-        "type": "SPEECH",
-        "playerId": "SYSTEM",
-        "text": "\u5973\u5deb\u8bf7\u51b3\u5b9a\u662f\u5426\u4f7f\u7528\u89e3\u836f\u3002"
-    })
-    await send_event({
-        "type": "SPEECH",
-        "playerId": "SYSTEM",
-        "text": "\u5973\u5deb\u8bf7\u51b3\u5b9a\u662f\u5426\u4f7f\u7528\u6bd2\u836f\u3002"
-    })
-    for pid, role in ROLES.items():
-        if role == "WEREWOLF":
-            continue
-        if pid == GAME.get("human_player_id") or pid not in AGENTS:
-            continue
-        if pid not in living_player_ids():
-            continue
-        agent = AGENTS[pid]
-        context = build_agent_context(pid, "NIGHT")
-        if role == "WITCH" and wolf_target_hint:
-            context["wolf_target"] = wolf_target_hint
-        result = await _agent_act(agent, "NIGHT", context)
-        action = result.get("action", {}) if isinstance(result, dict) else {}
-
-        if role == "SEER":
-            target = _valid_target(action.get("check")) or choose_seer_target()
-            GAME["night_actions"][pid] = {"actionType": "SEER", "target": target}
-        elif role == "GUARD":
-            target = _valid_target(action.get("guard")) or choose_guard_target()
-            GAME["night_actions"][pid] = {"actionType": "GUARD", "target": target}
-        elif role == "WITCH":
-            poison_target = _valid_target(action.get("poison")) or None
-            if poison_target:
-                GAME["night_actions"][pid] = {"actionType": "WITCH_POISON", "target": poison_target}
-            elif action.get("save"):
-                GAME["night_actions"][pid] = {"actionType": "WITCH_SAVE", "target": None}
-
-    # Allow clients to submit night actions
-    await asyncio.sleep(3)
-
-    wolf_target = None
-    seer_target = None
-    guard_target = None
-    witch_save = False
-    witch_poison_target = None
-
-    for pid, action in GAME["night_actions"].items():
-        role = ROLES.get(pid)
-        action_type = action.get("actionType")
-        target = action.get("target")
-        if role == "WEREWOLF" and action_type == "WEREWOLF":
-            if target in living_player_ids() and ROLES.get(target) != "WEREWOLF":
-                wolf_target = target
-        elif role == "SEER" and action_type == "SEER":
-            if target in living_player_ids() and target != pid:
-                seer_target = target
-        elif role == "GUARD" and action_type == "GUARD":
-            if target in living_player_ids():
-                if target != GAME["last_guard_target"] or len(living_player_ids()) <= 1:
-                    guard_target = target
-        elif role == "WITCH":
-            if action_type == "WITCH_SAVE":
-                witch_save = True
-            elif action_type == "WITCH_POISON":
-                if target in living_player_ids() and target != pid:
-                    witch_poison_target = target
-
-    if wolf_target is None:
-        wolf_target = choose_wolf_target()
-    if seer_target is None:
-        seer_target = choose_seer_target()
-    if guard_target is None:
-        guard_target = choose_guard_target()
-    GAME["last_guard_target"] = guard_target
-
-    save_available = GAME["potions"]["save"]
-    poison_available = GAME["potions"]["poison"]
-
-    guard_blocks = wolf_target is not None and wolf_target == guard_target
-    wolf_death = wolf_target if wolf_target and not guard_blocks else None
-
-    if witch_save:
-        if not save_available:
-            witch_save = False
-        elif wolf_death:
-            wolf_death = None
-            GAME["potions"]["save"] = False
-        else:
-            witch_save = False
-
-    if witch_poison_target and not poison_available:
-        witch_poison_target = None
-    if witch_poison_target:
-        GAME["potions"]["poison"] = False
-
-    # Private seer result
-    if seer_target:
-        seer_result = ROLES.get(seer_target)
-        seer_player = next((pid for pid, role in ROLES.items() if role == "SEER"), None)
-        if seer_player:
-            await send_private(seer_player, {
-                "type": "SEER_RESULT",
-                "target": seer_target,
-                "role": seer_result
-            })
-
-    deaths = []
-    if wolf_death:
-        deaths.append(wolf_death)
-    if witch_poison_target:
-        deaths.append(witch_poison_target)
-
-
-    for pid, role in ROLES.items():
-        if not manager.is_connected(pid):
-            continue
-        if role == "WEREWOLF":
-            await send_private(pid, {
-                "type": "NIGHT_ACTION_ACK",
-                "playerId": pid,
-                "actionType": "WEREWOLF",
-                "target": wolf_target,
-                "status": "ok" if wolf_target else "rejected"
-            })
-        elif role == "SEER":
-            await send_private(pid, {
-                "type": "NIGHT_ACTION_ACK",
-                "playerId": pid,
-                "actionType": "SEER",
-                "target": seer_target,
-                "status": "ok" if seer_target else "rejected"
-            })
-        elif role == "GUARD":
-            await send_private(pid, {
-                "type": "NIGHT_ACTION_ACK",
-                "playerId": pid,
-                "actionType": "GUARD",
-                "target": guard_target,
-                "status": "ok" if guard_target else "rejected"
-            })
-        elif role == "WITCH":
-            await send_private(pid, {
-                "type": "NIGHT_ACTION_ACK",
-                "playerId": pid,
-                "actionType": "WITCH_SAVE",
-                "target": wolf_target if witch_save else None,
-                "status": "ok" if witch_save else "rejected"
-            })
-            await send_private(pid, {
-                "type": "NIGHT_ACTION_ACK",
-                "playerId": pid,
-                "actionType": "WITCH_POISON",
-                "target": witch_poison_target,
-                "status": "ok" if witch_poison_target else "rejected"
-            })
-
-    # Record resolved night actions for end-game replay.
-    def wolf_action_status(target: str | None) -> str:
-        if not target:
-            return "rejected"
-        if target != wolf_target:
-            return "overruled"
-        if wolf_death == target:
-            return "success"
-        if guard_blocks and target == guard_target:
-            return "blocked_by_guard"
-        if witch_save and target == wolf_target:
-            return "saved_by_witch"
-        return "no_effect"
-
-    for pid, role in ROLES.items():
-        if role != "WEREWOLF":
-            continue
-        action = GAME["night_actions"].get(pid, {})
-        if action.get("actionType") != "WEREWOLF":
-            continue
-        target = action.get("target")
-        record_action({
-            "type": "NIGHT_ACTION",
-            "playerId": pid,
-            "role": "WEREWOLF",
-            "actionType": "WEREWOLF_KILL",
-            "target": target,
-            "status": wolf_action_status(target),
-        })
-
-    seer_player = next((pid for pid, role in ROLES.items() if role == "SEER"), None)
-    if seer_player:
-        action = GAME["night_actions"].get(seer_player)
-        if action and action.get("actionType") == "SEER":
-            target = action.get("target")
-            ok = bool(target and target in living_player_ids() and target != seer_player)
-            record_action({
-                "type": "NIGHT_ACTION",
-                "playerId": seer_player,
-                "role": "SEER",
-                "actionType": "SEER_CHECK",
-                "target": target,
-                "status": "ok" if ok else "rejected",
-                "resultRole": ROLES.get(target) if ok else None,
-            })
-        elif seer_target:
-            record_action({
-                "type": "NIGHT_ACTION",
-                "playerId": seer_player,
-                "role": "SEER",
-                "actionType": "SEER_CHECK",
-                "target": seer_target,
-                "status": "auto",
-                "resultRole": ROLES.get(seer_target),
-            })
-
-    guard_player = next((pid for pid, role in ROLES.items() if role == "GUARD"), None)
-    if guard_player:
-        action = GAME["night_actions"].get(guard_player)
-        if action and action.get("actionType") == "GUARD":
-            target = action.get("target")
-            ok = bool(target and target in living_player_ids())
-            status = "ok"
-            if not ok:
-                status = "rejected"
-            elif target == GAME["last_guard_target"] and len(living_player_ids()) > 1:
-                status = "rejected_same_target"
-            elif guard_blocks and target == guard_target:
-                status = "blocked_attack"
-            record_action({
-                "type": "NIGHT_ACTION",
-                "playerId": guard_player,
-                "role": "GUARD",
-                "actionType": "GUARD_PROTECT",
-                "target": target,
-                "status": status,
-            })
-        elif guard_target:
-            status = "blocked_attack" if guard_blocks and guard_target == wolf_target else "auto"
-            record_action({
-                "type": "NIGHT_ACTION",
-                "playerId": guard_player,
-                "role": "GUARD",
-                "actionType": "GUARD_PROTECT",
-                "target": guard_target,
-                "status": status,
-            })
-
-    witch_player = next((pid for pid, role in ROLES.items() if role == "WITCH"), None)
-    if witch_player:
-        action = GAME["night_actions"].get(witch_player)
-        if action and action.get("actionType") == "WITCH_SAVE":
-            record_action({
-                "type": "NIGHT_ACTION",
-                "playerId": witch_player,
-                "role": "WITCH",
-                "actionType": "WITCH_SAVE",
-                "target": wolf_target if action else None,
-                "status": "ok" if witch_save else "rejected",
-            })
-        elif action and action.get("actionType") == "WITCH_POISON":
-            target = action.get("target")
-            record_action({
-                "type": "NIGHT_ACTION",
-                "playerId": witch_player,
-                "role": "WITCH",
-                "actionType": "WITCH_POISON",
-                "target": target,
-                "status": "ok" if witch_poison_target == target else "rejected",
-            })
-
-    # Public timeline summary for end-game replay.
-    def _who_did_what() -> list[str]:
-        parts = []
-        wolf_lines = []
-        for pid, role in ROLES.items():
-            if role != "WEREWOLF":
-                continue
-            action = GAME["night_actions"].get(pid, {})
-            if action.get("actionType") != "WEREWOLF":
-                continue
-            target = action.get("target")
-            if target:
-                wolf_lines.append(f"{pid}刀了{target}")
-        if wolf_lines:
-            parts.append("狼人请进行行动：" + "，".join(wolf_lines) + "。")
-
-        if seer_player:
-            target = seer_target or (GAME["night_actions"].get(seer_player, {}) or {}).get("target")
-            if target:
-                parts.append(f"预言家进行查验：{seer_player}验了{target}。")
-
-        if guard_player:
-            target = guard_target or (GAME["night_actions"].get(guard_player, {}) or {}).get("target")
-            if target:
-                parts.append(f"守卫进行守护：{guard_player}守了{target}。")
-
-        if witch_player:
-            action = GAME["night_actions"].get(witch_player, {})
-            if action.get("actionType") == "WITCH_SAVE":
-                target = wolf_target if wolf_target else "无人"
-                parts.append(f"女巫使用解药：{witch_player}救了{target}。")
-            elif action.get("actionType") == "WITCH_POISON":
-                target = action.get("target")
-                if target:
-                    parts.append(f"女巫使用毒药：{witch_player}毒了{target}。")
-        return parts
-
-    if is_player_mode():
-        for line in _who_did_what():
-            append_replay_event({
-                "type": "SPEECH",
-                "playerId": "SYSTEM",
-                "text": line,
-            })
-    else:
-        for line in _who_did_what():
-            await send_event({
-                "type": "SPEECH",
-                "playerId": "SYSTEM",
-                "text": line,
-            })
-    return list(dict.fromkeys(deaths))
-
-
-async def run_day(day_idx: int, night_deaths: list) -> None:
-    GAME["phase"] = "DAY"
-    await send_event({"type": "PHASE", "phase": "DAY"})
-    await send_event({
-        "type": "SPEECH",
-        "playerId": "SYSTEM",
-        "text": "\u5929\u4eae\u4e86\u3002"
-    })
-
-    if night_deaths:
-        report_text = f"\u6628\u591c\u6b7b\u4ea1\uff1a{'、'.join(night_deaths)}\u3002"
-    else:
-        report_text = "\u6628\u591c\u65e0\u4eba\u6b7b\u4ea1\u3002"
-    await send_event({
-        "type": "SPEECH",
-        "playerId": "SYSTEM",
-        "text": report_text
-    })
-
-    for player_id in night_deaths:
-        mark_dead(player_id)
-        await send_event({"type": "DEATH", "playerId": player_id})
-
-    # Speaking order: each alive player gets a turn.
-    for pid in living_player_ids():
-        GAME["current_speaker"] = pid
-        await asyncio.sleep(0.2)
-        if pid != "P1" or not manager.is_connected(pid):
-            await send_event({"type": "THINKING", "playerId": pid})
-            await asyncio.sleep(0.4)
-        await send_event({"type": "SPEECH_START", "playerId": pid})
-        if pid == GAME.get("human_player_id") and manager.is_connected(pid):
-            while pid not in GAME["pending_speech"]:
-                # Wait for user input; do not auto-skip on a timer.
-                if not manager.is_connected(pid):
-                    break
-                await asyncio.sleep(0.2)
-            text = GAME["pending_speech"].pop(pid, None) or "\uFF08\u8DF3\u8FC7\uFF09"
-        else:
-            agent = AGENTS.get(pid)
-            context = build_agent_context(pid, "DAY")
-            result = await _agent_act(agent, "DAY", context) if agent else {}
-            speech = result.get("speech") if isinstance(result, dict) else None
-            speech = _sanitize_speech(speech, pid)
-            text = speech or "\uFF08\u8DF3\u8FC7\uFF09"
-        await send_event({
-            "type": "SPEECH",
-            "playerId": pid,
-            "text": text
-        })
-        GAME["current_speaker"] = None
-
-
-async def run_sheriff_election() -> None:
-    GAME["phase"] = "SHERIFF"
-    GAME["sheriff_votes"].clear()
-    await send_event({"type": "PHASE", "phase": "SHERIFF"})
-
-    # AI sheriff votes
-    alive = living_player_ids()
-    for pid in alive:
-        if manager.is_connected(pid):
-            continue
-        agent = AGENTS.get(pid)
-        target = None
-        if agent:
-            context = build_agent_context(pid, "SHERIFF")
-            result = await _agent_act(agent, "SHERIFF", context)
-            action = result.get("action", {}) if isinstance(result, dict) else {}
-            target = _valid_target(action.get("vote"))
-        if not target:
-            target = alive[0] if alive else None
-        GAME["sheriff_votes"][pid] = target
-        await asyncio.sleep(0.2)
-        await send_event({"type": "SHERIFF_VOTE", "from": pid, "to": target or "ABSTAIN"})
-        record_action({
-            "type": "SHERIFF_VOTE",
-            "from": pid,
-            "to": target or "ABSTAIN",
-            "source": "ai",
-        })
-
-    await asyncio.sleep(1)
-
-    tally = Counter(v for v in GAME["sheriff_votes"].values() if v)
-    if not tally:
-        await send_event({"type": "SHERIFF_NONE"})
-        return
-
-    top = tally.most_common()
-    if len(top) > 1 and top[0][1] == top[1][1]:
-        await send_event({"type": "SHERIFF_TIE"})
-        return
-
-    sheriff_id = top[0][0]
-    GAME["sheriff_id"] = sheriff_id
-    await send_event({"type": "SHERIFF", "playerId": sheriff_id})
-
-
-async def run_vote() -> str | None:
-    GAME["phase"] = "VOTE"
-    GAME["votes"].clear()
-    await send_event({"type": "PHASE", "phase": "VOTE"})
-    await send_event({
-        "type": "SPEECH",
-        "playerId": "SYSTEM",
-        "text": "\u5f00\u59cb\u6295\u7968\u3002"
-    })
-
-    # AI votes for non-connected players
-    alive = living_player_ids()
-    for pid in alive:
-        if manager.is_connected(pid):
-            continue
-        agent = AGENTS.get(pid)
-        target = None
-        if agent:
-            context = build_agent_context(pid, "VOTE")
-            result = await _agent_act(agent, "VOTE", context)
-            action = result.get("action", {}) if isinstance(result, dict) else {}
-            target = _valid_target(action.get("vote"))
-        if not target:
-            target = alive[0] if alive else None
-        GAME["votes"][pid] = target
-        await asyncio.sleep(0.2)
-        await send_event({"type": "VOTE", "from": pid, "to": target})
-        record_action({
-            "type": "VOTE",
-            "from": pid,
-            "to": target,
-            "source": "ai",
-        })
-
-    # Allow players to vote (wait until everyone votes or timeout).
-    required = set(living_player_ids())
-    for _ in range(60):  # ~15s
-        if required.issubset(GAME["votes"].keys()):
-            break
-        await asyncio.sleep(0.25)
-
-    # Auto-vote for anyone who didn't vote.
-    missing = required - set(GAME["votes"].keys())
-    for pid in missing:
-        target = random.choice(list(required))
-        GAME["votes"][pid] = target
-        await send_event({"type": "VOTE", "from": pid, "to": target})
-        record_action({
-            "type": "VOTE",
-            "from": pid,
-            "to": target,
-            "source": "auto",
-        })
-
-    await send_event({"type": "VOTE_END"})
-
-    # Defensive: drop votes from dead players.
-    alive_set = set(living_player_ids())
-    GAME["votes"] = {voter: target for voter, target in GAME["votes"].items() if voter in alive_set}
-
-    if not GAME["votes"]:
-        return None
-
-    # Weighted tally with sheriff double vote
-    counts = {}
-    for voter, target in GAME["votes"].items():
-        if not target:
-            continue
-        weight = 2 if voter == GAME["sheriff_id"] else 1
-        counts[target] = counts.get(target, 0) + weight
-
-    if not counts:
-        return None
-
-    sorted_counts = sorted(counts.items(), key=lambda x: x[1], reverse=True)
-    if len(sorted_counts) > 1 and sorted_counts[0][1] == sorted_counts[1][1]:
-        await send_event({"type": "VOTE_TIE"})
-        return None
-
-    return sorted_counts[0][0]
-
-
-async def game_loop() -> None:
-    # INIT broadcast is per-connection; gameplay starts here
-    result = None
-    max_rounds = 3
-    for round_idx in range(max_rounds):
-        if not manager.connections:
-            break
-        print(f"[GAME] Round {round_idx} start")
-        GAME["night"] = round_idx
-        night_deaths = await run_night(round_idx)
-        GAME["last_night_deaths"] = list(night_deaths)
-        await asyncio.sleep(1)
-
-        GAME["day"] = round_idx + 1
-        await run_day(round_idx + 1, night_deaths)
-        result = check_win()
-        print(f"[GAME] After day {round_idx + 1}, result={result}")
-        if result:
-            break
-
-        print("[GAME] Starting vote phase")
-        execute_id = await run_vote()
-        print(f"[GAME] Vote ended, execute_id={execute_id}")
-        if execute_id:
-            mark_dead(execute_id)
-            await send_event({"type": "DEATH", "playerId": execute_id})
-            await send_event({
-                "type": "SPEECH",
-                "playerId": "SYSTEM",
-                "text": f"\u6295\u7968\u5904\u51b3\uff1a{execute_id}\u51fa\u5c40\u3002"
-            })
-        else:
-            await send_event({
-                "type": "SPEECH",
-                "playerId": "SYSTEM",
-                "text": "\u6295\u7968\u7ed3\u679c\u5e73\u7968\uff0c\u672c\u8f6e\u65e0\u4eba\u51fa\u5c40\u3002"
-            })
-
-        result = check_win()
-        if result:
-            break
-
-    if not manager.connections:
-        return
-    # GAME END
-    result = result or "DRAW"
-    await send_event({
-        "type": "REPLAY_DATA",
-        "timeline": list(GAME["timeline"]),
-        "actionLog": list(GAME["action_log"]),
-        "reviews": {},
-        "result": result,
-        "finalRoles": [
-            {"id": p["id"], "name": p["name"], "role": ROLES.get(p["id"])}
-            for p in PLAYERS
-        ]
-    })
-
-    await send_event({
-        "type": "REVIEW",
-        "data": {
-            "P2": {
-                "overall_strategy": "Stay quiet early.",
-                "biggest_mistake": "Voted too fast."
-            }
-        }
-    })
-
-
 @app.websocket("/ws")
 async def ws_endpoint(ws: WebSocket):
-    global game_task
+    room_id = ws.query_params.get("room") or DEFAULT_ROOM
+    session = get_or_create_room(room_id) if ROOM_ID_PATTERN.match(room_id) else None
+    if session is None:
+        await ws.close(code=1008)
+        return
 
     mode = ws.query_params.get("mode")
-    player_id = await manager.connect(ws, mode=mode)
+    codec = negotiate_codec(ws.query_params.get("encoding"), ws.query_params.get("compress"))
+    player_id = await session.manager.connect(ws, session.players, mode=mode, codec=codec)
     if not player_id:
         await ws.close()
+        release_room(session)
         return
 
-    listener_task = asyncio.create_task(handle_client_messages(ws, player_id))
+    listener_task = asyncio.create_task(handle_client_messages(session, ws, player_id))
 
-    if GAME["configured"]:
-        await send_init_to(player_id)
+    if session.game["configured"]:
+        await send_init_to(session, player_id)
 
-        if game_task is None or game_task.done():
-            game_task = asyncio.create_task(game_loop())
+        if session.game_task is None or session.game_task.done():
+            session.start()
     else:
-        await ws.send_text(json.dumps({
+        await session.manager.send_to(player_id, {
             "type": "CONFIG_REQUIRED",
+            "roomId": session.room_id,
             "minPlayers": MIN_PLAYERS,
             "maxPlayers": MAX_PLAYERS
-        }))
+        })
 
     try:
         await listener_task
@@ -1174,13 +552,45 @@ async def ws_endpoint(ws: WebSocket):
         listener_task.cancel()
         with contextlib.suppress(asyncio.CancelledError):
             await listener_task
-        await manager.disconnect(player_id)
-        if not manager.connections and game_task and not game_task.done():
-            game_task.cancel()
+        await session.manager.disconnect(player_id)
+        release_room(session)
+
+
+@app.get("/replays/{game_id}")
+def get_replay(
+    game_id: str,
+    from_tick: int = Query(0, ge=0),
+    to_tick: int | None = Query(None, ge=0),
+    viewer: str | None = None,
+    limit: int = Query(REPLAY_PAGE_LIMIT, ge=1, le=REPLAY_PAGE_LIMIT),
+) -> Response:
+    """
+    Page through a recorded game as JSONL, `from_tick <= tick < to_tick`.
+    While the game is running a `viewer` player id is required and only
+    the records that player may see are returned; once it has finished
+    every record is public. The tick to request next is returned in the
+    X-Next-Tick header.
+    """
+    if not REPLAY_ID_PATTERN.match(game_id):
+        return Response(status_code=404)
+    try:
+        reader = ReplayReader(REPLAY_DIR, game_id)
+    except FileNotFoundError:
+        return Response(status_code=404)
+    with reader:
+        if reader.finished:
+            viewer = None
+        elif viewer is None:
+            return Response(status_code=403)
+        body, next_tick = reader.page(from_tick, to_tick, viewer, limit)
+    headers = {"X-Next-Tick": str(next_tick)} if next_tick is not None else {}
+    return Response(body, media_type="application/x-ndjson", headers=headers)
+
+
+@app.on_event("shutdown")
+async def close_llm_clients() -> None:
+    await aclose_clients()
 
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
-
-
-
@@ -0,0 +1,43 @@
+import asyncio
+
+import httpx
+import pytest
+
+import llm.client as client
+
+
+class FakeLLM:
+    """
+    A fake chat endpoint behind llm.client. Assign `handler` (an httpx
+    MockTransport handler) before calling the client; every client handed
+    out is closed when the test ends.
+    """
+
+    def __init__(self) -> None:
+        self.handler = lambda request: httpx.Response(503)
+        self.settings = client.LLMSettings("key", "http://llm.test/v1", "model", 0.7, 5.0, 4, 4)
+        self.sync_client = httpx.Client(transport=httpx.MockTransport(self._handle))
+        self.async_clients: list[httpx.AsyncClient] = []
+
+    def _handle(self, request: httpx.Request) -> httpx.Response:
+        return self.handler(request)
+
+    def async_client(self, _settings) -> httpx.AsyncClient:
+        http = httpx.AsyncClient(transport=httpx.MockTransport(self._handle))
+        self.async_clients.append(http)
+        return http
+
+    async def aclose(self) -> None:
+        for http in self.async_clients:
+            await http.aclose()
+        self.sync_client.close()
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    fake = FakeLLM()
+    monkeypatch.setattr(client, "get_settings", lambda: fake.settings)
+    monkeypatch.setattr(client, "_sync_client", lambda _settings: fake.sync_client)
+    monkeypatch.setattr(client, "_async_client", fake.async_client)
+    yield fake
+    asyncio.run(fake.aclose())
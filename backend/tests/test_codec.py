@@ -0,0 +1,55 @@
+import pytest
+
+import game.codec as codec
+from game.codec import COMPRESS_THRESHOLD, JSON, FramedCodec, get_codec, wire_codec
+from game.events import Speech, Vote
+
+
+def test_json_round_trip_of_events_and_dicts():
+    event = Vote("P1", None)
+    assert JSON.decode(JSON.encode(event)) == {"type": "VOTE", "from": "P1", "to": None}
+    assert JSON.decode(JSON.encode({"type": "PING", "text": "狼人"})) == {"type": "PING", "text": "狼人"}
+    assert "狼人" in JSON.encode(Speech("P2", "狼人"))
+
+
+def test_event_encoding_is_cached_per_codec():
+    event = Speech("P1", "hello")
+    framed = FramedCodec(JSON)
+    assert JSON.encode(event) is JSON.encode(event)
+    assert framed.encode(event) is framed.encode(event)
+
+
+def test_framed_json_deflates_only_large_frames():
+    framed = FramedCodec(JSON)
+    small = {"type": "SPEECH", "text": "hi"}
+    large = {"type": "SPEECH", "text": "x" * COMPRESS_THRESHOLD}
+
+    small_frame, large_frame = framed.encode(small), framed.encode(large)
+    assert small_frame[0] == JSON.id << 1
+    assert large_frame[0] == JSON.id << 1 | 1
+    assert len(large_frame) < COMPRESS_THRESHOLD
+    assert framed.decode(small_frame) == small
+    assert framed.decode(large_frame) == large
+
+
+def test_msgpack_round_trip():
+    pytest.importorskip("msgpack")
+    framed = wire_codec("msgpack", compress=True)
+    event = Speech("P3", "我怀疑P5" * 200)
+    frame = framed.encode(event)
+    assert frame[0] == get_codec("msgpack").id << 1 | 1
+    assert framed.decode(frame) == event.to_dict()
+
+
+def test_plain_json_stays_on_text_frames():
+    assert wire_codec() is JSON
+    assert wire_codec("json") is JSON
+    assert isinstance(wire_codec("json", compress=True), FramedCodec)
+
+
+def test_missing_msgpack_falls_back_to_json(monkeypatch):
+    monkeypatch.setattr(codec, "CODECS", {JSON.name: JSON})
+    assert wire_codec("msgpack") is JSON
+    assert wire_codec("msgpack", compress=True).base is JSON
+    with pytest.raises(ValueError):
+        get_codec("msgpack")
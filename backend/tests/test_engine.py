@@ -0,0 +1,70 @@
+import asyncio
+
+import llm.client as client
+from game.cli import play_game
+from game.clock import VirtualClock
+from game.engine import GameSession, configure_game
+from game.sink import RecordingSink
+
+
+def play(players: int, seed: int) -> dict:
+    summary = asyncio.run(play_game(players, seed, include_timeline=True))
+    summary.pop("gameId")
+    return summary
+
+
+def test_virtual_clock_game_finishes():
+    summary = play(8, 1)
+    assert summary["result"] in {"VILLAGERS_WIN", "WEREWOLVES_WIN", "DRAW"}
+    assert summary["timeline"][0]["tick"] == 0
+    types = [entry["event"]["type"] for entry in summary["timeline"]]
+    assert types[0] == "PHASE" and "VOTE_END" in types and types[-1] == "REVIEW"
+
+
+def test_same_seed_replays_the_same_game():
+    for players, seed in ((6, 1), (8, 3), (12, 2)):
+        assert play(players, seed) == play(players, seed)
+
+
+def test_game_runner_closes_its_pooled_client():
+    settings = client.LLMSettings("key", "http://llm.test/v1", "model", 0.7, 5.0, 4, 4)
+
+    async def run():
+        pooled = client._async_client(settings)
+        await play_game(6, 1)
+        return pooled
+
+    assert asyncio.run(run()).is_closed
+    assert not client._ASYNC_CLIENTS
+
+
+def test_pacing_runs_on_virtual_time():
+    async def run() -> tuple[float, float]:
+        clock = VirtualClock()
+        session = GameSession("t", sink=RecordingSink(), clock=clock)
+        configure_game(session, 6, human_player_id=None)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        session.start()
+        await session.game_task
+        return clock.now(), loop.time() - started
+
+    simulated, elapsed = asyncio.run(run())
+    assert simulated > 0
+    assert elapsed < simulated
+
+
+def test_restarted_game_keeps_its_replay(tmp_path):
+    async def run() -> None:
+        session = GameSession("r", sink=RecordingSink(), replay_dir=tmp_path, clock=VirtualClock())
+        configure_game(session, 6, human_player_id=None)
+        session.start()
+        await asyncio.sleep(0)
+        configure_game(session, 6, human_player_id=None)
+        session.start()
+        await session.game_task
+
+    asyncio.run(run())
+    logs = sorted(tmp_path.glob("*.jsonl"), key=lambda p: p.stat().st_size)
+    assert len(logs) == 2
+    assert b'"kind": "end"' in logs[-1].read_bytes()
@@ -0,0 +1,61 @@
+import asyncio
+
+from game.clock import RealClock, VirtualClock
+from game.inputs import SeatInputs
+
+
+def test_gather_returns_as_soon_as_every_seat_answered():
+    async def run():
+        clock = VirtualClock()
+        inputs = SeatInputs(clock)
+        inputs.open("vote", ["P1", "P2"])
+        assert inputs.submit("vote", "P1", "P3")
+        assert inputs.submit("vote", "P2", "P4")
+        assert not inputs.submit("vote", "P2", "P5")
+        return await inputs.gather("vote", 15.0), clock.now()
+
+    answers, now = asyncio.run(run())
+    assert answers == {"P1": "P3", "P2": "P4"}
+    assert now == 0
+
+
+def test_deadline_returns_what_arrived():
+    async def run():
+        clock = VirtualClock()
+        inputs = SeatInputs(clock)
+        inputs.open("night", ["P1", "P2"])
+        inputs.submit("night", "P2")
+        return await inputs.gather("night", 3.0), clock.now(), inputs.seats("night")
+
+    answers, now, left_open = asyncio.run(run())
+    assert answers == {"P2": None}
+    assert now == 3.0
+    assert left_open == []
+
+
+def test_submit_without_an_open_slot_is_ignored():
+    async def run():
+        inputs = SeatInputs(VirtualClock())
+        inputs.open("vote", ["P1"])
+        return inputs.submit("speech", "P1"), inputs.submit("vote", "P2")
+
+    assert asyncio.run(run()) == (False, False)
+
+
+def test_abandon_releases_an_unbounded_wait():
+    async def run():
+        inputs = SeatInputs(RealClock())
+        inputs.open("speech", ["P1"])
+        asyncio.get_running_loop().call_later(0.01, inputs.abandon, "P1")
+        return await asyncio.wait_for(inputs.gather("speech", None), 1.0)
+
+    assert asyncio.run(run()) == {"P1": None}
+
+
+def test_real_clock_deadline_expires():
+    async def run():
+        inputs = SeatInputs(RealClock())
+        inputs.open("sheriff", ["P1"])
+        return await inputs.gather("sheriff", 0.01)
+
+    assert asyncio.run(run()) == {}
@@ -0,0 +1,70 @@
+import json
+
+import httpx
+import pytest
+
+import llm.client as client
+from llm.cache import ResponseCache
+
+REPLY = {"speech": "P3 很可疑", "action": {"vote": "P3"}}
+
+
+@pytest.fixture
+def upstream(fake_llm):
+    """A fake chat endpoint; returns the list of prompts it received."""
+    prompts = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        prompts.append(json.loads(request.content)["messages"][-1]["content"])
+        return httpx.Response(200, json={"choices": [{"message": {"content": json.dumps(REPLY)}}]})
+
+    fake_llm.handler = handler
+    return prompts
+
+
+def use_cache(monkeypatch, cache: ResponseCache) -> None:
+    monkeypatch.setattr(client, "get_response_cache", lambda: cache)
+
+
+def test_repeated_prompt_is_served_from_memory(monkeypatch, upstream):
+    cache = ResponseCache()
+    use_cache(monkeypatch, cache)
+
+    first = client.call_llm("same prompt", use_cache=True)
+    second = client.call_llm("same prompt", use_cache=True)
+
+    assert first == second
+    assert upstream == ["same prompt"]
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["disk_hits"] == 0
+
+
+def test_repeated_prompt_is_served_from_disk_after_restart(monkeypatch, upstream, tmp_path):
+    use_cache(monkeypatch, ResponseCache(disk_dir=tmp_path))
+    client.call_llm("same prompt", use_cache=True)
+
+    restarted = ResponseCache(disk_dir=tmp_path)
+    use_cache(monkeypatch, restarted)
+    client.call_llm("same prompt", use_cache=True)
+
+    assert upstream == ["same prompt"]
+    assert restarted.stats()["disk_hits"] == 1
+
+
+def test_cache_is_bypassed_unless_requested(monkeypatch, upstream):
+    use_cache(monkeypatch, ResponseCache())
+
+    client.call_llm("same prompt")
+    client.call_llm("same prompt")
+
+    assert upstream == ["same prompt", "same prompt"]
+
+
+def test_disk_writes_leave_no_temp_files(tmp_path):
+    cache = ResponseCache(disk_dir=tmp_path)
+    for i in range(3):
+        cache.put(f"key{i}", REPLY)
+    cache.put("key0", {"speech": "again"})
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["key0.json", "key1.json", "key2.json"]
+    assert ResponseCache(disk_dir=tmp_path).get("key0") == {"speech": "again"}
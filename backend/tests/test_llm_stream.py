@@ -0,0 +1,63 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+import llm.client as client
+from llm.mock import call_llm as mock_call_llm
+
+
+def sse(*pieces: str) -> list[bytes]:
+    return [
+        f"data: {json.dumps({'choices': [{'delta': {'content': piece}}]})}\n\n".encode()
+        for piece in pieces
+    ]
+
+
+@pytest.fixture
+def stream_reply(fake_llm):
+    """Set the SSE frames (and an optional mid-stream error) the fake endpoint sends."""
+    reply = {"frames": [], "fail": False}
+
+    async def body():
+        for frame in reply["frames"]:
+            yield frame
+        if reply["fail"]:
+            raise httpx.ReadError("connection reset")
+
+    fake_llm.handler = lambda request: httpx.Response(200, content=body())
+    return reply
+
+
+def run(prompt: str) -> tuple[dict, list[str]]:
+    pieces = []
+
+    async def on_speech(piece: str) -> None:
+        pieces.append(piece)
+
+    return asyncio.run(client.astream_llm(prompt, on_speech)), pieces
+
+
+def test_complete_stream_returns_the_parsed_reply(stream_reply):
+    stream_reply["frames"] = sse('{"speech": "我怀疑', 'P3", "action": {"vote": "P3"}}') + [b"data: [DONE]\n\n"]
+    result, pieces = run("prompt")
+    assert "".join(pieces) == "我怀疑P3"
+    assert result["speech"] == "我怀疑P3"
+    assert result["action"] == {"vote": "P3"}
+
+
+def test_failure_after_speech_keeps_the_streamed_text(stream_reply):
+    stream_reply["frames"] = sse('{"speech": "我怀疑', "P3")
+    stream_reply["fail"] = True
+    result, pieces = run("prompt")
+    assert "".join(pieces) == "我怀疑P3"
+    assert result["speech"] == "我怀疑P3"
+    assert result["action"] == mock_call_llm("prompt")["action"]
+
+
+def test_failure_before_speech_falls_back_to_the_mock(stream_reply):
+    stream_reply["fail"] = True
+    result, pieces = run("prompt")
+    assert pieces == []
+    assert result == mock_call_llm("prompt")
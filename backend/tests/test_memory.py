@@ -0,0 +1,61 @@
+from agents.memory import AgentMemory
+from game.engine import GameSession, configure_game, observe_event
+from game.event_log import EventLog
+from game.sink import RecordingSink
+
+
+def speech(pid: str, text: str) -> dict:
+    return {"type": "SPEECH", "playerId": pid, "text": text}
+
+
+def test_speeches_by_returns_the_last_k_oldest_first():
+    memory = AgentMemory()
+    for i in range(6):
+        memory.add_speech("P1" if i % 2 else "P2", f"s{i}")
+
+    assert memory.speeches_by("P1") == ["P1: s1", "P1: s3", "P1: s5"]
+    assert memory.speeches_by("P1", 2) == ["P1: s3", "P1: s5"]
+    assert memory.speeches_by("P1", 0) == []
+    assert memory.speeches_by("P9", 3) == []
+
+
+def test_indexes_follow_ring_buffer_eviction():
+    memory = AgentMemory(max_events=3, max_speeches=2)
+    for i in range(5):
+        memory.add_event(f"e{i}", "VOTE" if i % 2 else "DEATH", [f"P{i}"])
+        memory.add_speech(f"P{i % 2}", f"s{i}")
+
+    assert memory.visible_events() == ["e2", "e3", "e4"]
+    assert memory.events_of_type("DEATH") == ["e2", "e4"]
+    assert memory.events_of_type("VOTE", 5) == ["e3"]
+    assert memory.find_events_about("P1") == []
+    assert memory.find_events_about("P4") == ["e4"]
+    assert memory.visible_speeches() == ["P1: s3", "P0: s4"]
+    assert memory.speeches_by("P0") == ["P0: s4"]
+
+
+def test_attached_memory_catches_up_and_hides_private_events():
+    log = EventLog()
+    seer, villager = AgentMemory(), AgentMemory()
+    seer.attach(log, "P1")
+    villager.attach(log, "P2")
+
+    log.append(speech("P3", "hello"), ["P3"])
+    log.append({"type": "SEER_RESULT", "target": "P3", "role": "WEREWOLF"}, ["P3"], visible_to=["P1"])
+
+    assert seer.speeches_by("P3") == villager.speeches_by("P3") == ["P3: hello"]
+    assert len(seer.events_of_type("SEER_RESULT")) == 1
+    assert villager.events_of_type("SEER_RESULT") == []
+    assert seer.has_private_knowledge()
+    assert not villager.has_private_knowledge()
+
+
+def test_events_with_malformed_ids_are_logged_unindexed():
+    session = GameSession("m", sink=RecordingSink())
+    configure_game(session, 6, human_player_id=None)
+    observe_event(session, {"type": "NIGHT_ACTION_ACK", "ok": True, "target": ["P2"]}, visible_to=("P1",))
+    observe_event(session, {"type": "VOTE", "from": "P3", "to": "P2"})
+
+    memory = session.agents["P2"].memory
+    assert memory.events_of_type("NIGHT_ACTION_ACK") == []
+    assert len(memory.find_events_about("P2")) == 1
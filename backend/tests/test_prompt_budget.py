@@ -0,0 +1,58 @@
+import random
+
+from agents.personality import Personality
+from agents.prompts.budget import PromptSection, assemble_sections, estimate_tokens
+from agents.prompts.runtime import assemble_runtime_prompt
+
+
+def sections(rng: random.Random) -> list[PromptSection]:
+    def items(n):
+        return ["".join(rng.choice("ab P1狼人") for _ in range(rng.randint(1, 30))) for _ in range(n)]
+
+    return [
+        PromptSection("rules", priority=0, body="rules", required=True),
+        PromptSection("events", priority=5, header="[Events]", items=items(rng.randint(0, 30))),
+        PromptSection("speeches", priority=3, header="[Speeches]", items=items(rng.randint(0, 30))),
+        PromptSection("state", priority=2, body="state " * rng.randint(1, 20)),
+    ]
+
+
+def test_assembled_prompt_stays_within_budget():
+    rng = random.Random(0)
+    for _ in range(2000):
+        budget = rng.randint(5, 400)
+        prompt, usage = assemble_sections(sections(rng), budget)
+        assert estimate_tokens(prompt) <= budget
+        assert usage["total"] <= budget
+
+
+def test_items_are_trimmed_oldest_first_with_a_marker():
+    items = [f"speech {i}" for i in range(10)]
+    section = PromptSection("speeches", priority=1, header="[Speeches]", items=items)
+    prompt, usage = assemble_sections([section], 20)
+
+    lines = prompt.splitlines()
+    assert lines[0] == "[Speeches]"
+    assert lines[1].startswith("(... ") and lines[1].endswith(" earlier omitted)")
+    omitted = int(lines[1].split()[1])
+    assert lines[2:] == items[omitted:]
+    assert usage["speeches"] == estimate_tokens(prompt) <= 20
+
+
+def test_required_sections_survive_any_budget():
+    required = PromptSection("rules", priority=0, body="x" * 400, required=True)
+    optional = PromptSection("state", priority=1, body="state")
+    prompt, usage = assemble_sections([required, optional], 10)
+    assert prompt == "x" * 400
+    assert usage["state"] == 0
+
+
+def test_runtime_prompt_keeps_game_state_and_drops_history():
+    speeches = [f"P{i % 9 + 1}: " + "很长的发言" * 20 for i in range(50)]
+    prompt, usage = assemble_runtime_prompt(
+        "rules", "role", "Current phase: DAY", {"top_suspects": []},
+        ["event"] * 20, speeches, {"P1": "P1"}, Personality(), {"alive_players": ["P1"]}, 200,
+    )
+    assert '[Game State]\n{"alive_players": ["P1"]}' in prompt
+    assert usage["game_state"] > 0
+    assert usage["older_speeches"] == 0
@@ -0,0 +1,63 @@
+import json
+
+from game.events import SeerResult, Speech
+from game.replay_log import ReplayReader, ReplayWriter
+
+
+def records(data: bytes) -> list[dict]:
+    return [json.loads(line) for line in data.splitlines()]
+
+
+def write_game(directory) -> None:
+    writer = ReplayWriter(directory, "g1")
+    writer.append(0, "event", Speech("SYSTEM", "天黑请闭眼。"))
+    writer.append(1, "event", SeerResult("P3", "WEREWOLF"), visible_to=("P1",))
+    writer.append(1, "action", {"type": "CHECK", "from": "P1"}, visible_to=())
+    for tick in range(2, 6):
+        writer.append(tick, "event", Speech(f"P{tick}", f"speech {tick}"))
+    writer.close("VILLAGERS_WIN")
+    writer.append(9, "event", Speech("P9", "after close"))
+
+
+def test_observer_sees_every_record_in_order(tmp_path):
+    write_game(tmp_path)
+    with ReplayReader(tmp_path, "g1") as reader:
+        assert reader.finished
+        data, next_tick = reader.page()
+    rows = records(data)
+    assert next_tick is None
+    assert [row["tick"] for row in rows] == [0, 1, 1, 2, 3, 4, 5]
+    assert rows[0]["data"] == {"type": "SPEECH", "playerId": "SYSTEM", "text": "天黑请闭眼。"}
+
+
+def test_private_records_are_filtered_per_viewer(tmp_path):
+    write_game(tmp_path)
+    with ReplayReader(tmp_path, "g1") as reader:
+        seer = records(reader.page(viewer="P1")[0])
+        villager = records(reader.page(viewer="P2")[0])
+    assert [row["data"]["type"] for row in seer[:2]] == ["SPEECH", "SEER_RESULT"]
+    assert all(row["kind"] != "action" for row in seer)
+    assert all(row["data"]["type"] == "SPEECH" for row in villager)
+    assert len(villager) == 5
+
+
+def test_pages_resume_by_tick_and_never_split_one(tmp_path):
+    write_game(tmp_path)
+    with ReplayReader(tmp_path, "g1") as reader:
+        first, resume = reader.page(limit=2)
+        assert [row["tick"] for row in records(first)] == [0, 1, 1]
+        assert resume == 2
+        second, resume = reader.page(resume, end_tick=4)
+        assert [row["tick"] for row in records(second)] == [2, 3]
+        assert resume is None
+
+
+def test_reader_ignores_a_half_written_index_record(tmp_path):
+    writer = ReplayWriter(tmp_path, "live")
+    writer.append(0, "event", Speech("P1", "one"))
+    with open(tmp_path / "live.idx", "ab") as index:
+        index.write(b"\x01\x02")
+    with ReplayReader(tmp_path, "live") as reader:
+        assert len(reader) == 1
+        assert not reader.finished
+    writer.close()
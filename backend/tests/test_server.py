@@ -0,0 +1,61 @@
+import asyncio
+import json
+
+from fastapi import WebSocketDisconnect
+from fastapi.testclient import TestClient
+
+import run_server
+from game.engine import configure_game
+from game.events import SeerResult, Speech
+from game.replay_log import ReplayWriter
+from run_server import Room, handle_client_messages
+
+
+class ScriptedSocket:
+    """Feeds fixed client messages, then disconnects."""
+
+    def __init__(self, *messages: dict) -> None:
+        self.messages = [json.dumps(msg) for msg in messages]
+
+    async def receive_text(self) -> str:
+        if not self.messages:
+            raise WebSocketDisconnect()
+        return self.messages.pop(0)
+
+
+def test_non_string_targets_are_rejected():
+    async def run() -> Room:
+        room = Room("t")
+        configure_game(room, 6, human_player_id="P1")
+        room.game["phase"] = "NIGHT"
+        room.inputs.open("night", ["P1"])
+        await handle_client_messages(room, ScriptedSocket(
+            {"type": "NIGHT_ACTION", "actionType": "SEER", "target": ["P2"]},
+            {"type": "NIGHT_ACTION", "actionType": "GUARD", "target": {"id": "P2"}},
+        ), "P1")
+        room.game["phase"] = "VOTE"
+        room.inputs.open("vote", ["P1"])
+        await handle_client_messages(room, ScriptedSocket({"type": "VOTE", "to": ["P2"]}), "P1")
+        return room
+
+    room = asyncio.run(run())
+    assert room.game["night_actions"] == {}
+    assert room.game["votes"] == {}
+    assert room.inputs.seats("night") == ["P1"]
+    assert not room.registry.is_alive(["P2"])
+    assert room.registry.role_of(["P2"]) is None
+
+
+def test_live_replays_are_filtered_per_viewer(monkeypatch, tmp_path):
+    monkeypatch.setattr(run_server, "REPLAY_DIR", tmp_path)
+    writer = ReplayWriter(tmp_path, "live")
+    writer.append(0, "event", Speech("SYSTEM", "天黑请闭眼。"))
+    writer.append(1, "event", SeerResult("P3", "WEREWOLF"), visible_to=("P1",))
+    http = TestClient(run_server.app)
+
+    assert http.get("/replays/live").status_code == 403
+    assert len(http.get("/replays/live", params={"viewer": "P2"}).text.splitlines()) == 1
+    assert len(http.get("/replays/live", params={"viewer": "P1"}).text.splitlines()) == 2
+
+    writer.close("VILLAGERS_WIN")
+    assert len(http.get("/replays/live").text.splitlines()) == 2
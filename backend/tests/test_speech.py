@@ -0,0 +1,66 @@
+import random
+
+import agents.ai_agent as ai_agent
+from agents.ai_agent import AIAgent
+from agents.wolf.wolf_channel import WolfChannel
+from agents.wolf.wolf_memory import WolfSharedMemory
+from game.engine import GameSession, configure_game
+from game.roles import Role
+from game.sink import RecordingSink
+from game.speech import SpeechSanitizer, SpeechStream
+
+ALIVE = [f"P{i}" for i in range(1, 13)]
+SPEECHES = (
+    "我觉得P3和P7的发言前后矛盾，今天先投P3。",
+    "undefined我是预言家，昨晚验了P4是好人。",
+    "P说的有道理，但P9已经出局了，P12被刀了undefined。",
+    "P1 P2 P3都已死亡吗？P11死了。",
+)
+
+
+def test_sanitizer_rewrites_and_is_idempotent():
+    sanitize = SpeechSanitizer(ALIVE)
+    text = sanitize("undefined P 说P9已经出局了", "P2")
+    assert text == "P2 说P9仍存活了"
+    assert sanitize(text, "P2") == text
+
+
+def test_sanitizer_follows_the_alive_set():
+    sanitize = SpeechSanitizer(ALIVE)
+    sanitize.update([pid for pid in ALIVE if pid != "P9"])
+    assert sanitize("P9已经出局了") == "P9已经出局了"
+
+
+def test_stream_only_releases_text_the_final_speech_keeps():
+    sanitize = SpeechSanitizer(ALIVE)
+    rng = random.Random(0)
+    for _ in range(500):
+        raw = rng.choice(SPEECHES) + rng.choice(SPEECHES)
+        cuts = sorted(rng.sample(range(1, len(raw)), rng.randint(1, 10)))
+        stream = SpeechStream(sanitize, "P5")
+        released = "".join(stream.feed(raw[a:b]) for a, b in zip([0] + cuts, cuts + [len(raw)]))
+        assert released == stream.sent
+        assert sanitize(raw, "P5").startswith(released)
+        assert "undefined" not in released
+
+
+def test_wolf_chat_uses_the_session_sanitizer(monkeypatch):
+    monkeypatch.setattr(ai_agent, "call_llm", lambda prompt: {"speech": "undefined P2已经出局了", "action": {"kill": "P2"}})
+    session = GameSession("w", sink=RecordingSink())
+    configure_game(session, 6, human_player_id=None)
+    wolf = session.agents[session.registry.first_with_role("WEREWOLF")]
+    assert wolf.sanitize_speech is session.sanitize_speech
+
+    channel = WolfChannel(WolfSharedMemory())
+    assert wolf.wolf_night_action(channel) == "P2"
+    assert channel.get_context()[-1]["message"] == "P2仍存活了"
+
+
+def test_standalone_agent_rebuilds_its_sanitizer_only_on_deaths():
+    agent = AIAgent("P1", Role.WEREWOLF)
+    agent.memory.alive_players = set(ALIVE)
+    sanitize = agent._sanitizer()
+    assert agent._sanitizer() is sanitize
+    agent.memory.alive_players.discard("P9")
+    assert agent._sanitizer() is not sanitize
+    assert agent._sanitizer()("P9已经出局了") == "P9已经出局了"
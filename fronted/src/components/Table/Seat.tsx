@@ -14,13 +14,16 @@ export function Seat({
   angle: number;
 }) {
   const messages = useGameStore((s) => s.messages);
+  const draft = useGameStore((s) => s.speechDrafts[player.id]);
   const lastMessage = [...messages]
     .reverse()
     .find((m) => m.playerId === player.id);
   const bubbleText =
-    typeof lastMessage?.text === "string"
-      ? lastMessage.text.replace(/undefined/gi, "").trim()
-      : "";
+    typeof draft === "string"
+      ? draft
+      : typeof lastMessage?.text === "string"
+        ? lastMessage.text.replace(/undefined/gi, "").trim()
+        : "";
   const offset = 115;
   const bubbleX = Math.cos(angle) * offset;
   const bubbleY = Math.sin(angle) * offset;
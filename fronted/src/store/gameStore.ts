@@ -1,5 +1,5 @@
 ﻿import { create } from "zustand";
-import { FinalRole, GameResult, NightSkill, Phase, Player, ReplayEvent, Review, Role, ServerMessage } from "../types/protocol";
+import { FinalRole, GameResult, NightSkill, Phase, Player, ReplayEvent, ReplayStream, Review, Role, ServerMessage } from "../types/protocol";
 
 interface Message {
   playerId: string;
@@ -17,6 +17,7 @@ interface GameState {
   speakingPlayer?: string;
 
   messages: Message[];
+  speechDrafts: Record<string, string>;
 
   votes: Record<string, string>;
   voteCounts: Record<string, number>;
@@ -45,12 +46,15 @@ interface GameState {
   setSpeaking(playerId?: string): void;
 
   addMessage(playerId: string, text: string): void;
+  appendSpeechDelta(playerId: string, text: string): void;
   markDead(playerId: string): void;
 
   addVote(from: string, to: string): void;
   clearVotes(): void;
 
   replayTimeline?: ReplayEvent[];
+  replayManifest?: Extract<ServerMessage, { type: "REPLAY_MANIFEST" }>;
+  replayChunks: Partial<Record<ReplayStream, unknown[][]>>;
   finalRoles?: FinalRole[];
   result?: GameResult;
   reviews?: Record<string, Review>;
@@ -60,6 +64,8 @@ interface GameState {
   startReplay(): void;
   stopReplay(): void;
   stepReplay(): void;
+  applyReplayChunk(stream: ReplayStream, index: number, items: unknown[]): void;
+  missingReplayChunks(): Partial<Record<ReplayStream, number[]>>;
   applyServerMessage(msg: ServerMessage): void;
 }
 
@@ -69,10 +75,13 @@ export const useGameStore = create<GameState>((set, get) => ({
   viewerMode: undefined,
   roleMap: undefined,
   messages: [],
+  speechDrafts: {},
   votes: {},
   voteCounts: {},
   votingOpen: false,
   replayTimeline: undefined,
+  replayManifest: undefined,
+  replayChunks: {},
   finalRoles: undefined,
   result: undefined,
   reviews: undefined,
@@ -114,6 +123,16 @@ export const useGameStore = create<GameState>((set, get) => ({
       };
     }),
 
+  appendSpeechDelta: (playerId, text) =>
+    set((s) => ({
+      speechDrafts: {
+        ...s.speechDrafts,
+        [playerId]: (s.speechDrafts[playerId] || "") + text,
+      },
+      speakingPlayer: playerId,
+      thinkingPlayer: undefined,
+    })),
+
   markDead: (playerId) =>
     set((s) => ({
       players: s.players.map((p) =>
@@ -161,6 +180,33 @@ export const useGameStore = create<GameState>((set, get) => ({
   stepReplay: () =>
     set((s) => ({ replayIndex: s.replayIndex + 1 })),
 
+  applyReplayChunk: (stream, index, items) => {
+    const { replayManifest, replayChunks } = get();
+    if (!replayManifest) return;
+    const chunks = [...(replayChunks[stream] || [])];
+    chunks[index] = items;
+    set({ replayChunks: { ...replayChunks, [stream]: chunks } });
+    if (stream === "timeline" && !get().replayTimeline && !get().missingReplayChunks().timeline?.length) {
+      set({ replayTimeline: chunks.flat() as ReplayEvent[] });
+      get().startReplay();
+    }
+  },
+
+  missingReplayChunks: () => {
+    const { replayManifest, replayChunks } = get();
+    const missing: Partial<Record<ReplayStream, number[]>> = {};
+    if (!replayManifest) return missing;
+    for (const [stream, total] of Object.entries(replayManifest.chunks) as [ReplayStream, number][]) {
+      const have = replayChunks[stream] || [];
+      const gaps = [];
+      for (let i = 0; i < total; i++) {
+        if (!have[i]) gaps.push(i);
+      }
+      if (gaps.length) missing[stream] = gaps;
+    }
+    return missing;
+  },
+
   applyServerMessage: (msg) => {
     const store = get();
     switch (msg.type) {
@@ -184,6 +230,8 @@ export const useGameStore = create<GameState>((set, get) => ({
             nightSkill: undefined,
             nightTarget: undefined,
       replayTimeline: undefined,
+      replayManifest: undefined,
+      replayChunks: {},
       finalRoles: undefined,
       result: undefined,
       reviews: undefined,
@@ -203,6 +251,7 @@ export const useGameStore = create<GameState>((set, get) => ({
           nightActionSubmitted: false,
           nightActionError: undefined,
           votingOpen: msg.phase === "VOTE",
+          speechDrafts: {},
           messages:
             msg.phase === "NIGHT"
               ? s.messages.filter((m) => m.playerId === "SYSTEM")
@@ -216,7 +265,15 @@ export const useGameStore = create<GameState>((set, get) => ({
       case "SPEECH_START":
         store.setSpeaking(msg.playerId);
         break;
+      case "SPEECH_DELTA":
+        store.appendSpeechDelta(msg.playerId, msg.text);
+        break;
       case "SPEECH":
+        set((s) => {
+          const speechDrafts = { ...s.speechDrafts };
+          delete speechDrafts[msg.playerId];
+          return { speechDrafts };
+        });
         store.addMessage(msg.playerId, msg.text);
         store.setSpeaking(undefined);
         break;
@@ -278,14 +335,16 @@ export const useGameStore = create<GameState>((set, get) => ({
         }
         break;
       }
-      case "REPLAY_DATA":
+      case "REPLAY_MANIFEST":
         set({
-          replayTimeline: msg.timeline,
+          replayManifest: msg,
+          replayChunks: {},
+          replayTimeline: msg.chunks.timeline ? undefined : [],
           reviews: msg.reviews,
           finalRoles: msg.finalRoles,
           result: msg.result,
         });
-        store.startReplay();
+        if (!msg.chunks.timeline) store.startReplay();
         break;
       case "REVIEW":
         set({ reviews: { ...(get().reviews || {}), ...msg.data } });
@@ -30,6 +30,10 @@ export interface FinalRole {
 }
 
 export type GameResult = "VILLAGERS_WIN" | "WEREWOLVES_WIN" | "DRAW";
+
+export type ReplayStream = "timeline" | "actionLog";
+export type ReplayEncoding = "json" | "deflate-base64";
+export type WireEncoding = "json" | "msgpack";
 
 
 
@@ -51,6 +55,7 @@ export type ServerMessage =
   | { type: "PHASE"; phase: Phase }
   | { type: "THINKING"; playerId: string }
   | { type: "SPEECH_START"; playerId: string }
+  | { type: "SPEECH_DELTA"; playerId: string; text: string }
   | { type: "SPEECH"; playerId: string; text: string }
   | { type: "VOTE"; from: string; to: string }
   | { type: "VOTE_END" }
@@ -61,13 +66,26 @@ export type ServerMessage =
   | { type: "SHERIFF_TIE" }
   | { type: "SHERIFF"; playerId: string }
   | { type: "VOTE_TIE" }
-  | { type: "CONFIG_REQUIRED"; minPlayers: number; maxPlayers: number }
+  | { type: "CONFIG_REQUIRED"; roomId?: string; minPlayers: number; maxPlayers: number }
   | { type: "CONFIG_ERROR"; message: string }
   | { type: "REVIEW"; data: any }
+  | { type: "PING" }
+  | { type: "ENCODING"; encoding: WireEncoding; compress: boolean; threshold: number | null }
   | {
-      type: "REPLAY_DATA";
-      timeline: ReplayEvent[];
+      type: "REPLAY_MANIFEST";
+      gameId?: string | null;
+      chunkSize: number;
+      encoding: ReplayEncoding;
+      chunks: Record<ReplayStream, number>;
       reviews: Record<string, Review>;
       finalRoles?: FinalRole[];
       result?: GameResult;
     }
+  | {
+      type: "REPLAY_CHUNK";
+      gameId?: string | null;
+      stream: ReplayStream;
+      index: number;
+      encoding: ReplayEncoding;
+      data: string;
+    }
@@ -0,0 +1,35 @@
+import { WireEncoding } from "../types/protocol";
+import { decodeMsgpack } from "./msgpack";
+
+// Wire format requested from the server (see negotiate_codec in run_server.py).
+// Text frames are always JSON; binary frames start with one header byte,
+// `codecId << 1 | deflated`, followed by the (possibly deflated) payload.
+export const WIRE_ENCODING: WireEncoding = "msgpack";
+export const WIRE_COMPRESS = true;
+
+const DEFLATED = 0x01;
+const CODEC_JSON = 0;
+const CODEC_MSGPACK = 1;
+
+const textDecoder = new TextDecoder();
+
+export async function inflate(bytes: Uint8Array): Promise<Uint8Array> {
+  const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream("deflate"));
+  return new Uint8Array(await new Response(stream).arrayBuffer());
+}
+
+export async function decodeFrame(data: string | ArrayBuffer): Promise<unknown> {
+  if (typeof data === "string") return JSON.parse(data);
+  const frame = new Uint8Array(data);
+  const header = frame[0];
+  let payload = frame.subarray(1);
+  if (header & DEFLATED) payload = await inflate(payload);
+  switch (header >> 1) {
+    case CODEC_JSON:
+      return JSON.parse(textDecoder.decode(payload));
+    case CODEC_MSGPACK:
+      return decodeMsgpack(payload);
+    default:
+      throw new Error(`unknown frame codec ${header >> 1}`);
+  }
+}
@@ -0,0 +1,159 @@
+// Minimal MessagePack decoder for server frames (maps, arrays, strings,
+// numbers, booleans, nil, bin). Extension types are not used by the server.
+
+const textDecoder = new TextDecoder();
+
+class Reader {
+  private view: DataView;
+  pos = 0;
+
+  constructor(private bytes: Uint8Array) {
+    this.view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+  }
+
+  u8() {
+    return this.view.getUint8(this.pos++);
+  }
+
+  u16() {
+    const v = this.view.getUint16(this.pos);
+    this.pos += 2;
+    return v;
+  }
+
+  u32() {
+    const v = this.view.getUint32(this.pos);
+    this.pos += 4;
+    return v;
+  }
+
+  i8() {
+    return this.view.getInt8(this.pos++);
+  }
+
+  i16() {
+    const v = this.view.getInt16(this.pos);
+    this.pos += 2;
+    return v;
+  }
+
+  i32() {
+    const v = this.view.getInt32(this.pos);
+    this.pos += 4;
+    return v;
+  }
+
+  u64() {
+    const v = this.view.getBigUint64(this.pos);
+    this.pos += 8;
+    return Number(v);
+  }
+
+  i64() {
+    const v = this.view.getBigInt64(this.pos);
+    this.pos += 8;
+    return Number(v);
+  }
+
+  f32() {
+    const v = this.view.getFloat32(this.pos);
+    this.pos += 4;
+    return v;
+  }
+
+  f64() {
+    const v = this.view.getFloat64(this.pos);
+    this.pos += 8;
+    return v;
+  }
+
+  str(length: number) {
+    const s = textDecoder.decode(this.bytes.subarray(this.pos, this.pos + length));
+    this.pos += length;
+    return s;
+  }
+
+  bin(length: number) {
+    const b = this.bytes.slice(this.pos, this.pos + length);
+    this.pos += length;
+    return b;
+  }
+
+  array(length: number): unknown[] {
+    const out = new Array(length);
+    for (let i = 0; i < length; i++) out[i] = this.value();
+    return out;
+  }
+
+  map(length: number): Record<string, unknown> {
+    const out: Record<string, unknown> = {};
+    for (let i = 0; i < length; i++) {
+      const key = String(this.value());
+      out[key] = this.value();
+    }
+    return out;
+  }
+
+  value(): unknown {
+    const b = this.u8();
+    if (b <= 0x7f) return b;
+    if (b >= 0xe0) return b - 0x100;
+    if ((b & 0xf0) === 0x80) return this.map(b & 0x0f);
+    if ((b & 0xf0) === 0x90) return this.array(b & 0x0f);
+    if ((b & 0xe0) === 0xa0) return this.str(b & 0x1f);
+    switch (b) {
+      case 0xc0:
+        return null;
+      case 0xc2:
+        return false;
+      case 0xc3:
+        return true;
+      case 0xc4:
+        return this.bin(this.u8());
+      case 0xc5:
+        return this.bin(this.u16());
+      case 0xc6:
+        return this.bin(this.u32());
+      case 0xca:
+        return this.f32();
+      case 0xcb:
+        return this.f64();
+      case 0xcc:
+        return this.u8();
+      case 0xcd:
+        return this.u16();
+      case 0xce:
+        return this.u32();
+      case 0xcf:
+        return this.u64();
+      case 0xd0:
+        return this.i8();
+      case 0xd1:
+        return this.i16();
+      case 0xd2:
+        return this.i32();
+      case 0xd3:
+        return this.i64();
+      case 0xd9:
+        return this.str(this.u8());
+      case 0xda:
+        return this.str(this.u16());
+      case 0xdb:
+        return this.str(this.u32());
+      case 0xdc:
+        return this.array(this.u16());
+      case 0xdd:
+        return this.array(this.u32());
+      case 0xde:
+        return this.map(this.u16());
+      case 0xdf:
+        return this.map(this.u32());
+      default:
+        throw new Error(`msgpack: unsupported type 0x${b.toString(16)}`);
+    }
+  }
+}
+
+export function decodeMsgpack(bytes: Uint8Array): unknown {
+  return new Reader(bytes).value();
+}
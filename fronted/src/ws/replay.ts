@@ -0,0 +1,10 @@
+import { ServerMessage } from "../types/protocol";
+import { inflate } from "./frames";
+
+type ReplayChunk = Extract<ServerMessage, { type: "REPLAY_CHUNK" }>;
+
+export async function decodeReplayChunk(chunk: ReplayChunk): Promise<unknown[]> {
+  if (chunk.encoding === "json") return JSON.parse(chunk.data);
+  const bytes = Uint8Array.from(atob(chunk.data), (c) => c.charCodeAt(0));
+  return JSON.parse(new TextDecoder().decode(await inflate(bytes)));
+}
@@ -1,9 +1,18 @@
 import { useGameStore } from "../store/gameStore";
 import { ServerMessage } from "../types/protocol";
+import { WIRE_COMPRESS, WIRE_ENCODING, decodeFrame } from "./frames";
+import { decodeReplayChunk } from "./replay";
 
 let socket: WebSocket | undefined;
 let currentMode: "PLAYER" | "OBSERVER" | undefined;
 let pendingMessages: string[] = [];
+let replayFetchTimer: ReturnType<typeof setTimeout> | undefined;
+// Frames may need async inflating; decode them one after another so
+// messages are applied in arrival order.
+let inbox: Promise<void> = Promise.resolve();
+
+const REPLAY_FETCH_DELAY_MS = 3000;
+const REPLAY_FETCH_ATTEMPTS = 3;
 
 function sendMessage(payload: unknown) {
   if (!socket || socket.readyState !== WebSocket.OPEN) {
@@ -29,11 +38,16 @@ export function connectWS(mode?: "PLAYER" | "OBSERVER") {
     socket = undefined;
   }
 
-  const url =
-    mode === "OBSERVER"
-      ? "ws://localhost:8000/ws?mode=observer"
-      : "ws://localhost:8000/ws";
+  const params = new URLSearchParams();
+  if (mode === "OBSERVER") params.set("mode", "observer");
+  const room = new URLSearchParams(window.location.search).get("room");
+  if (room) params.set("room", room);
+  params.set("encoding", WIRE_ENCODING);
+  if (WIRE_COMPRESS) params.set("compress", "1");
+  const query = params.toString();
+  const url = query ? `ws://localhost:8000/ws?${query}` : "ws://localhost:8000/ws";
   socket = new WebSocket(url);
+  socket.binaryType = "arraybuffer";
   currentMode = mode;
   socket.onopen = () => {
     if (pendingMessages.length > 0) {
@@ -49,16 +63,47 @@ export function connectWS(mode?: "PLAYER" | "OBSERVER") {
   };
 
   socket.onmessage = (event) => {
-    try {
-      const msg: ServerMessage = JSON.parse(event.data);
-      const store = useGameStore.getState();
-      store.applyServerMessage(msg);
-    } catch {
-      // Ignore malformed messages.
-    }
+    const data = event.data as string | ArrayBuffer;
+    inbox = inbox
+      .then(() => decodeFrame(data))
+      .then((msg) => handleMessage(msg as ServerMessage))
+      .catch(() => {
+        // Ignore malformed messages.
+      });
   };
 }
 
+function handleMessage(msg: ServerMessage) {
+  if (msg.type === "PING") {
+    sendMessage({ type: "PONG" });
+    return;
+  }
+  if (msg.type === "ENCODING") return;
+  const store = useGameStore.getState();
+  if (msg.type === "REPLAY_CHUNK") {
+    decodeReplayChunk(msg)
+      .then((items) => useGameStore.getState().applyReplayChunk(msg.stream, msg.index, items))
+      .catch(() => {
+        // Left missing; re-fetched below.
+      });
+    return;
+  }
+  store.applyServerMessage(msg);
+  if (msg.type === "REPLAY_MANIFEST") scheduleReplayFetch(msg.gameId, REPLAY_FETCH_ATTEMPTS);
+}
+
+function scheduleReplayFetch(gameId: string | null | undefined, attempts: number) {
+  if (replayFetchTimer) clearTimeout(replayFetchTimer);
+  replayFetchTimer = setTimeout(() => {
+    const store = useGameStore.getState();
+    if (store.replayManifest?.gameId !== gameId) return;
+    const missing = store.missingReplayChunks();
+    if (Object.keys(missing).length === 0) return;
+    sendMessage({ type: "REPLAY_FETCH", gameId, chunks: missing });
+    if (attempts > 1) scheduleReplayFetch(gameId, attempts - 1);
+  }, REPLAY_FETCH_DELAY_MS);
+}
+
 export function sendSpeech(text: string) {
   sendMessage({ type: "SPEECH", text });
 }